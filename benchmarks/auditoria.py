@@ -0,0 +1,84 @@
+"""Mede o custo da auditoria: no caminho da interação e na gravação em segundo plano.
+
+Num arquivo temporário, um RegistroAuditoria com a configuração do bot recebe
+N eventos de transição (os mesmos campos que os modais registram):
+
+- registrar:  tempo por evento de auditoria.registrar (meta: < 10 µs), que é o
+              que a interação paga;
+- gravação:   tempo por evento para descarregar a fila no arquivo (serialização
+              e escrita numa thread, em lotes), enquanto a sonda de
+              lag_imagens.py mede o atraso do event loop;
+- ocioso:     o atraso do loop sem trabalho nenhum, para comparar.
+
+Uso (na raiz do repositório):
+    python benchmarks/auditoria.py [eventos] [rodadas]      # padrão: 50000 3
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from lag_imagens import medir
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+META_REGISTRAR_US = 10.0
+
+
+async def rodada(bot, pasta: str, eventos: int):
+    caminho = os.path.join(pasta, "auditoria.log")
+    for nome in os.listdir(pasta):
+        if nome.startswith("auditoria.log"):
+            os.remove(os.path.join(pasta, nome))
+    registro = bot.RegistroAuditoria(caminho, bot.AUDITORIA_MAX_BYTES, bot.AUDITORIA_ARQUIVOS_ANTIGOS)
+    registro.iniciar()
+
+    async def ocioso():
+        await asyncio.sleep(0.5)
+
+    await medir("ocioso", ocioso, meta_ms=None)
+
+    inicio = time.perf_counter()
+    for i in range(eventos):
+        registro.registrar("transicao", guild_id=900000000000000001, usuario_id=10**17 + i % 50,
+                           usuario=f"adm{i % 50}", base=i % 40 + 1, de="livre", para="ocupada",
+                           nome=f"Facção {i % 50}", resultado="aplicada", chave=f"op-{i}")
+    por_evento_us = (time.perf_counter() - inicio) / eventos * 1_000_000
+    situacao = "ok" if por_evento_us < META_REGISTRAR_US else f"acima da meta de {META_REGISTRAR_US:.0f} µs"
+    print(f"  registrar  {por_evento_us:5.1f} µs por evento ({situacao})")
+
+    gravacao = {}
+
+    async def descarregar():
+        inicio = time.perf_counter()
+        await registro.descarregar()
+        gravacao["segundos"] = time.perf_counter() - inicio
+
+    await medir("gravação", descarregar, meta_ms=None)
+    await registro.encerrar()
+    arquivos = [os.path.join(pasta, nome) for nome in os.listdir(pasta) if nome.startswith("auditoria.log")]
+    gravados = 0
+    for arquivo in arquivos:  # Conta também os rotacionados (.1, .2, ...)
+        with open(arquivo, encoding="utf-8") as f:
+            gravados += sum(1 for _ in f)
+    print(f"  gravação   {gravacao['segundos'] / eventos * 1_000_000:5.1f} µs por evento "
+          f"({gravados} linhas em {len(arquivos)} arquivo(s), "
+          f"{sum(map(os.path.getsize, arquivos)) / 1024 / 1024:.1f} MB)")
+
+
+def main():
+    eventos = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    rodadas = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    sys.path.insert(0, RAIZ)
+    with tempfile.TemporaryDirectory() as pasta:
+        os.chdir(pasta)  # O bot cria bases.db no diretório atual
+        import bot
+
+        print(f"{eventos} eventos de auditoria, {os.cpu_count()} CPU(s)")
+        for numero in range(1, rodadas + 1):
+            print(f"Rodada {numero}:")
+            asyncio.run(rodada(bot, pasta, eventos))
+
+
+if __name__ == "__main__":
+    main()
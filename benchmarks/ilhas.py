@@ -0,0 +1,72 @@
+"""Mede o custo de várias ilhas (servidores) num único processo do bot.
+
+Para cada quantidade de ilhas, um processo novo importa o bot com ILHAS_EXTRAS
+gerado, num diretório temporário (banco novo), e mede init_database + carga
+das bases de todas as ilhas, o heap Python (tracemalloc) e o RSS do processo.
+
+Uso (na raiz do repositório):
+    python benchmarks/ilhas.py [quantidades...]      # padrão: 1 10 100
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def rss_mb() -> float:
+    """RSS atual do processo em MB (Linux)."""
+    with open("/proc/self/status") as arquivo:
+        for linha in arquivo:
+            if linha.startswith("VmRSS:"):
+                return int(linha.split()[1]) / 1024
+    return 0.0
+
+
+def medir(quantidade: int):
+    """Roda dentro do processo filho: importa o bot com `quantidade` ilhas e mede."""
+    import time
+    import tracemalloc
+
+    sys.path.insert(0, RAIZ)
+    import config
+    # A ilha principal vem das constantes do config.py; as demais são simuladas
+    config.ILHAS_EXTRAS = [
+        {"guild_id": 10_000 + i, "canal_vendas_id": 20_000 + i, "nome_ilha": f"Ilha {i}"}
+        for i in range(1, quantidade)
+    ]
+
+    tracemalloc.start()
+    import bot
+    assert len(bot.ilhas) == quantidade
+
+    inicio = time.perf_counter()
+    bot.init_database()
+    for ilha in bot.ilhas.values():
+        ilha.estado.carregar()
+    segundos = time.perf_counter() - inicio
+
+    heap, _ = tracemalloc.get_traced_memory()
+    bases = sum(len(ilha.bases) for ilha in bot.ilhas.values())
+    print(f"{quantidade:>4} ilha(s) | {bases:>5} bases | init+carga {segundos:.3f} s | "
+          f"heap {heap / 1024 / 1024:.1f} MB | RSS {rss_mb():.0f} MB")
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--filho":
+        medir(int(sys.argv[2]))
+        return
+
+    quantidades = [int(q) for q in sys.argv[1:]] or [1, 10, 100]
+    for quantidade in quantidades:
+        # Um processo e um banco novos por medição, para o RSS não acumular
+        with tempfile.TemporaryDirectory() as pasta:
+            subprocess.run(
+                [sys.executable, "-W", "ignore", os.path.abspath(__file__), "--filho", str(quantidade)],
+                cwd=pasta, check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
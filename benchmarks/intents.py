@@ -0,0 +1,160 @@
+"""Mede memória e volume de eventos do gateway com os intents antigos e com os atuais.
+
+Sem um token não dá para conectar ao Discord; aqui o estado interno do
+discord.py (ConnectionState) recebe os mesmos payloads que o gateway mandaria
+para um servidor grande simulado:
+
+- antes:  Intents.default() + members + message_content, cache de todos os
+          membros (chunk na inicialização) e 1000 mensagens em cache
+- depois: a configuração do bot.py (intents, member_cache_flags,
+          chunk_guilds_at_startup e max_messages vindos do config.py)
+
+Cada configuração recebe o servidor (com os membros, se os intents os
+trazem) e uma hora simulada de eventos; só os eventos cujos intents estão
+ligados chegam, como no gateway. Cada configuração roda num processo novo,
+para o RSS não se misturar; o tempo de CPU inclui o custo do tracemalloc.
+No servidor real, o /metricas mostra os eventos por tipo e o RSS do processo.
+
+Uso (na raiz do repositório):
+    python benchmarks/intents.py [membros]      # padrão: 50000
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ID_SERVIDOR = "900000000000000001"
+ID_CANAL = "800000000000000001"
+
+# Uma hora de um servidor movimentado: (evento, intent necessário, quantidade)
+EVENTOS_HORA = (
+    ("MESSAGE_CREATE", "guild_messages", 20_000),
+    ("TYPING_START", "guild_typing", 10_000),
+    ("MESSAGE_REACTION_ADD", "guild_reactions", 2_000),
+    ("GUILD_MEMBER_UPDATE", "members", 1_000),
+    ("INTERACTION_CREATE", None, 500),  # Chega sempre; o bot trata igual nos dois casos
+)
+
+
+def usuario(i: int) -> dict:
+    return {"id": str(10**17 + i), "username": f"usuario{i}", "discriminator": "0",
+            "avatar": None, "global_name": None}
+
+
+def membro(i: int, com_usuario: bool = True) -> dict:
+    dados = {"roles": [], "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False, "flags": 0}
+    if com_usuario:
+        dados["user"] = usuario(i)
+    return dados
+
+
+def servidor(membros: int) -> dict:
+    papel = {"id": ID_SERVIDOR, "name": "@everyone", "permissions": "0", "position": 0, "color": 0,
+             "hoist": False, "managed": False, "mentionable": False, "flags": 0}
+    canais = [{"id": str(int(ID_CANAL) + c), "type": 0, "name": f"canal-{c}", "position": c,
+               "permission_overwrites": []} for c in range(50)]
+    return {"id": ID_SERVIDOR, "name": "Servidor", "owner_id": "1", "roles": [papel], "channels": canais,
+            "members": [], "member_count": membros, "large": True, "emojis": [], "stickers": [],
+            "features": [], "presences": [], "voice_states": [], "threads": [], "stage_instances": [],
+            "guild_scheduled_events": [], "soundboard_sounds": []}
+
+
+def payload(evento: str, i: int, membros: int) -> dict:
+    autor = i % membros
+    if evento == "MESSAGE_CREATE":
+        return {"id": str(7 * 10**17 + i), "channel_id": ID_CANAL, "guild_id": ID_SERVIDOR,
+                "author": usuario(autor), "member": membro(autor, com_usuario=False),
+                "content": f"mensagem {i}", "timestamp": "2024-01-01T00:00:00+00:00",
+                "edited_timestamp": None, "tts": False, "mention_everyone": False, "mentions": [],
+                "mention_roles": [], "attachments": [], "embeds": [], "pinned": False, "type": 0}
+    if evento == "TYPING_START":
+        return {"channel_id": ID_CANAL, "guild_id": ID_SERVIDOR, "user_id": str(10**17 + autor),
+                "timestamp": 1700000000, "member": membro(autor)}
+    if evento == "MESSAGE_REACTION_ADD":
+        return {"user_id": str(10**17 + autor), "channel_id": ID_CANAL, "guild_id": ID_SERVIDOR,
+                "message_id": str(7 * 10**17 + i), "emoji": {"id": None, "name": "👍"}, "burst": False,
+                "type": 0, "member": membro(autor)}
+    return {"guild_id": ID_SERVIDOR, **membro(autor), "nick": f"apelido {i}"}
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as arquivo:
+        for linha in arquivo:
+            if linha.startswith("VmRSS:"):
+                return int(linha.split()[1]) / 1024
+    return 0.0
+
+
+def medir(configuracao: str, membros: int):
+    """Roda num processo filho: monta o estado do discord.py com a configuração e aplica os eventos."""
+    import tracemalloc
+    import discord
+
+    if configuracao == "antes":
+        intents = discord.Intents.default()
+        intents.members = True
+        intents.message_content = True
+        opcoes = {"intents": intents}
+        chunk = True
+    else:
+        sys.path.insert(0, RAIZ)
+        import bot
+        intents = bot.intents
+        opcoes = {"intents": intents, "member_cache_flags": discord.MemberCacheFlags.from_intents(intents),
+                  "chunk_guilds_at_startup": False, "max_messages": bot.CACHE_MENSAGENS}
+        chunk = False
+
+    rss_inicial = rss_mb()
+    tracemalloc.start()
+    cliente = discord.Client(**opcoes)
+    estado = cliente._connection
+    guild = estado._get_create_guild(servidor(membros))
+    if chunk and intents.members:
+        # O que o chunk da inicialização faz: todos os membros em cache
+        for i in range(membros):
+            guild._add_member(discord.Member(data=membro(i), guild=guild, state=estado))
+
+    tratadores = {
+        "MESSAGE_CREATE": estado.parse_message_create,
+        "TYPING_START": estado.parse_typing_start,
+        "MESSAGE_REACTION_ADD": estado.parse_message_reaction_add,
+        "GUILD_MEMBER_UPDATE": estado.parse_guild_member_update,
+    }
+    recebidos = 0
+    inicio = time.process_time()
+    for evento, intent, quantidade in EVENTOS_HORA:
+        if intent is not None and not getattr(intents, intent):
+            continue  # O gateway nem manda
+        recebidos += quantidade
+        tratador = tratadores.get(evento)
+        if tratador is not None:
+            for i in range(quantidade):
+                tratador(payload(evento, i, membros))
+    cpu = time.process_time() - inicio
+    heap = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"  {configuracao:<7} | membros em cache {len(guild.members):>6} | mensagens em cache "
+          f"{len(estado._messages or ()):>5} | eventos/hora {recebidos:>6} (CPU {cpu:.2f} s) | "
+          f"heap {heap / 1024 / 1024:6.1f} MB | RSS +{rss_mb() - rss_inicial:.0f} MB")
+
+
+def main():
+    if len(sys.argv) > 3 and sys.argv[1] == "--filho":
+        medir(sys.argv[2], int(sys.argv[3]))
+        return
+
+    membros = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    print(f"Servidor simulado com {membros} membros e uma hora de eventos:")
+    for configuracao in ("antes", "depois"):
+        with tempfile.TemporaryDirectory() as pasta:
+            subprocess.run(
+                [sys.executable, "-W", "ignore", os.path.abspath(__file__), "--filho", configuracao, str(membros)],
+                cwd=pasta, check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Mede o atraso do event loop com vários usuários navegando na galeria de fotos ao mesmo tempo.
+
+Cada usuário simulado percorre as fotos de fotos-base (começando numa foto
+diferente), pausando um pouco entre os cliques como se esperasse a API. A
+sonda de lag_imagens.py mede o atraso do loop a cada 1 ms. Três jeitos de ler:
+
+- síncrono: open().read() no event loop, como antes da leitura assíncrona
+- thread:    leitura numa thread, sem cache
+- cache:     carregar_foto (thread + cache LRU), lendo a próxima foto
+             antecipadamente como as galerias fazem
+
+Com o cache de disco do sistema quente, ler uma foto leva menos de 1 ms; o
+segundo cenário simula um disco lento somando uma espera a cada leitura.
+
+Uso (na raiz do repositório):
+    python benchmarks/lag_galeria.py [usuarios] [rodadas] [espera_disco_ms]      # padrão: 20 3 5
+"""
+import asyncio
+import os
+import sys
+import time
+
+from lag_imagens import medir
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAUSA_CLIQUE = 0.02  # Tempo da resposta no Discord entre uma página e outra
+
+
+async def rodada(bot, caminhos: list, usuarios: int, espera_disco: float):
+    def ler(caminho):
+        time.sleep(espera_disco)
+        with open(caminho, "rb") as f:
+            return f.read()
+
+    ler_foto_original = bot._ler_foto
+
+    def ler_foto_lento(caminho, mtime_em_cache):
+        if mtime_em_cache is None:  # Só a leitura do arquivo paga o disco lento
+            time.sleep(espera_disco)
+        return ler_foto_original(caminho, mtime_em_cache)
+
+    async def navegar(ler_foto, inicio: int, antecipar: bool):
+        for passo in range(len(caminhos)):
+            posicao = (inicio + passo) % len(caminhos)
+            await ler_foto(caminhos[posicao])
+            if antecipar:
+                bot.criar_tarefa(bot.carregar_foto(caminhos[(posicao + 1) % len(caminhos)]))
+            await asyncio.sleep(PAUSA_CLIQUE)
+
+    async def sincrono(caminho):
+        return ler(caminho)
+
+    async def em_thread(caminho):
+        return await asyncio.to_thread(ler, caminho)
+
+    def cenario(ler_foto, antecipar=False):
+        async def trabalho():
+            await asyncio.gather(*(navegar(ler_foto, u, antecipar) for u in range(usuarios)))
+        return trabalho
+
+    await medir("síncrono", cenario(sincrono), meta_ms=None)
+    await medir("thread", cenario(em_thread), meta_ms=None)
+    bot._cache_fotos.clear()
+    bot._cache_fotos_bytes = 0
+    bot._ler_foto = ler_foto_lento
+    try:
+        await medir("cache", cenario(bot.carregar_foto, antecipar=True), meta_ms=None)
+    finally:
+        bot._ler_foto = ler_foto_original
+
+
+def main():
+    usuarios = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rodadas = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    espera_disco_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 5.0
+    sys.path.insert(0, RAIZ)
+    pasta_fotos = os.path.join(RAIZ, "fotos-base")
+    caminhos = sorted(os.path.join(pasta_fotos, nome) for nome in os.listdir(pasta_fotos) if nome.endswith(".png"))
+    import bot
+
+    tamanho = sum(os.path.getsize(c) for c in caminhos) / len(caminhos) / 1024 / 1024
+    print(f"{usuarios} usuários, {len(caminhos)} fotos (~{tamanho:.1f} MB cada), {os.cpu_count()} CPU(s)")
+    for espera in sorted({0.0, espera_disco_ms}):
+        for numero in range(1, rodadas + 1):
+            print(f"Disco {'com cache do sistema' if not espera else f'lento (+{espera:.0f} ms por leitura)'}, rodada {numero}:")
+            asyncio.run(rodada(bot, caminhos, usuarios, espera / 1000))
+
+
+if __name__ == "__main__":
+    main()
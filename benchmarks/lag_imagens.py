@@ -0,0 +1,113 @@
+"""Mede o atraso do event loop enquanto 50 fotos são redimensionadas.
+
+Uma tarefa sonda o loop a cada 1 ms (asyncio.sleep(0.001)) e anota quanto
+acordou depois do previsto. As mesmas 50 fotos (cópias de uma foto de
+fotos-base, cada uma com um pixel diferente para não cair no cache) passam
+pelas operações de envio dos embeds (redimensionar + selo, JPEG) de três jeitos:
+
+- thread:    asyncio.to_thread, como antes do ProcessadorImagens
+- processos: ProcessadorImagens com IMAGENS_PROCESSOS processos
+- cache:     as mesmas 50 fotos de novo (resultado já em cache)
+
+Meta: atraso abaixo de 5 ms enquanto as 50 imagens são processadas.
+
+Uso (na raiz do repositório):
+    python benchmarks/lag_imagens.py [rodadas]      # padrão: 3
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUANTIDADE_FOTOS = 50
+INTERVALO_SONDA = 0.001
+META_MS = 5.0
+
+
+def preparar_fotos(pasta: str) -> list:
+    from PIL import Image
+
+    origem = os.path.join(RAIZ, "fotos-base", "base 1.png")
+    imagem = Image.open(origem).convert("RGB")
+    caminhos = []
+    for i in range(QUANTIDADE_FOTOS):
+        imagem.putpixel((0, 0), (i, i, i))
+        caminho = os.path.join(pasta, f"foto {i}.png")
+        imagem.save(caminho)
+        caminhos.append(caminho)
+    return caminhos
+
+
+async def medir(nome: str, trabalho, meta_ms: float = META_MS):
+    """Roda `trabalho()` enquanto sonda o loop; imprime tempo total e atrasos (comparados à meta, se houver)."""
+    atrasos = []
+    rodando = True
+
+    async def sondar():
+        while rodando:
+            inicio = time.perf_counter()
+            await asyncio.sleep(INTERVALO_SONDA)
+            atrasos.append((time.perf_counter() - inicio - INTERVALO_SONDA) * 1000)
+
+    sonda = asyncio.create_task(sondar())
+    await asyncio.sleep(0.05)  # A sonda já está rodando quando o trabalho começa
+    atrasos.clear()
+    inicio = time.perf_counter()
+    await trabalho()
+    segundos = time.perf_counter() - inicio
+    rodando = False
+    await sonda
+
+    p99 = statistics.quantiles(atrasos, n=100, method="inclusive")[98] if len(atrasos) > 1 else max(atrasos, default=0.0)
+    maximo = max(atrasos, default=0.0)
+    linha = f"  {nome:<10} {segundos:6.2f} s | atraso p99 {p99:5.1f} ms, máx {maximo:5.1f} ms"
+    if meta_ms is not None:
+        linha += " (ok)" if maximo < meta_ms else f" (acima da meta de {meta_ms:.0f} ms)"
+    print(linha)
+
+
+async def rodada(bot, imagens, caminhos: list):
+    operacoes = (("redimensionar", bot.FOTOS_LARGURA_ENVIO or 1280, bot.FOTOS_LARGURA_ENVIO or 1280),
+                 ("selo", 1, "ocupada"))
+    processador = bot.ProcessadorImagens(bot.IMAGENS_PROCESSOS, bot.IMAGENS_FILA_MAXIMA)
+    processador.iniciar()
+    # Sobe os processos antes de medir (o primeiro trabalho paga o fork e o import do Pillow)
+    await processador.executar(imagens.processar_imagem, caminhos[0], (), "JPEG", 85)
+
+    async def ocioso():
+        await asyncio.sleep(0.5)
+
+    async def com_threads():
+        await asyncio.gather(*(asyncio.to_thread(imagens.processar_imagem, c, operacoes, "JPEG", 85)
+                               for c in caminhos))
+
+    async def com_processos():
+        await asyncio.gather(*(processador.processar(c, operacoes, "JPEG", 85) for c in caminhos))
+
+    await medir("ocioso", ocioso)
+    await medir("thread", com_threads)
+    await medir("processos", com_processos)
+    await medir("cache", com_processos)
+    processador.encerrar()
+
+
+def main():
+    rodadas = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    sys.path.insert(0, RAIZ)
+    with tempfile.TemporaryDirectory() as pasta:
+        os.chdir(pasta)  # O bot cria bases.db no diretório atual
+        import bot
+        import imagens
+
+        caminhos = preparar_fotos(pasta)
+        print(f"{QUANTIDADE_FOTOS} fotos, {bot.IMAGENS_PROCESSOS} processo(s), {os.cpu_count()} CPU(s)")
+        for numero in range(1, rodadas + 1):
+            print(f"Rodada {numero}:")
+            asyncio.run(rodada(bot, imagens, caminhos))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Mede os bytes por registro de histórico e por Base, antes e depois dos __slots__/NamedTuple.
+
+Num banco temporário com N registros de histórico, compara (tracemalloc):
+
+- histórico antes: um dicionário de 6 chaves por linha (como era montado em
+  carregar_bases_do_banco) contra depois: RegistroHistorico._make;
+- Base antes: a mesma classe com __dict__ contra depois: Base com __slots__;
+- carga completa: EstadoLocal.carregar de uma ilha com todo o histórico.
+
+As strings são as mesmas das linhas do sqlite nos dois casos e não entram na conta.
+
+Uso (na raiz do repositório):
+    python benchmarks/memoria_historico.py [registros]      # padrão: 100000
+"""
+import os
+import sys
+import tempfile
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CAMPOS = ("status", "nome", "data", "responsavel", "motivo", "data_registro")
+
+
+def medir(funcao):
+    """Retorna (resultado, bytes alocados por funcao() que continuam vivos)."""
+    antes = tracemalloc.get_traced_memory()[0]
+    resultado = funcao()
+    return resultado, tracemalloc.get_traced_memory()[0] - antes
+
+
+def main():
+    registros = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    sys.path.insert(0, RAIZ)
+    with tempfile.TemporaryDirectory() as pasta:
+        os.chdir(pasta)  # O bot cria bases.db no diretório atual
+        import bot
+
+        bot.init_database()
+        ilha = next(iter(bot.ilhas.values()))
+        conn = bot.pool.obter()
+        conn.executemany(
+            "INSERT INTO historico (guild_id, base_numero, status, nome, responsavel, motivo) VALUES (?, ?, ?, ?, ?, ?)",
+            ((ilha.guild_id, i % ilha.total_bases + 1, ("livre", "reservada", "ocupada")[i % 3],
+              f"Facção {i % 50}", f"adm{i % 7}", "Motivo") for i in range(registros)),
+        )
+        conn.commit()
+        linhas = conn.execute(
+            "SELECT status, nome, data, responsavel, motivo, data_registro FROM historico"
+        ).fetchall()
+        bot.pool.devolver(conn)
+
+        tracemalloc.start()
+        dicts, bytes_dicts = medir(lambda: [dict(zip(CAMPOS, linha)) for linha in linhas])
+        del dicts
+        tuplas, bytes_tuplas = medir(lambda: list(map(bot.RegistroHistorico._make, linhas)))
+        del tuplas
+
+        class BaseComDict:
+            """Base como era antes (sem __slots__)."""
+            def __init__(self, numero, ilha):
+                self.numero = numero
+                self.ilha = ilha
+                self.meta = ilha.obter_meta_base(numero)
+                self.nome = None
+                self.data = None
+                self.responsavel = None
+                self.status = "livre"
+                self.historico = []
+
+        quantidade = 10_000
+        numero = 1
+        antigas, bytes_antigas = medir(lambda: [BaseComDict(numero, ilha) for _ in range(quantidade)])
+        del antigas
+        novas, bytes_novas = medir(lambda: [bot.Base(numero, ilha) for _ in range(quantidade)])
+        del novas
+
+        _, bytes_carga = medir(ilha.estado.carregar)
+        tracemalloc.stop()
+
+    print(f"{registros} registros de histórico (strings compartilhadas não contam)")
+    print(f"  histórico: dict {bytes_dicts / registros:.0f} bytes/linha -> "
+          f"NamedTuple {bytes_tuplas / registros:.0f} bytes/linha")
+    print(f"  Base:      com __dict__ {bytes_antigas / quantidade:.0f} bytes -> "
+          f"__slots__ {bytes_novas / quantidade:.0f} bytes (com a lista de histórico vazia)")
+    print(f"  carga completa da ilha: {bytes_carga / registros:.0f} bytes/linha (inclui as strings)")
+
+
+if __name__ == "__main__":
+    main()
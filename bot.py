@@ -1,47 +1,779 @@
 # bot.py
 import os
 import sqlite3
+import asyncio
 import discord
 from discord import app_commands, ui, Interaction, Embed, Colour
 from discord.ext import commands, tasks
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
 import traceback
+import runpy
+import io
+import json
+import time
+import hashlib
+import re
+import itertools
+import bisect
+import logging
+import threading
+import contextvars
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+import relatorios
+import config
 from config import (
-    GUILD_ID,
-    CANAL_VENDAS_ID,
-    EMBED_TITLE,
-    EMBED_DESCRIPTION,
-    TOTAL_BASES,
-    CARGO_ADM_ID,
+    ESTADO_BACKEND,
+    ESTADO_INTERVALO_POLL,
+    CONFIG_INTERVALO_VERIFICACAO,
+    INTENTS_EXTRAS,
+    CACHE_MENSAGENS,
+    CARGOS_ADM_IDS,
+    CARGOS_MODERADOR_IDS,
+    IMAGENS_PROCESSOS,
+    IMAGENS_FILA_MAXIMA,
+    FOTOS_LARGURA_ENVIO,
+    FOTOS_QUALIDADE_ENVIO,
+    FOTOS_SELO_STATUS,
+    PASTA_CACHE_IMAGENS,
+    AUDITORIA_ARQUIVO,
+    AUDITORIA_MAX_BYTES,
+    AUDITORIA_ARQUIVOS_ANTIGOS,
 )
 
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
 
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
+# Só o necessário: sem cache de membros nem eventos de mensagens em servidores grandes
+intents = discord.Intents.none()
+intents.guilds = True
+for intent in INTENTS_EXTRAS:
+    setattr(intents, intent, True)
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+class ArvoreComandos(app_commands.CommandTree):
+    """Árvore de comandos que segura as interações até as bases serem carregadas."""
+    
+    async def interaction_check(self, interaction: Interaction) -> bool:
+        return await entrar_na_ilha(interaction)
+
+
+class BotBases(commands.Bot):
+    async def setup_hook(self):
+        """Executado uma vez, logo após o login e antes de conectar ao gateway."""
+        # Apenas a MainView precisa ser registrada como persistente
+        self.add_view(MainView())
+        agendador.iniciar()
+        processador_imagens.iniciar()
+        auditoria.iniciar()
+        # O restante (banco, comandos, painel) roda em paralelo com a conexão;
+        # a referência evita que a tarefa seja coletada e expõe uma falha inesperada
+        self.tarefa_inicializacao = self.loop.create_task(inicializar())
+        self.tarefa_inicializacao.add_done_callback(self._inicializacao_terminou)
+    
+    def _inicializacao_terminou(self, tarefa: asyncio.Task):
+        if tarefa.cancelled():
+            return
+        erro = tarefa.exception()
+        if erro is not None:
+            print(f"❌ A inicialização do bot falhou: {erro}")
+            traceback.print_exception(type(erro), erro, erro.__traceback__)
+    
+    async def close(self):
+        await auditoria.encerrar()  # Não perde os eventos que ainda estão na fila
+        processador_imagens.encerrar()
+        await super().close()
+
+bot = BotBases(
+    command_prefix="!",
+    intents=intents,
+    tree_cls=ArvoreComandos,
+    member_cache_flags=discord.MemberCacheFlags.from_intents(intents),
+    chunk_guilds_at_startup=False,
+    max_messages=CACHE_MENSAGENS,
+)
+
+# Contadores de desempenho, exibidos em /metricas
+metricas = Counter()
+
+# -------------------------------------------------
+#  Tarefas em segundo plano
+# -------------------------------------------------
+# O event loop só guarda referências fracas às tarefas: sem esta lista, uma
+# tarefa que ninguém espera pode ser coletada no meio da execução
+_tarefas_segundo_plano = set()
+
+def criar_tarefa(corrotina) -> asyncio.Task:
+    """Cria uma tarefa que ninguém vai esperar, guardando a referência até ela terminar."""
+    tarefa = asyncio.create_task(corrotina)
+    _tarefas_segundo_plano.add(tarefa)
+    tarefa.add_done_callback(_tarefa_terminou)
+    return tarefa
+
+def _tarefa_terminou(tarefa: asyncio.Task):
+    _tarefas_segundo_plano.discard(tarefa)
+    if not tarefa.cancelled() and tarefa.exception() is not None:
+        erro = tarefa.exception()
+        print(f"❌ Erro numa tarefa em segundo plano: {erro}")
+        traceback.print_exception(type(erro), erro, erro.__traceback__)
+
+# -------------------------------------------------
+#  Fila de saída para a API do Discord
+# -------------------------------------------------
+# Prioridades (menor = atende primeiro)
+PRIORIDADE_INTERACAO = 0  # Respostas a quem clicou/usou comando
+PRIORIDADE_PAINEL = 1     # Atualizações do painel principal
+PRIORIDADE_FUNDO = 2      # Tarefas em segundo plano (avisos, limpezas...)
+NOMES_PRIORIDADE = {PRIORIDADE_INTERACAO: "interacao", PRIORIDADE_PAINEL: "painel", PRIORIDADE_FUNDO: "fundo"}
+
+
+class ChamadaREST:
+    """Uma chamada à API esperando na fila do agendador."""
+    __slots__ = ("fabrica", "prioridade", "rota", "chave", "balde", "futuro", "enfileirada", "substituida")
+
+    def __init__(self, fabrica, prioridade, rota, chave, balde, futuro):
+        self.fabrica = fabrica
+        self.prioridade = prioridade
+        self.rota = rota
+        self.chave = chave
+        self.balde = balde
+        self.futuro = futuro
+        self.enfileirada = time.perf_counter()
+        self.substituida = False
+
+
+class AgendadorREST:
+    """Fila com prioridade para as chamadas que o bot faz à API do Discord.
+    
+    Interações passam na frente do painel, que passa na frente das tarefas de fundo.
+    Chamadas com a mesma `chave` se substituem enquanto esperam (só a última edição
+    do painel importa) e chamadas do mesmo `balde` rodam uma de cada vez, na ordem.
+    As respostas iniciais das interações (response.*) não passam por aqui: o Discord
+    exige resposta em 3 segundos e elas têm limite próprio por interação.
+    """
+
+    def __init__(self, trabalhadores: int = 4):
+        self.trabalhadores = trabalhadores
+        self.fila = None
+        self._sequencia = itertools.count()  # Desempate FIFO dentro da mesma prioridade
+        self._pendentes = {}  # chave -> ChamadaREST ainda na fila
+        self._baldes = {}     # balde -> [Lock, usuários]
+        self._tarefas = []
+
+    def iniciar(self):
+        """Cria a fila e os trabalhadores (precisa do event loop rodando)."""
+        if self._tarefas:
+            return
+        self.fila = asyncio.PriorityQueue()
+        self._tarefas = [asyncio.create_task(self._trabalhar()) for _ in range(self.trabalhadores)]
+
+    def agendar(self, fabrica, prioridade: int = PRIORIDADE_FUNDO, rota: str = "outros",
+                chave: Optional[str] = None, balde: Optional[str] = None) -> asyncio.Future:
+        """Enfileira `fabrica()` (uma função que retorna a corrotina da chamada).
+        
+        Retorna um Future com o resultado; se a chamada for substituída por outra
+        com a mesma chave antes de rodar, o Future resolve com None.
+        """
+        futuro = asyncio.get_running_loop().create_future()
+        if self.fila is None:
+            self.iniciar()
+        if chave is not None:
+            anterior = self._pendentes.get(chave)
+            if anterior is not None:
+                anterior.substituida = True
+                if not anterior.futuro.done():
+                    anterior.futuro.set_result(None)
+                metricas["rest_substituidas"] += 1
+        chamada = ChamadaREST(fabrica, prioridade, rota, chave, balde, futuro)
+        if chave is not None:
+            self._pendentes[chave] = chamada
+        self.fila.put_nowait((prioridade, next(self._sequencia), chamada))
+        return futuro
+
+    async def executar(self, fabrica, prioridade: int = PRIORIDADE_INTERACAO, rota: str = "outros",
+                       chave: Optional[str] = None, balde: Optional[str] = None):
+        """Enfileira e espera o resultado da chamada."""
+        return await self.agendar(fabrica, prioridade, rota, chave, balde)
+
+    async def _trabalhar(self):
+        while True:
+            _, _, chamada = await self.fila.get()
+            try:
+                if chamada.chave is not None and self._pendentes.get(chamada.chave) is chamada:
+                    del self._pendentes[chamada.chave]
+                if chamada.substituida or chamada.futuro.done():
+                    continue
+                
+                nome = NOMES_PRIORIDADE.get(chamada.prioridade, str(chamada.prioridade))
+                espera_ms = int((time.perf_counter() - chamada.enfileirada) * 1000)
+                metricas[f"rest_chamadas:{nome}"] += 1
+                metricas[f"rest_espera_ms:{nome}"] += espera_ms
+                metricas[f"rest_espera_max_ms:{nome}"] = max(metricas[f"rest_espera_max_ms:{nome}"], espera_ms)
+                
+                inicio = time.perf_counter()
+                try:
+                    if chamada.balde is None:
+                        resultado = await chamada.fabrica()
+                    else:
+                        async with self._balde(chamada.balde):
+                            resultado = await chamada.fabrica()
+                except Exception as e:
+                    if not chamada.futuro.done():
+                        chamada.futuro.set_exception(e)
+                else:
+                    if not chamada.futuro.done():
+                        chamada.futuro.set_result(resultado)
+                finally:
+                    metricas[f"rest_rota:{chamada.rota}"] += 1
+                    metricas[f"rest_rota_ms:{chamada.rota}"] += int((time.perf_counter() - inicio) * 1000)
+            except Exception as e:
+                print(f"Erro no agendador REST: {e}")
+                traceback.print_exc()
+            finally:
+                self.fila.task_done()
+
+    @asynccontextmanager
+    async def _balde(self, nome: str):
+        entrada = self._baldes.setdefault(nome, [asyncio.Lock(), 0])
+        entrada[1] += 1
+        try:
+            async with entrada[0]:
+                yield
+        finally:
+            entrada[1] -= 1
+            if entrada[1] == 0:
+                del self._baldes[nome]  # Não acumula um Lock por interação
+
+    def tamanho_fila(self) -> int:
+        return self.fila.qsize() if self.fila is not None else 0
+
+
+class ContadorLimites(logging.Handler):
+    """Conta os avisos de rate limit (429) que o discord.py registra no log."""
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            if record.msg.startswith("We are being rate limited"):
+                metricas["rest_429"] += 1
+                if len(record.args) >= 3 and isinstance(record.args[2], (int, float)):
+                    metricas["rest_429_espera_ms"] += int(record.args[2] * 1000)
+            elif record.msg.startswith("Global rate limit has been hit"):
+                metricas["rest_429_global"] += 1
+        except Exception:
+            pass
+
+
+logging.getLogger("discord.http").addHandler(ContadorLimites(logging.WARNING))
+agendador = AgendadorREST()
+
+# -------------------------------------------------
+#  Processamento de imagens em processos separados
+# -------------------------------------------------
+def _assinatura_arquivo(caminho: str, anterior):
+    """Executado numa thread: retorna (mtime, tamanho, sha1) do arquivo, ou None se não existe.
+    
+    Só relê o arquivo se mtime/tamanho mudaram desde a assinatura `anterior`.
+    """
+    try:
+        info = os.stat(caminho)
+    except OSError:
+        return None
+    if anterior is not None and anterior[:2] == (info.st_mtime, info.st_size):
+        return anterior
+    resumo = hashlib.sha1()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            resumo.update(bloco)
+    return info.st_mtime, info.st_size, resumo.hexdigest()
+
+def _ler_cache_disco(arquivo: str) -> Optional[bytes]:
+    try:
+        with open(arquivo, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+def _podar_cache_disco(pasta: str, remover) -> int:
+    """Executado numa thread: apaga da `pasta` as imagens cujo hash da foto satisfaz `remover(hash)`."""
+    removidos = 0
+    try:
+        nomes = os.listdir(pasta)
+    except OSError:
+        return 0
+    for nome in nomes:
+        if nome.endswith(".tmp") or "-" not in nome:
+            continue
+        if remover(nome.split("-", 1)[0]):
+            try:
+                os.remove(os.path.join(pasta, nome))
+                removidos += 1
+            except OSError:
+                pass
+    return removidos
+
+def _gravar_cache_disco(arquivo: str, dados: bytes):
+    """Grava num temporário e renomeia: outro processo nunca lê um arquivo pela metade."""
+    os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+    temporario = f"{arquivo}.{os.getpid()}.tmp"
+    with open(temporario, "wb") as f:
+        f.write(dados)
+    os.replace(temporario, arquivo)
+
+
+class ProcessadorImagens:
+    """Fila de trabalhos de imagem atendida por um pool de processos.
+    
+    O Pillow segura o GIL boa parte do tempo ao decodificar e codificar, então
+    mesmo numa thread ele atrasa o event loop; aqui cada trabalho roda em outro
+    processo. A fila é limitada: com ela cheia, quem pede uma imagem espera uma
+    vaga (contrapressão) em vez de acumular trabalhos sem fim. Os resultados de
+    `processar` ficam em cache por (hash da foto, operações, formato, qualidade),
+    na memória e, se pedido, também em `pasta_cache` (sobrevive a reinícios).
+    """
+
+    def __init__(self, processos: int = 2, fila_maxima: int = 32, cache_max_bytes: int = 32 * 1024 * 1024,
+                 pasta_cache: Optional[str] = None):
+        self.processos = processos
+        self.fila_maxima = fila_maxima
+        self.cache_max_bytes = cache_max_bytes
+        self.pasta_cache = pasta_cache
+        self.fila = None
+        self._loop = None
+        self._executor = None
+        self._tarefas = []
+        self._cache = OrderedDict()  # chave -> bytes, do menos ao mais usado
+        self._cache_bytes = 0
+        self._pendentes = {}   # chave -> Task (a mesma imagem não é gerada duas vezes)
+        self._assinaturas = {}  # caminho -> (mtime, tamanho, sha1)
+
+    def iniciar(self):
+        """Cria a fila e os trabalhadores (precisa do event loop rodando)."""
+        if self._tarefas:
+            return
+        self._loop = asyncio.get_running_loop()
+        self.fila = asyncio.Queue(maxsize=self.fila_maxima)
+        self._tarefas = [asyncio.create_task(self._trabalhar()) for _ in range(self.processos)]
+
+    def _obter_executor(self):
+        if self._executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+            # Processos com prioridade menor: numa máquina com poucas CPUs o event loop
+            # continua sendo atendido primeiro pelo sistema operacional
+            self._executor = ProcessPoolExecutor(max_workers=self.processos, initializer=os.nice, initargs=(10,))
+        return self._executor
+
+    def encerrar(self):
+        """Para os trabalhadores e os processos (chamado ao desligar o bot)."""
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        self._tarefas = []
+        self.fila = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def executar(self, funcao, *args):
+        """Roda `funcao(*args)` num processo de trabalho e espera o resultado.
+        
+        `funcao` precisa ser de nível de módulo (ex.: imagens.renderizar_mapa).
+        """
+        if self.fila is None:
+            self.iniciar()
+        futuro = asyncio.get_running_loop().create_future()
+        if self.fila.full():
+            metricas["imagens_fila_cheia"] += 1
+        await self.fila.put((funcao, args, futuro, time.perf_counter()))
+        return await futuro
+
+    async def _trabalhar(self):
+        from concurrent.futures.process import BrokenProcessPool
+        loop = asyncio.get_running_loop()
+        while True:
+            funcao, args, futuro, enfileirado = await self.fila.get()
+            try:
+                if futuro.done():  # Quem pediu desistiu
+                    continue
+                espera_ms = int((time.perf_counter() - enfileirado) * 1000)
+                metricas["imagens_espera_ms"] += espera_ms
+                metricas["imagens_espera_max_ms"] = max(metricas["imagens_espera_max_ms"], espera_ms)
+                
+                inicio = time.perf_counter()
+                executor = self._obter_executor()
+                try:
+                    resultado = await loop.run_in_executor(executor, funcao, *args)
+                except BrokenProcessPool as e:
+                    # Um processo morreu (ex.: falta de memória): descarta o pool quebrado
+                    # (o outro trabalhador pode já ter feito isso) e recria no próximo trabalho
+                    if self._executor is executor:
+                        self._executor = None
+                        executor.shutdown(wait=False, cancel_futures=True)
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                except Exception as e:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                else:
+                    if not futuro.done():
+                        futuro.set_result(resultado)
+                finally:
+                    metricas["imagens_trabalhos"] += 1
+                    metricas["imagens_ms"] += int((time.perf_counter() - inicio) * 1000)
+            except Exception as e:
+                print(f"Erro no processador de imagens: {e}")
+                traceback.print_exc()
+            finally:
+                self.fila.task_done()
+
+    async def processar(self, caminho: str, operacoes: tuple = (), formato: str = "JPEG",
+                        qualidade: int = 85, em_disco: bool = False) -> Optional[bytes]:
+        """Aplica `operacoes` (ver imagens.processar_imagem) à imagem em `caminho`.
+        
+        Com `em_disco`, o resultado também é guardado em `pasta_cache`.
+        Retorna os bytes gerados, ou None se o arquivo não existe.
+        """
+        anterior = self._assinaturas.get(caminho)
+        assinatura = await asyncio.to_thread(_assinatura_arquivo, caminho, anterior)
+        if assinatura is None:
+            self._assinaturas.pop(caminho, None)
+            return None
+        self._assinaturas[caminho] = assinatura
+        if anterior is not None and anterior[2] != assinatura[2]:
+            self._esquecer_foto(anterior[2])
+        
+        chave = (assinatura[2], operacoes, formato, qualidade)
+        dados = self._cache.get(chave)
+        if dados is not None:
+            self._cache.move_to_end(chave)
+            metricas["imagens_cache_acertos"] += 1
+            return dados
+        
+        tarefa = self._pendentes.get(chave)
+        if tarefa is None:
+            tarefa = self._pendentes[chave] = asyncio.create_task(
+                self._gerar(chave, caminho, operacoes, formato, qualidade, em_disco)
+            )
+            tarefa.add_done_callback(lambda _: self._pendentes.pop(chave, None))
+        return await asyncio.shield(tarefa)
+
+    def processar_em_segundo_plano(self, caminho: str, operacoes: tuple = (), formato: str = "JPEG",
+                                   qualidade: int = 85, em_disco: bool = False):
+        """Deixa a imagem pronta no cache sem esperar por ela. Pode ser chamado de qualquer thread."""
+        if self._loop is None:
+            return
+        
+        async def gerar():
+            try:
+                await self.processar(caminho, operacoes, formato, qualidade, em_disco)
+            except Exception as e:
+                print(f"Erro ao gerar imagem de {caminho} em segundo plano: {e}")
+        
+        self._loop.call_soon_threadsafe(lambda: criar_tarefa(gerar()))
+
+    def _arquivo_cache(self, chave) -> str:
+        hash_foto, operacoes, formato, qualidade = chave
+        parametros = hashlib.sha1(repr((operacoes, formato, qualidade)).encode()).hexdigest()[:16]
+        return os.path.join(self.pasta_cache, f"{hash_foto}-{parametros}.{formato.lower()}")
+
+    async def _gerar(self, chave, caminho: str, operacoes: tuple, formato: str, qualidade: int,
+                     em_disco: bool) -> bytes:
+        arquivo = self._arquivo_cache(chave) if em_disco and self.pasta_cache else None
+        dados = await asyncio.to_thread(_ler_cache_disco, arquivo) if arquivo else None
+        if dados is not None:
+            metricas["imagens_cache_disco"] += 1
+        else:
+            import imagens  # Pillow só é carregado quando a primeira imagem é pedida
+            dados = await self.executar(imagens.processar_imagem, caminho, operacoes, formato, qualidade)
+            if arquivo:
+                try:
+                    await asyncio.to_thread(_gravar_cache_disco, arquivo, dados)
+                except OSError as e:
+                    print(f"Erro ao gravar {arquivo} no cache de imagens: {e}")
+        self._cache[chave] = dados
+        self._cache_bytes += len(dados)
+        while self._cache_bytes > self.cache_max_bytes and len(self._cache) > 1:
+            _, antigos = self._cache.popitem(last=False)
+            self._cache_bytes -= len(antigos)
+        return dados
+
+    def _esquecer_foto(self, hash_foto: str):
+        """A foto foi trocada: tira do cache em disco as versões geradas da foto antiga."""
+        if not self.pasta_cache or any(a[2] == hash_foto for a in self._assinaturas.values()):
+            return  # Outra foto idêntica ainda usa essas imagens
+        criar_tarefa(asyncio.to_thread(_podar_cache_disco, self.pasta_cache, lambda h: h == hash_foto))
+
+    async def limpar_cache_disco(self, caminhos: list) -> int:
+        """Apaga do cache em disco as imagens de fotos que não existem mais em `caminhos`.
+        
+        Chamado na inicialização (uma foto pode ter sido trocada com o bot parado);
+        as assinaturas calculadas ficam guardadas para os próximos envios.
+        """
+        if not self.pasta_cache:
+            return 0
+        validos = set()
+        for caminho in caminhos:
+            assinatura = await asyncio.to_thread(_assinatura_arquivo, caminho, self._assinaturas.get(caminho))
+            if assinatura is not None:
+                self._assinaturas[caminho] = assinatura
+                validos.add(assinatura[2])
+        return await asyncio.to_thread(_podar_cache_disco, self.pasta_cache, lambda h: h not in validos)
+
+    def tamanho_fila(self) -> int:
+        return self.fila.qsize() if self.fila is not None else 0
+
+
+processador_imagens = ProcessadorImagens(IMAGENS_PROCESSOS, IMAGENS_FILA_MAXIMA, pasta_cache=PASTA_CACHE_IMAGENS)
+
+# -------------------------------------------------
+#  Auditoria das ações ADM (eventos JSON em lote)
+# -------------------------------------------------
+class RegistroAuditoria:
+    """Grava eventos de auditoria (um JSON por linha) num arquivo com rotação.
+    
+    `registrar` só coloca o evento numa fila em memória, então quem registra
+    (uma interação, por exemplo) nunca espera disco. Uma tarefa grava a fila
+    numa thread a cada `intervalo` segundos, ou antes disso quando ela chega a
+    `lote_maximo` eventos. Se o disco travar, a fila guarda no máximo
+    `fila_maxima` eventos e descarta os mais antigos (contados em /metricas).
+    """
+
+    def __init__(self, caminho: Optional[str], max_bytes: int = 10 * 1024 * 1024, arquivos_antigos: int = 5,
+                 lote_maximo: int = 200, intervalo: float = 2.0, fila_maxima: int = 100_000):
+        self.caminho = caminho
+        self.max_bytes = max_bytes
+        self.arquivos_antigos = arquivos_antigos
+        self.lote_maximo = lote_maximo
+        self.intervalo = intervalo
+        self._fila = deque(maxlen=fila_maxima)  # deque: seguro para registrar de outras threads
+        self._loop = None
+        self._acordar = None
+        self._acordado = False
+        self._lock = None
+        self._tarefa = None
+
+    def iniciar(self):
+        """Cria a tarefa de gravação (precisa do event loop rodando)."""
+        if self._tarefa is not None or self.caminho is None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._acordar = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._tarefa = asyncio.create_task(self._gravar_periodicamente())
+
+    def registrar(self, tipo: str, **campos):
+        """Enfileira um evento. Pode ser chamado de qualquer thread; não faz E/S."""
+        if self.caminho is None:
+            return
+        if len(self._fila) == self._fila.maxlen:
+            metricas["auditoria_descartados"] += 1
+        self._fila.append({"ts": time.time(), "tipo": tipo, **campos})
+        if len(self._fila) >= self.lote_maximo and self._loop is not None and not self._acordado:
+            self._acordado = True
+            self._loop.call_soon_threadsafe(self._acordar.set)
+
+    async def _gravar_periodicamente(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._acordar.wait(), self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+            self._acordar.clear()
+            self._acordado = False
+            await self.descarregar()
+
+    async def descarregar(self):
+        """Grava tudo o que está na fila, em lotes de até `lote_maximo` (cada um numa thread)."""
+        if self._lock is None:
+            return
+        async with self._lock:  # Mantém a ordem dos lotes no arquivo
+            while self._fila:
+                # Lotes pequenos: a thread segura o GIL pouco tempo de cada vez
+                lote = [self._fila.popleft() for _ in range(min(len(self._fila), self.lote_maximo))]
+                inicio = time.perf_counter()
+                try:
+                    await asyncio.to_thread(self._gravar, lote)
+                except Exception as e:
+                    print(f"Erro ao gravar a auditoria ({len(lote)} eventos perdidos): {e}")
+                    metricas["auditoria_descartados"] += len(lote)
+                    return
+                metricas["auditoria_eventos"] += len(lote)
+                metricas["auditoria_lotes"] += 1
+                metricas["auditoria_gravacao_ms"] += int((time.perf_counter() - inicio) * 1000)
+
+    def _gravar(self, lote: list):
+        for evento in lote:
+            evento["ts"] = datetime.fromtimestamp(evento["ts"], timezone.utc).isoformat(timespec="milliseconds")
+        texto = "\n".join(json.dumps(evento, ensure_ascii=False, default=str) for evento in lote) + "\n"
+        try:
+            tamanho = os.path.getsize(self.caminho)
+        except OSError:
+            tamanho = 0
+        if tamanho and tamanho + len(texto) > self.max_bytes:
+            self._rotacionar()
+        with open(self.caminho, "a", encoding="utf-8") as f:
+            f.write(texto)
+
+    def _rotacionar(self):
+        """auditoria.log -> auditoria.log.1 -> ... (o mais antigo é apagado)."""
+        for i in range(self.arquivos_antigos - 1, 0, -1):
+            if os.path.exists(f"{self.caminho}.{i}"):
+                os.replace(f"{self.caminho}.{i}", f"{self.caminho}.{i + 1}")
+        if self.arquivos_antigos > 0:
+            os.replace(self.caminho, f"{self.caminho}.1")
+        else:
+            os.remove(self.caminho)
+
+    async def encerrar(self):
+        """Para a tarefa e grava o que sobrou na fila."""
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            self._tarefa = None
+        await self.descarregar()
+
+
+auditoria = RegistroAuditoria(AUDITORIA_ARQUIVO, AUDITORIA_MAX_BYTES, AUDITORIA_ARQUIVOS_ANTIGOS)
+
+def registrar_evento(tipo: str, interaction: Optional[Interaction] = None, **campos):
+    """Registra um evento de auditoria com o servidor e o autor da interação (se houver)."""
+    if interaction is not None:
+        campos.setdefault("guild_id", interaction.guild_id)
+        campos["usuario_id"] = interaction.user.id
+        campos["usuario"] = interaction.user.name
+    auditoria.registrar(tipo, **campos)
 
 # -------------------------------------------------
 #  Banco de Dados SQLite
 # -------------------------------------------------
+class RegistroHistorico(NamedTuple):
+    """Uma linha do histórico de uma base (tupla: sem dicionário por registro)."""
+    status: str
+    nome: Optional[str]
+    data: Optional[str]
+    responsavel: Optional[str]
+    motivo: Optional[str]
+    data_registro: Optional[str]
+
+CAMINHO_BANCO = 'bases.db'
+
+class PoolConexoes:
+    """Conexões SQLite reaproveitadas pelas funções do banco de todas as ilhas.
+    
+    Abrir uma conexão custa mais que as consultas simples do bot; cada chamada
+    pega uma conexão livre (ou abre uma nova) e a devolve no fim. No máximo
+    `maximo` conexões ficam guardadas, as demais são fechadas na devolução.
+    """
+    
+    def __init__(self, caminho: str, maximo: int = 4):
+        self.caminho = caminho
+        self.maximo = maximo
+        self._livres = []
+        self._lock = threading.Lock()  # As funções do banco também rodam em threads
+    
+    def obter(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._livres:
+                return self._livres.pop()
+        return sqlite3.connect(self.caminho, check_same_thread=False)
+    
+    def devolver(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()  # Não deixa transação pela metade para o próximo
+        with self._lock:
+            if len(self._livres) < self.maximo:
+                self._livres.append(conn)
+                return
+        conn.close()
+
+
+pool = PoolConexoes(CAMINHO_BANCO)
+
+def migrar_para_ilhas(cursor, guild_id: int):
+    """Converte um banco de antes das várias ilhas: tudo passa a ser da ilha `guild_id`.
+    
+    As tabelas são recriadas com a coluna guild_id (mantendo os ids do histórico);
+    a busca e o resumo do /relatorio são refeitos por init_database.
+    """
+    cursor.execute("BEGIN")
+    cursor.execute('''
+    CREATE TABLE bases_nova (
+        guild_id INTEGER NOT NULL,
+        numero INTEGER NOT NULL,
+        nome TEXT,
+        data TEXT,
+        responsavel TEXT,
+        status TEXT DEFAULT 'livre',
+        data_atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (guild_id, numero)
+    )
+    ''')
+    cursor.execute('''
+    INSERT INTO bases_nova (guild_id, numero, nome, data, responsavel, status, data_atualizacao)
+    SELECT ?, numero, nome, data, responsavel, status, data_atualizacao FROM bases
+    ''', (guild_id,))
+    cursor.execute('''
+    CREATE TABLE historico_nova (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id INTEGER NOT NULL,
+        base_numero INTEGER,
+        status TEXT,
+        nome TEXT,
+        data TEXT,
+        responsavel TEXT,
+        motivo TEXT,
+        data_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (guild_id, base_numero) REFERENCES bases(guild_id, numero)
+    )
+    ''')
+    cursor.execute('''
+    INSERT INTO historico_nova (id, guild_id, base_numero, status, nome, data, responsavel, motivo, data_registro)
+    SELECT id, ?, base_numero, status, nome, data, responsavel, motivo, data_registro FROM historico
+    ''', (guild_id,))
+    
+    # Os triggers e índices antigos vão junto com as tabelas
+    for tabela in ("historico_fts", "historico", "bases", "alteracoes", "relatorio_transicoes", "relatorio_abertas"):
+        cursor.execute(f"DROP TABLE IF EXISTS {tabela}")
+    cursor.execute("ALTER TABLE bases_nova RENAME TO bases")
+    cursor.execute("ALTER TABLE historico_nova RENAME TO historico")
+    
+    cursor.execute("DELETE FROM bot_meta WHERE chave = 'relatorio_ultimo_id'")
+    cursor.execute(
+        "UPDATE bot_meta SET chave = chave || ':' || ? WHERE chave IN ('painel_msg_id', 'painel_hash', 'hash_comandos')",
+        (str(guild_id),)
+    )
+
 def init_database():
     """Inicializa o banco de dados."""
-    conn = sqlite3.connect('bases.db')
+    conn = pool.obter()
     cursor = conn.cursor()
     
-    # Tabela para as bases
+    # WAL: leituras (de outras threads e processos) não esperam as escritas terminarem.
+    # O modo fica gravado no arquivo; por causa do -wal, o /backup usa a API de backup
+    cursor.execute("PRAGMA journal_mode=WAL")
+    
+    # Informações internas do bot (hash dos comandos, ID do painel, ...)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS bot_meta (
+        chave TEXT PRIMARY KEY,
+        valor TEXT
+    )
+    ''')
+    
+    colunas_bases = {linha[1] for linha in cursor.execute("PRAGMA table_info(bases)")}
+    if colunas_bases and "guild_id" not in colunas_bases:
+        print("🔄 Convertendo o banco para várias ilhas (pode demorar com histórico grande)...")
+        migrar_para_ilhas(cursor, ID_ILHA_PRINCIPAL)
+    
+    # Tabela para as bases (cada servidor tem as suas)
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS bases (
-        numero INTEGER PRIMARY KEY,
+        guild_id INTEGER NOT NULL,
+        numero INTEGER NOT NULL,
         nome TEXT,
         data TEXT,
         responsavel TEXT,
         status TEXT DEFAULT 'livre',
-        data_atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        data_atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (guild_id, numero)
     )
     ''')
     
@@ -49,6 +781,7 @@ def init_database():
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS historico (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id INTEGER NOT NULL,
         base_numero INTEGER,
         status TEXT,
         nome TEXT,
@@ -56,196 +789,1254 @@ def init_database():
         responsavel TEXT,
         motivo TEXT,
         data_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (base_numero) REFERENCES bases(numero)
+        FOREIGN KEY (guild_id, base_numero) REFERENCES bases(guild_id, numero)
     )
     ''')
     
-    # Insere as bases padrão se não existirem
-    for i in range(1, TOTAL_BASES + 1):
+    # Tabela de notificação de alterações (lida por outros processos do bot)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS alteracoes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id INTEGER,
+        base_numero INTEGER,
+        data_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    
+    if ESTADO_BACKEND == "sqlite":
+        # Toda escrita em bases/histórico gera uma notificação, venha de qual processo vier
         cursor.execute('''
-        INSERT OR IGNORE INTO bases (numero) VALUES (?)
-        ''', (i,))
+        CREATE TRIGGER IF NOT EXISTS trg_bases_alteracao AFTER UPDATE ON bases
+        BEGIN
+            INSERT INTO alteracoes (guild_id, base_numero) VALUES (NEW.guild_id, NEW.numero);
+        END
+        ''')
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_historico_alteracao AFTER INSERT ON historico
+        BEGIN
+            INSERT INTO alteracoes (guild_id, base_numero) VALUES (NEW.guild_id, NEW.base_numero);
+        END
+        ''')
+    else:
+        # No modo local ninguém lê (nem limpa) as notificações: sem gatilhos, a
+        # tabela não cresce. Remove também as de um uso anterior do modo sqlite.
+        cursor.execute('DROP TRIGGER IF EXISTS trg_bases_alteracao')
+        cursor.execute('DROP TRIGGER IF EXISTS trg_historico_alteracao')
+        cursor.execute('DELETE FROM alteracoes')
+    
+    # Diário das ações ADM: gravado antes de aplicar (ver aplicar_transicao)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS operacoes (
+        chave TEXT PRIMARY KEY,
+        guild_id INTEGER NOT NULL,
+        base_numero INTEGER NOT NULL,
+        acao TEXT NOT NULL,
+        dados TEXT NOT NULL,
+        estado TEXT NOT NULL DEFAULT 'pendente',
+        criada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        concluida_em TIMESTAMP
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_operacoes_pendentes ON operacoes (estado) WHERE estado = 'pendente'
+    ''')
+    
+    # Quem pediu aviso quando uma base ficar livre (base_numero 0 = qualquer base)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS avisos_livre (
+        guild_id INTEGER NOT NULL,
+        base_numero INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (guild_id, base_numero, user_id)
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_avisos_usuario ON avisos_livre (guild_id, user_id)
+    ''')
+    
+    # Resumo incremental do histórico usado pelo /relatorio (ver relatorios.py)
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_historico_base ON historico (guild_id, base_numero, id)
+    ''')
+    # Filtro por período do /exportar_historico
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_historico_data ON historico (guild_id, data_registro)
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS relatorio_transicoes (
+        guild_id INTEGER,
+        base_numero INTEGER,
+        status TEXT,
+        proximo_status TEXT,
+        nome TEXT,
+        quantidade INTEGER,
+        dias REAL,
+        PRIMARY KEY (guild_id, base_numero, status, proximo_status, nome)
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS relatorio_abertas (
+        guild_id INTEGER,
+        base_numero INTEGER,
+        id INTEGER,
+        status TEXT,
+        nome TEXT,
+        momento REAL,
+        PRIMARY KEY (guild_id, base_numero)
+    )
+    ''')
+
+    # Busca textual no histórico (/buscar), mantida em dia pelos triggers abaixo
+    fts_existia = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'historico_fts'"
+    ).fetchone()
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS historico_fts USING fts5(
+        nome, responsavel, motivo, guild_id UNINDEXED, base_numero UNINDEXED,
+        content='historico', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_historico_fts_insert AFTER INSERT ON historico
+    BEGIN
+        INSERT INTO historico_fts (rowid, nome, responsavel, motivo, guild_id, base_numero)
+        VALUES (NEW.id, NEW.nome, NEW.responsavel, NEW.motivo, NEW.guild_id, NEW.base_numero);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_historico_fts_delete AFTER DELETE ON historico
+    BEGIN
+        INSERT INTO historico_fts (historico_fts, rowid, nome, responsavel, motivo, guild_id, base_numero)
+        VALUES ('delete', OLD.id, OLD.nome, OLD.responsavel, OLD.motivo, OLD.guild_id, OLD.base_numero);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_historico_fts_update AFTER UPDATE ON historico
+    BEGIN
+        INSERT INTO historico_fts (historico_fts, rowid, nome, responsavel, motivo, guild_id, base_numero)
+        VALUES ('delete', OLD.id, OLD.nome, OLD.responsavel, OLD.motivo, OLD.guild_id, OLD.base_numero);
+        INSERT INTO historico_fts (rowid, nome, responsavel, motivo, guild_id, base_numero)
+        VALUES (NEW.id, NEW.nome, NEW.responsavel, NEW.motivo, NEW.guild_id, NEW.base_numero);
+    END
+    ''')
+    if not fts_existia:
+        # Bancos antigos (ou recém-convertidos): indexa o histórico que já existia
+        cursor.execute("INSERT INTO historico_fts (historico_fts) VALUES ('rebuild')")
+    
+    # Insere as bases padrão de cada ilha se não existirem
+    for ilha in ilhas.values():
+        cursor.executemany('''
+        INSERT OR IGNORE INTO bases (guild_id, numero) VALUES (?, ?)
+        ''', [(ilha.guild_id, i) for i in range(1, ilha.total_bases + 1)])
     
     conn.commit()
-    conn.close()
+    pool.devolver(conn)
+
+def carregar_base_do_banco(cursor, base_data, ilha):
+    """Monta um objeto Base (com histórico) a partir de uma linha (numero, nome, data, responsavel, status)."""
+    base = Base(base_data[0], ilha)  # numero
+    base.nome = base_data[1]   # nome
+    base.data = base_data[2]   # data
+    base.responsavel = base_data[3]  # responsavel
+    base.status = base_data[4]  # status
+    
+    # Carrega histórico
+    cursor.execute('''
+    SELECT status, nome, data, responsavel, motivo, data_registro 
+    FROM historico 
+    WHERE guild_id = ? AND base_numero = ? 
+    ORDER BY data_registro DESC
+    ''', (ilha.guild_id, base.numero))
+    
+    base.historico = list(map(RegistroHistorico._make, cursor.fetchall()))
+    
+    return base
 
-def carregar_bases_do_banco():
-    """Carrega as bases do banco de dados."""
-    conn = sqlite3.connect('bases.db')
+SQL_SELECIONAR_BASES = '''
+SELECT numero, nome, data, responsavel, status FROM bases WHERE guild_id = ?
+'''
+
+def carregar_bases_do_banco(ilha):
+    """Carrega as bases da ilha do banco de dados."""
+    conn = pool.obter()
     cursor = conn.cursor()
     
-    cursor.execute('SELECT * FROM bases ORDER BY numero')
+    cursor.execute(SQL_SELECIONAR_BASES + ' ORDER BY numero', (ilha.guild_id,))
     bases_data = cursor.fetchall()
     
     # Reconstrói a lista de objetos Base
-    bases_atuais = []
-    for base_data in bases_data:
-        base = Base(base_data[0])  # numero
-        base.nome = base_data[1]   # nome
-        base.data = base_data[2]   # data
-        base.responsavel = base_data[3]  # responsavel
-        base.status = base_data[4]  # status
-        
-        # Carrega histórico
-        cursor.execute('''
-        SELECT status, nome, data, responsavel, motivo, data_registro 
-        FROM historico 
-        WHERE base_numero = ? 
-        ORDER BY data_registro DESC
-        ''', (base.numero,))
-        
-        historico_data = cursor.fetchall()
-        base.historico = []
-        for registro in historico_data:
-            base.historico.append({
-                'status': registro[0],
-                'nome': registro[1],
-                'data': registro[2],
-                'responsavel': registro[3],
-                'motivo': registro[4],
-                'data_registro': registro[5]
-            })
-        
-        bases_atuais.append(base)
-    
-    conn.close()
+    bases_atuais = [carregar_base_do_banco(cursor, base_data, ilha) for base_data in bases_data]
+    
+    pool.devolver(conn)
     return bases_atuais
 
-def salvar_base(base):
-    """Salva uma base no banco de dados."""
-    conn = sqlite3.connect('bases.db')
+def copiar_banco(destino: str):
+    """Cópia consistente do banco (inclui o que ainda está no arquivo -wal)."""
+    origem = pool.obter()
+    copia = sqlite3.connect(destino)
+    try:
+        origem.backup(copia)
+    finally:
+        copia.close()
+        pool.devolver(origem)
+
+def ler_meta(chave: str):
+    """Lê um valor da tabela bot_meta (ou None)."""
+    conn = pool.obter()
+    cursor = conn.cursor()
+    
+    cursor.execute('SELECT valor FROM bot_meta WHERE chave = ?', (chave,))
+    linha = cursor.fetchone()
+    
+    pool.devolver(conn)
+    return linha[0] if linha else None
+
+def gravar_meta(chave: str, valor: str):
+    """Grava um valor na tabela bot_meta."""
+    conn = pool.obter()
     cursor = conn.cursor()
     
-    cursor.execute('''
-    UPDATE bases 
-    SET nome = ?, data = ?, responsavel = ?, status = ?, data_atualizacao = CURRENT_TIMESTAMP
-    WHERE numero = ?
-    ''', (base.nome, base.data, base.responsavel, base.status, base.numero))
+    cursor.execute('INSERT OR REPLACE INTO bot_meta (chave, valor) VALUES (?, ?)', (chave, valor))
+    
+    conn.commit()
+    pool.devolver(conn)
+
+# -------------------------------------------------
+#  Diário de operações (ações ADM à prova de queda)
+# -------------------------------------------------
+# Operações concluídas ficam no diário por este tempo (para detectar reenvios)
+DIAS_DIARIO_OPERACOES = 30
+
+class Transicao(NamedTuple):
+    """Mudança de status pedida por um modal ADM (gravada no diário como JSON)."""
+    acao: str
+    status_esperado: str  # Status que a base precisa ter para a ação valer
+    status: str
+    nome: Optional[str]
+    data: Optional[str]
+    responsavel: Optional[str]
+    historico: tuple  # Registros (status, nome, data, responsavel, motivo) gravados junto
+
+def _executar_operacao(cursor, chave: str, guild_id: int, numero: int, transicao: Transicao) -> str:
+    """Aplica uma operação do diário numa única transação. Retorna 'aplicada' ou 'desfeita'."""
+    cursor.execute("BEGIN IMMEDIATE")  # Lê e grava sem outro processo no meio
+    linha = cursor.execute(
+        "SELECT status FROM bases WHERE guild_id = ? AND numero = ?", (guild_id, numero)
+    ).fetchone()
+    if linha is None or linha[0] != transicao.status_esperado:
+        estado = "desfeita"
+    else:
+        cursor.executemany('''
+        INSERT INTO historico (guild_id, base_numero, status, nome, data, responsavel, motivo)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(guild_id, numero, *registro) for registro in transicao.historico])
+        cursor.execute('''
+        UPDATE bases 
+        SET nome = ?, data = ?, responsavel = ?, status = ?, data_atualizacao = CURRENT_TIMESTAMP
+        WHERE guild_id = ? AND numero = ?
+        ''', (transicao.nome, transicao.data, transicao.responsavel, transicao.status, guild_id, numero))
+        estado = "aplicada"
+    cursor.execute(
+        "UPDATE operacoes SET estado = ?, concluida_em = CURRENT_TIMESTAMP WHERE chave = ?", (estado, chave)
+    )
+    cursor.connection.commit()
+    return estado
+
+def _gravar_transicao(chave: str, guild_id: int, numero: int, transicao: Transicao) -> str:
+    """Executado numa thread: grava a ação no diário e a aplica no banco."""
+    conn = pool.obter()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+        INSERT OR IGNORE INTO operacoes (chave, guild_id, base_numero, acao, dados)
+        VALUES (?, ?, ?, ?, ?)
+        ''', (chave, guild_id, numero, transicao.acao, json.dumps(transicao._asdict())))
+        if cursor.rowcount == 0:
+            metricas["operacoes_duplicadas"] += 1
+            return "duplicada"
+        conn.commit()  # Diário gravado: se o processo cair daqui em diante, recuperar_operacoes conclui
+        return _executar_operacao(cursor, chave, guild_id, numero, transicao)
+    finally:
+        pool.devolver(conn)
+
+async def aplicar_transicao(chave: str, base, transicao: Transicao) -> str:
+    """Registra a ação no diário com a chave de idempotência e depois a aplica.
+    
+    `chave` é o ID da interação: um reenvio da mesma interação pelo Discord
+    encontra a chave já gravada e não faz nada. O histórico e a base são
+    gravados na mesma transação, então nunca ficam pela metade. O banco é
+    acessado numa thread; a base em memória é atualizada aqui, no event loop.
+    Retorna 'aplicada', 'desfeita' (a base não estava mais no status esperado;
+    nada foi alterado) ou 'duplicada'.
+    """
+    resultado = await asyncio.to_thread(_gravar_transicao, chave, base.ilha.guild_id, base.numero, transicao)
+    
+    if resultado == "aplicada":
+        status_anterior = base.status
+        base.status = transicao.status
+        base.nome = transicao.nome
+        base.data = transicao.data
+        base.responsavel = transicao.responsavel
+        base.ilha.estado.registrar_alteracao(base)
+        if base.status != status_anterior:
+            preparar_foto_envio(base)  # O selo da foto acompanha o status
+    return resultado
+
+def recuperar_operacoes() -> Counter:
+    """Conclui as operações que ficaram pendentes no diário (processo interrompido).
+    
+    Cada uma é aplicada se a base ainda está no status esperado; senão é marcada
+    como desfeita. Também limpa as operações concluídas há mais de
+    DIAS_DIARIO_OPERACOES dias. Retorna a contagem por resultado.
+    """
+    contagem = Counter()
+    conn = pool.obter()
+    cursor = conn.cursor()
+    try:
+        pendentes = cursor.execute('''
+        SELECT chave, guild_id, base_numero, dados FROM operacoes WHERE estado = 'pendente' ORDER BY rowid
+        ''').fetchall()
+        for chave, guild_id, numero, dados in pendentes:
+            transicao = Transicao(**json.loads(dados))
+            resultado = _executar_operacao(cursor, chave, guild_id, numero, transicao)
+            contagem[resultado] += 1
+            auditoria.registrar(
+                "transicao_recuperada", guild_id=guild_id, base=numero, acao=transicao.acao,
+                de=transicao.status_esperado, para=transicao.status, resultado=resultado, chave=chave,
+            )
+            print(f"🔁 Ação '{transicao.acao}' na base {numero} (servidor {guild_id}) estava pendente: {resultado}.")
+        cursor.execute(
+            "DELETE FROM operacoes WHERE estado != 'pendente' AND concluida_em < datetime('now', ?)",
+            (f"-{DIAS_DIARIO_OPERACOES} days",)
+        )
+        conn.commit()
+    finally:
+        pool.devolver(conn)
+    return contagem
+
+# -------------------------------------------------
+#  Avisos de base livre (/avisar_quando_livre)
+# -------------------------------------------------
+AVISOS_POR_USUARIO = 10      # Inscrições de uma pessoa em cada servidor
+AVISOS_POR_LOTE = 10         # DMs enviadas por vez numa liberação...
+AVISOS_INTERVALO_LOTE = 1.0  # ...com esta pausa (segundos) entre os lotes
+MENCOES_POR_MENSAGEM = 50    # Quem não recebe DM é mencionado no canal de vendas
+
+def inscrever_aviso(guild_id: int, numero: int, user_id: int) -> Optional[bool]:
+    """Inscreve o usuário para ser avisado quando a base (0 = qualquer uma) ficar livre.
+    
+    Retorna True se inscreveu, False se já estava inscrito e None se atingiu
+    AVISOS_POR_USUARIO.
+    """
+    conn = pool.obter()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        total = cursor.execute(
+            "SELECT COUNT(*) FROM avisos_livre WHERE guild_id = ? AND user_id = ?", (guild_id, user_id)
+        ).fetchone()[0]
+        if total >= AVISOS_POR_USUARIO:
+            return None
+        cursor.execute('''
+        INSERT OR IGNORE INTO avisos_livre (guild_id, base_numero, user_id) VALUES (?, ?, ?)
+        ''', (guild_id, numero, user_id))
+        inscrito = cursor.rowcount > 0
+        conn.commit()
+    finally:
+        pool.devolver(conn)
+    return inscrito
+
+def cancelar_avisos(guild_id: int, user_id: int, numero: Optional[int] = None) -> int:
+    """Remove as inscrições do usuário (todas, ou só a da base). Retorna quantas removeu."""
+    conn = pool.obter()
+    cursor = conn.cursor()
+    try:
+        if numero is None:
+            cursor.execute("DELETE FROM avisos_livre WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
+        else:
+            cursor.execute(
+                "DELETE FROM avisos_livre WHERE guild_id = ? AND user_id = ? AND base_numero = ?",
+                (guild_id, user_id, numero)
+            )
+        removidos = cursor.rowcount
+        conn.commit()
+    finally:
+        pool.devolver(conn)
+    return removidos
+
+def retirar_avisos(guild_id: int, numero: int) -> list:
+    """Retira (apaga e retorna) quem pediu aviso da base ou de qualquer base da ilha.
+    
+    Os avisos valem uma vez: quem quiser ser avisado de novo se inscreve de novo.
+    A entrega é "no máximo uma vez": as inscrições são apagadas antes do envio,
+    então dois processos nunca avisam a mesma pessoa, mas se o bot cair (ou o
+    Discord falhar) no meio dos envios, quem faltava não é avisado.
+    """
+    conn = pool.obter()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")  # Outro processo não avisa as mesmas pessoas
+        usuarios = [linha[0] for linha in cursor.execute('''
+        SELECT DISTINCT user_id FROM avisos_livre WHERE guild_id = ? AND base_numero IN (?, 0)
+        ''', (guild_id, numero))]
+        cursor.execute(
+            "DELETE FROM avisos_livre WHERE guild_id = ? AND base_numero IN (?, 0)", (guild_id, numero)
+        )
+        conn.commit()
+    finally:
+        pool.devolver(conn)
+    return usuarios
+
+# -------------------------------------------------
+#  Busca no histórico (FTS5)
+# -------------------------------------------------
+RESULTADOS_POR_PAGINA = 10
+CAMPOS_BUSCA = ("nome", "responsavel", "motivo")
+
+def montar_consulta_fts(texto: str, campo: Optional[str] = None, prefixo: bool = False) -> Optional[str]:
+    """Transforma o texto digitado numa consulta FTS5 segura (todas as palavras, na coluna pedida).
+    
+    Com `prefixo`, a última palavra casa com qualquer termo que comece com ela.
+    Retorna None se o texto não tiver nenhuma palavra.
+    """
+    palavras = re.findall(r"\w+", texto)
+    if not palavras:
+        return None
+    termos = [f'"{palavra}"' for palavra in palavras]
+    if prefixo:
+        termos[-1] += "*"
+    expressao = " ".join(termos)
+    if campo in CAMPOS_BUSCA:
+        expressao = f"{campo} : ({expressao})"
+    return expressao
+
+def buscar_historico(guild_id: int, consulta: str, base: Optional[int] = None, antes_de: Optional[int] = None,
+                     limite: int = RESULTADOS_POR_PAGINA) -> list:
+    """Registros do histórico da ilha que casam com a consulta FTS5, do mais novo para o mais antigo.
+    
+    A paginação é por chave: `antes_de` é o id do último registro da página anterior.
+    """
+    condicoes = ["historico_fts MATCH ?", "guild_id = ?"]
+    parametros = [consulta, guild_id]
+    if base is not None:
+        condicoes.append("base_numero = ?")
+        parametros.append(base)
+    if antes_de is not None:
+        condicoes.append("rowid < ?")
+        parametros.append(antes_de)
+    parametros.append(limite)
+    
+    conn = pool.obter()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f'''
+        SELECT id, base_numero, status, nome, responsavel, motivo, data_registro
+        FROM historico
+        WHERE id IN (
+            SELECT rowid FROM historico_fts
+            WHERE {" AND ".join(condicoes)}
+            ORDER BY rowid DESC LIMIT ?
+        )
+        ORDER BY id DESC
+        ''', parametros)
+        return cursor.fetchall()
+    finally:
+        pool.devolver(conn)  # Também numa consulta FTS inválida
+
+def sugerir_nomes(guild_id: int, texto: str, coluna: str = "nome", limite: int = 25) -> list:
+    """Nomes distintos (facções ou responsáveis) da ilha que começam com o texto, para o autocomplete."""
+    consulta = montar_consulta_fts(texto, coluna, prefixo=True)
+    conn = pool.obter()
+    cursor = conn.cursor()
+    try:
+        if consulta:
+            cursor.execute(f'''
+            SELECT DISTINCT {coluna} FROM historico
+            WHERE id IN (
+                SELECT rowid FROM historico_fts WHERE historico_fts MATCH ? AND guild_id = ?
+                ORDER BY rowid DESC LIMIT 500
+            )
+            LIMIT ?
+            ''', (consulta, guild_id, limite))
+        else:
+            # Sem texto: os nomes usados mais recentemente
+            cursor.execute(f'''
+            SELECT DISTINCT {coluna} FROM (
+                SELECT {coluna} FROM historico
+                WHERE guild_id = ? AND {coluna} IS NOT NULL ORDER BY id DESC LIMIT 500
+            )
+            LIMIT ?
+            ''', (guild_id, limite))
+        return [linha[0] for linha in cursor.fetchall() if linha[0]]
+    finally:
+        pool.devolver(conn)
+
+# -------------------------------------------------
+#  Dados estáticos das bases (coordenadas, fotos)
+# -------------------------------------------------
+# Fotos reduzidas ou com selo vão em JPEG; sem nenhum dos dois, vai o PNG original
+FOTOS_PROCESSADAS = FOTOS_LARGURA_ENVIO is not None or FOTOS_SELO_STATUS
+
+class MetaBase:
+    """Dados fixos de uma base, calculados uma única vez e compartilhados."""
+    __slots__ = ("numero", "x", "y", "z", "cds", "foto_path", "nome_anexo", "nome_ilha")
+    
+    def __init__(self, numero: int, cds: str, pasta_fotos: str, nome_ilha: str):
+        self.numero = numero
+        self.cds = cds
+        try:
+            self.x, self.y, self.z = (float(v) for v in cds.split(","))
+        except ValueError:
+            # Base sem coordenadas válidas
+            self.x = self.y = self.z = None
+        self.foto_path = f"{pasta_fotos}/base {numero}.png"
+        # Nome do arquivo anexado nos embeds (as fotos processadas vão em JPEG)
+        self.nome_anexo = f"base_{numero}.jpg" if FOTOS_PROCESSADAS else f"base_{numero}.png"
+        self.nome_ilha = nome_ilha
+
+
+class IndiceEspacial:
+    """Grade uniforme sobre (x, y) das bases para buscas por proximidade.
+    
+    O tamanho da célula é escolhido para ter ~1 base por célula, então as
+    buscas visitam poucas células mesmo com milhares de bases. A distância
+    retornada é a 3D; a grade só em (x, y) continua válida como limite inferior.
+    """
+    
+    def __init__(self):
+        self.tamanho = 1.0
+        self.celulas = {}  # (cx, cy) -> [MetaBase, ...]
+        self.limites = None  # (cx_min, cy_min, cx_max, cy_max)
+    
+    def reconstruir(self, metas):
+        pontos = [m for m in metas if m.x is not None]
+        self.celulas = {}
+        self.limites = None
+        if not pontos:
+            return
+        
+        xs = [m.x for m in pontos]
+        ys = [m.y for m in pontos]
+        area = max(max(xs) - min(xs), 1.0) * max(max(ys) - min(ys), 1.0)
+        self.tamanho = max((area / len(pontos)) ** 0.5, 1.0)
+        
+        for m in pontos:
+            self.celulas.setdefault(self._celula(m.x, m.y), []).append(m)
+        cxs = [c[0] for c in self.celulas]
+        cys = [c[1] for c in self.celulas]
+        self.limites = (min(cxs), min(cys), max(cxs), max(cys))
+    
+    def _celula(self, x: float, y: float) -> tuple:
+        return (int(x // self.tamanho), int(y // self.tamanho))
+    
+    @staticmethod
+    def _distancia(m, x: float, y: float, z: float) -> float:
+        return ((m.x - x) ** 2 + (m.y - y) ** 2 + (m.z - z) ** 2) ** 0.5
+    
+    def mais_proximas(self, x: float, y: float, z: float, quantidade: int, filtro=None) -> list:
+        """Retorna até `quantidade` pares (distância, MetaBase), do mais próximo ao mais distante.
+        
+        `filtro(numero) -> bool` restringe as bases consideradas.
+        """
+        if not self.limites or quantidade < 1:
+            return []
+        
+        cx, cy = self._celula(x, y)
+        cx_min, cy_min, cx_max, cy_max = self.limites
+        # Anéis começam na borda da grade (consulta fora da área) e vão até cobri-la inteira
+        anel = max(cx_min - cx, cx - cx_max, cy_min - cy, cy - cy_max, 0)
+        anel_max = max(cx - cx_min, cx_max - cx, cy - cy_min, cy_max - cy)
+        
+        melhores = []
+        while anel <= anel_max:
+            for celula in self._anel(cx, cy, anel):
+                for m in self.celulas.get(celula, ()):
+                    if filtro is None or filtro(m.numero):
+                        melhores.append((self._distancia(m, x, y, z), m.numero, m))
+            if len(melhores) >= quantidade:
+                melhores.sort()
+                del melhores[quantidade:]
+                # Qualquer base num anel seguinte está a pelo menos anel * tamanho
+                if melhores[-1][0] <= anel * self.tamanho:
+                    break
+            anel += 1
+        
+        melhores.sort()
+        return [(d, m) for d, _, m in melhores[:quantidade]]
+    
+    def dentro_do_raio(self, x: float, y: float, z: float, raio: float, filtro=None) -> list:
+        """Retorna os pares (distância, MetaBase) a até `raio` de distância, ordenados."""
+        if not self.limites or raio < 0:
+            return []
+        
+        cx0, cy0 = self._celula(x - raio, y - raio)
+        cx1, cy1 = self._celula(x + raio, y + raio)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) <= len(self.celulas):
+            celulas = (self.celulas.get((cx, cy), ()) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1))
+        else:
+            # Raio maior que a grade: mais barato percorrer só as células ocupadas
+            celulas = (ms for (cx, cy), ms in self.celulas.items() if cx0 <= cx <= cx1 and cy0 <= cy <= cy1)
+        
+        encontradas = []
+        for ms in celulas:
+            for m in ms:
+                d = self._distancia(m, x, y, z)
+                if d <= raio and (filtro is None or filtro(m.numero)):
+                    encontradas.append((d, m.numero, m))
+        encontradas.sort()
+        return [(d, m) for d, _, m in encontradas]
+    
+    @staticmethod
+    def _anel(cx: int, cy: int, anel: int):
+        if anel == 0:
+            yield (cx, cy)
+            return
+        for dx in range(-anel, anel + 1):
+            yield (cx + dx, cy - anel)
+            yield (cx + dx, cy + anel)
+        for dy in range(-anel + 1, anel):
+            yield (cx - anel, cy + dy)
+            yield (cx + anel, cy + dy)
+
+
+# -------------------------------------------------
+#  Estrutura de dados das bases
+# -------------------------------------------------
+class Base:
+    __slots__ = ("numero", "ilha", "meta", "nome", "data", "responsavel", "status", "historico")
+    
+    def __init__(self, numero: int, ilha):
+        self.numero = numero
+        self.ilha = ilha
+        self.meta = ilha.obter_meta_base(numero)  # Coordenadas fixas, foto, etc.
+        self.nome = None
+        self.data = None
+        self.responsavel = None
+        self.status = "livre"  # livre | reservada | ocupada
+        self.historico = []
+    
+    @property
+    def cds(self) -> str:
+        return self.meta.cds
+    
+    @property
+    def foto_path(self) -> str:
+        return self.meta.foto_path
+    
+    def info_detalhada(self, mostrar_cds: bool = False, mostrar_nome: bool = True) -> str:
+        """Retorna informações detalhadas da base."""
+        status_emoji = "🟢" if self.status == "livre" else "🔴" if self.status == "ocupada" else "🟡"
+        info = f"{status_emoji} **Base {self.numero}** - {self.status.title()}\n"
+        
+        if mostrar_cds:  # Apenas para ADM
+            info += f"**Coordenadas:** {self.cds}\n"
+        
+        if mostrar_nome and self.nome:
+            info += f"**Facção:** {self.nome}\n"
+        
+        if self.data:
+            info += f"**Data/Hora:** {self.data}\n"
+        
+        if self.responsavel and self.status in ["ocupada", "reservada"] and mostrar_nome:
+            info += f"**Responsável:** {self.responsavel}\n"
+        
+        # Adiciona histórico recente se houver
+        if self.historico and mostrar_nome:  # Histórico apenas para ADM
+            ultimo = self.historico[0]  # Mais recente
+            info += f"\n**Última alteração:**\n"
+            info += f"Data: {ultimo.data_registro}\n"
+            if ultimo.responsavel:
+                info += f"Responsável: {ultimo.responsavel}\n"
+            if ultimo.motivo:
+                info += f"Motivo: {ultimo.motivo}"
+        
+        return info
+    
+    def info_simples(self, mostrar_nome: bool = False) -> str:
+        """Retorna informações simples da base (apenas status)."""
+        status_emoji = "🟢" if self.status == "livre" else "🔴" if self.status == "ocupada" else "🟡"
+        info = f"{status_emoji} **Base {self.numero}** - {self.status.title()}"
+        
+        if mostrar_nome and self.nome:
+            info += f" ({self.nome})"
+        
+        return info
+
+# -------------------------------------------------
+#  Backend de estado (registro das bases)
+# -------------------------------------------------
+class EstadoLocal:
+    """Registro de bases de uma ilha mantido apenas na memória deste processo (padrão)."""
+    
+    def __init__(self, ilha):
+        self.ilha = ilha
+        self.bases = []
+        self._por_numero = {}
+        self._por_status = {}      # status -> números das bases, em ordem
+        self._status_indexado = {}  # número -> status com que está no índice
+        self.versao = 0  # Incrementada a cada alteração conhecida pelo processo
+    
+    def carregar(self):
+        """Carrega (ou recarrega) todas as bases do banco de dados."""
+        self.substituir(carregar_bases_do_banco(self.ilha))
+    
+    async def recarregar(self):
+        """Como carregar, mas lendo o banco numa thread; a troca acontece no event loop."""
+        self.substituir(await asyncio.to_thread(carregar_bases_do_banco, self.ilha))
+    
+    def substituir(self, bases: list):
+        """Troca as bases da ilha pelas lidas do banco e refaz os índices."""
+        self.bases[:] = bases
+        self._por_numero = {b.numero: b for b in self.bases}
+        self._por_status = {}
+        self._status_indexado = {}
+        for base in self.bases:
+            self.indexar(base)
+        self.versao += 1
+    
+    def obter(self, numero: int):
+        """Retorna a base com o número informado (ou None)."""
+        return self._por_numero.get(numero)
+    
+    def indexar(self, base):
+        """Move a base para a lista do seu status atual no índice por status."""
+        anterior = self._status_indexado.get(base.numero)
+        if anterior == base.status:
+            return
+        if anterior is not None:
+            numeros = self._por_status[anterior]
+            del numeros[bisect.bisect_left(numeros, base.numero)]
+        bisect.insort(self._por_status.setdefault(base.status, []), base.numero)
+        self._status_indexado[base.numero] = base.status
+    
+    def numeros_por_status(self, *status) -> list:
+        """Números das bases nos status pedidos (todas, se nenhum), em ordem."""
+        if not status:
+            return [b.numero for b in self.bases]
+        if len(status) == 1:
+            return list(self._por_status.get(status[0], ()))  # Cópia: o índice muda a cada transição
+        return sorted(n for s in status for n in self._por_status.get(s, []))
+    
+    def bases_com_status(self, *status) -> list:
+        """Bases nos status pedidos, em ordem de número."""
+        return [self._por_numero[n] for n in self.numeros_por_status(*status)]
+    
+    def registrar_alteracao(self, base):
+        """Chamado depois de cada escrita feita por este processo."""
+        self.indexar(base)
+        self.versao += 1
+    
+    async def iniciar(self):
+        """Inicia a sincronização com outros processos (nada a fazer no modo local)."""
+        pass
+
+
+class EstadoSQLite(EstadoLocal):
+    """Registro compartilhado entre processos através do próprio bases.db.
+    
+    Cada escrita gera uma linha em `alteracoes` (via triggers). O observador
+    (um só para todas as ilhas) entrega a cada estado as bases dele que mudaram.
+    """
+    
+    def __init__(self, ilha):
+        super().__init__(ilha)
+        self._ultimo_historico = {}  # número -> id do registro de histórico mais novo já carregado
+    
+    def carregar(self):
+        # Marca o ponto de partida antes da primeira carga: alterações feitas
+        # durante a carga serão reaplicadas na próxima verificação.
+        observador.preparar()
+        super().carregar()
+        conn = pool.obter()
+        try:
+            self._ultimo_historico = dict(conn.execute(
+                'SELECT base_numero, MAX(id) FROM historico WHERE guild_id = ? GROUP BY base_numero',
+                (self.ilha.guild_id,)
+            ))
+        finally:
+            pool.devolver(conn)
+    
+    async def iniciar(self):
+        observador.iniciar()
+    
+    def ler_alteracoes(self, cursor, numeros) -> list:
+        """Executado na thread do observador: lê do banco o que mudou nas bases informadas.
+        
+        Do histórico vêm só os registros mais novos que os já carregados; uma base
+        que este processo ainda não conhece vem inteira.
+        """
+        lidas = []
+        for numero in numeros:
+            cursor.execute(SQL_SELECIONAR_BASES + ' AND numero = ?', (self.ilha.guild_id, numero))
+            base_data = cursor.fetchone()
+            if not base_data:
+                continue
+            if self.obter(numero) is None:
+                nova = carregar_base_do_banco(cursor, base_data, self.ilha)
+                ultimo = cursor.execute(
+                    'SELECT MAX(id) FROM historico WHERE guild_id = ? AND base_numero = ?',
+                    (self.ilha.guild_id, numero)
+                ).fetchone()[0]
+                lidas.append((numero, nova, [], ultimo))
+                continue
+            novos = cursor.execute('''
+            SELECT id, status, nome, data, responsavel, motivo, data_registro
+            FROM historico WHERE guild_id = ? AND base_numero = ? AND id > ?
+            ORDER BY id
+            ''', (self.ilha.guild_id, numero, self._ultimo_historico.get(numero, 0))).fetchall()
+            lidas.append((numero, base_data, novos, novos[-1][0] if novos else None))
+        return lidas
+    
+    def aplicar_alteracoes(self, lidas: list):
+        """Aplica na memória (no event loop) o que ler_alteracoes trouxe.
+        
+        As escritas deste próprio processo também voltam pelo observador; como
+        aplicar_transicao já atualizou a base, só o histórico novo é acrescentado.
+        """
+        mudou = False
+        for numero, dados, novos, ultimo in lidas:
+            if ultimo is not None:
+                self._ultimo_historico[numero] = ultimo
+            atual = self.obter(numero)
+            if isinstance(dados, Base):  # Base que este processo ainda não tinha
+                if atual is None:
+                    self.bases.append(dados)
+                    self.bases.sort(key=lambda b: b.numero)
+                    self._por_numero[numero] = dados
+                    self.indexar(dados)
+                    mudou = True
+                continue
+            if atual is None:
+                continue
+            # Mais novo primeiro, como em carregar_base_do_banco
+            atual.historico[:0] = [RegistroHistorico._make(linha[1:]) for linha in reversed(novos)]
+            _, nome, data, responsavel, status = dados
+            if (atual.nome, atual.data, atual.responsavel, atual.status) == (nome, data, responsavel, status):
+                continue  # Escrita deste processo, já aplicada
+            # Atualiza no lugar para que views abertas vejam o novo estado
+            status_anterior = atual.status
+            atual.nome = nome
+            atual.data = data
+            atual.responsavel = responsavel
+            atual.status = status
+            self.indexar(atual)
+            mudou = True
+            if atual.status != status_anterior:
+                preparar_foto_envio(atual)  # Mudança feita por outro processo
+        if mudou:
+            self.versao += 1
+
+
+class ObservadorAlteracoes:
+    """Acompanha as alterações feitas por outros processos, para todas as ilhas.
+    
+    Usa uma única conexão e consulta `PRAGMA data_version` periodicamente, o
+    que não custa nada enquanto ninguém escreve; só então lê as linhas novas
+    de `alteracoes` e relê apenas as bases alteradas (e o histórico novo delas),
+    ilha por ilha.
+    """
+    
+    def __init__(self, intervalo: float):
+        self.intervalo = intervalo
+        self._conn = None
+        self._data_version = None
+        self._ultima_alteracao = 0
+        self._tarefa = None
+    
+    def preparar(self):
+        """Abre a conexão e lê os marcadores (só na primeira vez)."""
+        if self._conn is not None:
+            return
+        self._conn = sqlite3.connect(CAMINHO_BANCO, check_same_thread=False)
+        self._data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+        self._ultima_alteracao = self._conn.execute(
+            'SELECT COALESCE(MAX(id), 0) FROM alteracoes'
+        ).fetchone()[0]
+    
+    def iniciar(self):
+        if self._tarefa is None:
+            self._tarefa = asyncio.create_task(self._observar())
+    
+    async def _observar(self):
+        while True:
+            await asyncio.sleep(self.intervalo)
+            try:
+                await self.verificar_alteracoes()
+            except Exception as e:
+                print(f"Erro ao sincronizar estado das bases: {e}")
+    
+    async def verificar_alteracoes(self) -> bool:
+        """Aplica as alterações feitas no banco. Retorna True se houve mudança.
+        
+        A leitura roda numa thread (o banco pode estar ocupado por outro processo);
+        só a atualização da memória acontece no event loop.
+        """
+        lidas = await asyncio.to_thread(self._ler)
+        for ilha, alteracoes in lidas:
+            ilha.estado.aplicar_alteracoes(alteracoes)
+        return bool(lidas)
+    
+    def _ler(self) -> list:
+        """Executado numa thread: retorna [(ilha, alterações lidas)] desde a última verificação."""
+        data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+        if data_version == self._data_version:
+            return []
+        self._data_version = data_version
+        
+        cursor = self._conn.cursor()
+        cursor.execute(
+            'SELECT id, guild_id, base_numero FROM alteracoes WHERE id > ? ORDER BY id',
+            (self._ultima_alteracao,)
+        )
+        linhas = cursor.fetchall()
+        if not linhas:
+            return []
+        self._ultima_alteracao = linhas[-1][0]
+        
+        por_ilha = {}
+        for _, guild_id, numero in linhas:
+            por_ilha.setdefault(guild_id, set()).add(numero)
+        lidas = []
+        for guild_id, numeros in por_ilha.items():
+            ilha = ilhas.get(guild_id)
+            if ilha is not None:  # Ilha de outro processo, que este não atende
+                lidas.append((ilha, ilha.estado.ler_alteracoes(cursor, numeros)))
+        
+        # Remove notificações antigas (todos os processos já as leram)
+        cursor.execute("DELETE FROM alteracoes WHERE data_registro < datetime('now', '-10 minutes')")
+        self._conn.commit()
+        return lidas
+
+
+observador = ObservadorAlteracoes(ESTADO_INTERVALO_POLL)
+
+def criar_estado(ilha):
+    """Cria o backend de estado configurado em ESTADO_BACKEND para a ilha."""
+    if ESTADO_BACKEND == "sqlite":
+        return EstadoSQLite(ilha)
+    return EstadoLocal(ilha)
+
+# -------------------------------------------------
+#  Ilhas (um servidor do Discord = uma ilha)
+# -------------------------------------------------
+# Chaves de cada ilha; na ilha principal são as constantes do config.py em maiúsculas
+CHAVES_ILHA = (
+    "canal_vendas_id", "cargo_adm_id", "embed_title", "embed_description",
+    "total_bases", "coordenadas_bases", "pasta_fotos", "nome_ilha",
+)
+# As que podem mudar sem reiniciar o bot
+CHAVES_RECARREGAVEIS = (
+    "embed_title", "embed_description", "total_bases", "coordenadas_bases", "pasta_fotos", "nome_ilha",
+)
+
+def validar_config_ilha(cfg: dict, rotulo: str):
+    """Levanta ValueError se a configuração de uma ilha estiver inválida."""
+    for chave in ("guild_id", "canal_vendas_id"):
+        if not isinstance(cfg.get(chave), int):
+            raise ValueError(f"{rotulo}: {chave} deve ser um número inteiro.")
+    if not isinstance(cfg.get("embed_title"), str) or not isinstance(cfg.get("embed_description"), str):
+        raise ValueError(f"{rotulo}: EMBED_TITLE e EMBED_DESCRIPTION devem ser textos.")
+    if not isinstance(cfg.get("total_bases"), int) or cfg["total_bases"] < 1:
+        raise ValueError(f"{rotulo}: TOTAL_BASES deve ser um número inteiro positivo.")
+    if not isinstance(cfg.get("coordenadas_bases"), dict):
+        raise ValueError(f"{rotulo}: COORDENADAS_BASES deve ser um dicionário.")
+    if not isinstance(cfg.get("pasta_fotos"), str) or not isinstance(cfg.get("nome_ilha"), str):
+        raise ValueError(f"{rotulo}: PASTA_FOTOS e NOME_ILHA devem ser textos.")
+
+def configs_ilhas(valores: dict) -> dict:
+    """Monta a configuração de cada ilha (guild_id -> dict) a partir das variáveis do config.py.
+    
+    A ilha principal vem das constantes em maiúsculas; cada item de ILHAS_EXTRAS
+    herda dela as chaves que não definir. Levanta ValueError se algo estiver inválido.
+    """
+    principal = {"guild_id": valores.get("GUILD_ID")}
+    principal.update({chave: valores.get(chave.upper()) for chave in CHAVES_ILHA})
+    validar_config_ilha(principal, "Ilha principal")
+    configs = {principal["guild_id"]: principal}
+    
+    extras = valores.get("ILHAS_EXTRAS", [])
+    if not isinstance(extras, list):
+        raise ValueError("ILHAS_EXTRAS deve ser uma lista.")
+    for posicao, extra in enumerate(extras, 1):
+        rotulo = f"ILHAS_EXTRAS[{posicao}]"
+        if not isinstance(extra, dict):
+            raise ValueError(f"{rotulo}: cada ilha deve ser um dicionário.")
+        for chave in ("guild_id", "canal_vendas_id"):
+            if chave not in extra:
+                raise ValueError(f"{rotulo}: {chave} é obrigatório.")
+        desconhecidas = set(extra) - {"guild_id", *CHAVES_ILHA}
+        if desconhecidas:
+            raise ValueError(f"{rotulo}: chaves desconhecidas: {', '.join(sorted(desconhecidas))}.")
+        cfg = {**principal, **extra}
+        validar_config_ilha(cfg, rotulo)
+        if cfg["guild_id"] in configs:
+            raise ValueError(f"{rotulo}: o servidor {cfg['guild_id']} aparece mais de uma vez.")
+        configs[cfg["guild_id"]] = cfg
+    return configs
+
+
+class Ilha:
+    """Um servidor atendido pelo bot, com suas bases, painel e caches.
+    
+    Tudo que é por ilha fica aqui; o banco (pool de conexões), o cache de
+    fotos e a fila da API são compartilhados entre todas.
+    """
+    
+    def __init__(self, cfg: dict):
+        self.guild_id = cfg["guild_id"]
+        self.canal_vendas_id = cfg["canal_vendas_id"]
+        self.cargo_adm_id = cfg["cargo_adm_id"]
+        self.meta_bases = {}
+        self.indice_espacial = IndiceEspacial()
+        self.configurar(cfg)
+        self.estado = criar_estado(self)
+        
+        # Mapa renderizado e folhas de miniaturas: refeitos quando a versão do estado muda
+        self.cache_mapa = {"versao": None, "png": None}
+        self.lock_mapa = asyncio.Lock()
+        self.cache_folhas = {"versao": None, "folhas": {}}
+        self.lock_folhas = asyncio.Lock()
+        # Relatório do histórico: calculado no máximo uma vez por dia
+        self.cache_relatorio = {"dia": None, "dados": None}
+    
+    def configurar(self, cfg: dict):
+        """Aplica os valores recarregáveis e remonta os dados fixos das bases."""
+        self.embed_title = cfg["embed_title"]
+        self.embed_description = cfg["embed_description"]
+        self.total_bases = cfg["total_bases"]
+        self.coordenadas_bases = cfg["coordenadas_bases"]
+        self.pasta_fotos = cfg["pasta_fotos"]
+        self.nome_ilha = cfg["nome_ilha"]
+        self.montar_meta_bases()
+    
+    @property
+    def bases(self) -> list:
+        return self.estado.bases
+    
+    def montar_meta_bases(self):
+        """(Re)monta a tabela de dados fixos e o índice espacial a partir da configuração."""
+        self.meta_bases.clear()
+        for numero in sorted(set(range(1, self.total_bases + 1)) | set(self.coordenadas_bases)):
+            self.obter_meta_base(numero)
+        self.indice_espacial.reconstruir(self.meta_bases.values())
+    
+    def obter_meta_base(self, numero: int) -> MetaBase:
+        """Retorna os dados fixos da base, criando a entrada se ainda não existir."""
+        meta = self.meta_bases.get(numero)
+        if meta is None:
+            cds = self.coordenadas_bases.get(numero, "Coordenadas não definidas")
+            meta = self.meta_bases[numero] = MetaBase(numero, cds, self.pasta_fotos, self.nome_ilha)
+        return meta
+
+
+# As bases são carregadas do banco em inicializar(), em paralelo com a conexão
+ilhas = {guild_id: Ilha(cfg) for guild_id, cfg in configs_ilhas(vars(config)).items()}
+ID_ILHA_PRINCIPAL = next(iter(ilhas))  # Dona das bases de bancos antigos (ver migrar_para_ilhas)
+GUILDS_COMANDOS = [discord.Object(id=guild_id) for guild_id in ilhas]
+estado_pronto = asyncio.Event()
+
+_ilha_atual = contextvars.ContextVar("ilha_atual")
+
+def ilha_atual() -> Ilha:
+    """Ilha do servidor da interação sendo atendida (definida por entrar_na_ilha)."""
+    return _ilha_atual.get()
+
+# Quanto uma interação espera pelas bases antes de responder que o bot está iniciando
+# (o Discord exige a primeira resposta em até 3 segundos)
+ESPERA_ESTADO_PRONTO = 2.0
+
+async def entrar_na_ilha(interaction: Interaction) -> bool:
+    """Segura a interação até as bases serem carregadas e seleciona a ilha do servidor.
+    
+    Chamado no interaction_check da árvore de comandos, das views e dos modais;
+    o discord.py roda o callback na mesma tarefa, então ele enxerga a ilha.
+    """
+    try:
+        await asyncio.wait_for(estado_pronto.wait(), ESPERA_ESTADO_PRONTO)
+    except asyncio.TimeoutError:
+        # Banco ainda carregando (ou sendo tentado de novo): responde em vez de travar
+        if interaction.type != discord.InteractionType.autocomplete and not interaction.response.is_done():
+            await interaction.response.send_message("⏳ O bot está iniciando, tente novamente em instantes.", ephemeral=True)
+        return False
+    ilha = ilhas.get(interaction.guild_id)
+    if ilha is None:
+        if interaction.type != discord.InteractionType.autocomplete and not interaction.response.is_done():
+            await interaction.response.send_message("❌ Este servidor não está configurado no bot.", ephemeral=True)
+        return False
+    _ilha_atual.set(ilha)
+    return True
+
+# -------------------------------------------------
+#  Funções auxiliares
+# -------------------------------------------------
+async def publicar_painel(ilha: Ilha, criar: bool = False):
+    """Edita o painel principal no canal de vendas da ilha (ou envia um novo, se `criar`).
+    
+    Usa o ID salvo em bot_meta para editar direto, sem buscar a mensagem;
+    o histórico do canal só é varrido se o painel salvo não existir mais.
+    Retorna a mensagem do painel (ou None).
+    """
+    channel = bot.get_channel(ilha.canal_vendas_id)
+    if not channel:
+        return None
+    
+    async def editar(msg):
+        embed, file = await get_painel_main(ilha)
+        return await msg.edit(embed=embed, view=MainView(), attachments=[file] if file else [])
     
-    conn.commit()
-    conn.close()
+    assinatura = hash_painel(ilha)
+    msg_id = await asyncio.to_thread(ler_meta, f"painel_msg_id:{ilha.guild_id}")
+    if msg_id:
+        try:
+            msg = await editar(channel.get_partial_message(int(msg_id)))
+            await asyncio.to_thread(gravar_meta, f"painel_hash:{ilha.guild_id}", assinatura)
+            return msg
+        except discord.NotFound:
+            pass  # Painel apagado: procura no histórico
+    
+    async for msg in channel.history(limit=200):
+        if msg.author == bot.user and msg.embeds:
+            msg = await editar(msg)
+            break
+    else:
+        if not criar:
+            return None
+        embed, file = await get_painel_main(ilha)
+        if file:
+            msg = await channel.send(embed=embed, view=MainView(), file=file)
+        else:
+            msg = await channel.send(embed=embed, view=MainView())
+    
+    await asyncio.to_thread(gravar_meta, f"painel_msg_id:{ilha.guild_id}", str(msg.id))
+    await asyncio.to_thread(gravar_meta, f"painel_hash:{ilha.guild_id}", assinatura)
+    return msg
 
-def adicionar_historico(base, status, nome=None, data=None, responsavel=None, motivo=None):
-    """Adiciona um registro ao histórico no banco de dados."""
-    conn = sqlite3.connect('bases.db')
-    cursor = conn.cursor()
+def hash_painel(ilha: Ilha) -> str:
+    """Hash do conteúdo do painel principal (embed + status de cada base, que define o mapa)."""
+    dados = {
+        "embed": get_embed_main(ilha).to_dict(),
+        "bases": [(b.numero, b.status) for b in ilha.bases],
+    }
+    return hashlib.sha256(json.dumps(dados, sort_keys=True, default=str).encode()).hexdigest()
+
+async def reconciliar_painel() -> int:
+    """Reedita os painéis cujo conteúdo publicado não corresponde mais ao estado atual.
     
-    cursor.execute('''
-    INSERT INTO historico (base_numero, status, nome, data, responsavel, motivo)
-    VALUES (?, ?, ?, ?, ?, ?)
-    ''', (base.numero, status, nome, data, responsavel, motivo))
+    Usado nas reconexões: se nada mudou, não faz nenhuma chamada à API.
+    Retorna quantos painéis foram reeditados.
+    """
+    pendentes = []
+    for ilha in ilhas.values():
+        publicado = await asyncio.to_thread(ler_meta, f"painel_hash:{ilha.guild_id}")
+        if publicado != hash_painel(ilha):
+            pendentes.append(agendar_painel(ilha, criar=True))
+    await asyncio.gather(*pendentes)
+    return len(pendentes)
+
+def agendar_painel(ilha: Ilha, criar: bool = False) -> asyncio.Future:
+    """Coloca a publicação do painel da ilha na fila da API.
     
-    conn.commit()
-    conn.close()
+    Várias atualizações seguidas viram uma só: a que ainda está esperando é
+    descartada, já que a próxima vai publicar o estado mais recente de qualquer jeito.
+    """
+    return agendador.agendar(
+        lambda: publicar_painel(ilha, criar=criar),
+        PRIORIDADE_PAINEL, rota="painel",
+        # Uma edição simples não pode descartar um pedido para recriar o painel
+        chave=f"painel:{ilha.guild_id}" + (":criar" if criar else ""), balde=f"painel:{ilha.guild_id}",
+    )
 
-# Inicializa o banco de dados
-init_database()
+async def enviar_followup(interaction: Interaction, content: Optional[str] = None, **kwargs):
+    """Envia um followup da interação pela fila da API, na frente do painel."""
+    return await agendador.executar(
+        lambda: interaction.followup.send(content, **kwargs),
+        PRIORIDADE_INTERACAO, rota="followup", balde=f"interacao:{interaction.id}",
+    )
 
-# -------------------------------------------------
-#  Estrutura de dados das bases com coordenadas fixas
-# -------------------------------------------------
-class Base:
-    def __init__(self, numero: int):
-        self.numero = numero
-        self.cds = self.get_coordenadas_fixas()  # Coordenadas fixas para cada base
-        self.nome = None
-        self.data = None
-        self.responsavel = None
-        self.status = "livre"  # livre | reservada | ocupada
-        self.foto_path = f"fotos-base/base {self.numero}.png"
-        self.historico = []
+def atualizar_painel_principal(ilha: Optional[Ilha] = None):
+    """Atualiza o painel principal no canal de vendas (da ilha da interação, se não informada)."""
+    ilha = ilha or ilha_atual()
     
-    def get_coordenadas_fixas(self):
-        """Retorna as coordenadas fixas para cada base."""
-        coordenadas = {
-            1: "4767.86, -6014.95, 31.93",
-            2: "4733.57, -5608.5, 35.08",
-            3: "4818.07, -5280.29, 22.43",
-            4: "4854.77, -4929.04, 15.08",
-            5: "5526.66, -5874.5, 36.75",
-            6: "4671.42, -4648.25, 17.98",
-            7: "4142.85, -4465.0, 14.14",
-            8: "5579.31, -5169.58, 26.44",
-            9: "4835.74, -4279.06, 17.09",
-            10: "5045.78, -4458.42, 15.13",
-            11: "5385.28, -5088.19, 26.67",
-            12: "5196.73, -4696.33, 14.05",
-            13: "5144.96, -4839.99, 19.12",
-            14: "5095.63, -5055.89, 14.52"
-        }
-        return coordenadas.get(self.numero, "Coordenadas não definidas")
+    async def atualizar():
+        try:
+            await agendar_painel(ilha)
+        except Exception as e:
+            print(f"Erro ao atualizar painel principal: {e}")
     
-    def info_detalhada(self, mostrar_cds: bool = False, mostrar_nome: bool = True) -> str:
-        """Retorna informações detalhadas da base."""
-        status_emoji = "🟢" if self.status == "livre" else "🔴" if self.status == "ocupada" else "🟡"
-        info = f"{status_emoji} **Base {self.numero}** - {self.status.title()}\n"
-        
-        if mostrar_cds:  # Apenas para ADM
-            info += f"**Coordenadas:** {self.cds}\n"
-        
-        if mostrar_nome and self.nome:
-            info += f"**Facção:** {self.nome}\n"
-        
-        if self.data:
-            info += f"**Data/Hora:** {self.data}\n"
-        
-        if self.responsavel and self.status in ["ocupada", "reservada"] and mostrar_nome:
-            info += f"**Responsável:** {self.responsavel}\n"
-        
-        # Adiciona histórico recente se houver
-        if self.historico and mostrar_nome:  # Histórico apenas para ADM
-            ultimo = self.historico[0]  # Mais recente
-            info += f"\n**Última alteração:**\n"
-            info += f"Data: {ultimo['data_registro']}\n"
-            if ultimo['responsavel']:
-                info += f"Responsável: {ultimo['responsavel']}\n"
-            if ultimo['motivo']:
-                info += f"Motivo: {ultimo['motivo']}"
-        
-        return info
+    criar_tarefa(atualizar())
+
+async def _enviar_dm_aviso(user_id: int, texto: str) -> bool:
+    """Envia a DM de aviso. Retorna False se a pessoa não aceita DMs do bot."""
+    try:
+        canal = await bot.create_dm(discord.Object(id=user_id))
+        await canal.send(texto)
+        return True
+    except (discord.Forbidden, discord.NotFound):
+        return False
+
+async def avisar_base_livre(ilha: Ilha, numero: int):
+    """Avisa os inscritos que a base ficou livre (chamado depois de desocupar/disponibilizar).
     
-    def info_simples(self, mostrar_nome: bool = False) -> str:
-        """Retorna informações simples da base (apenas status)."""
-        status_emoji = "🟢" if self.status == "livre" else "🔴" if self.status == "ocupada" else "🟡"
-        info = f"{status_emoji} **Base {self.numero}** - {self.status.title()}"
+    As DMs vão pela fila da API com prioridade de fundo, em lotes com pausa,
+    para não disputar limite com as interações. Quem não aceita DM é
+    mencionado numa única mensagem no canal de vendas. As inscrições são
+    retiradas antes dos envios (ver retirar_avisos): cada aviso sai no máximo uma vez.
+    """
+    try:
+        usuarios = await asyncio.to_thread(retirar_avisos, ilha.guild_id, numero)
+        if not usuarios:
+            return
+        texto = (
+            f"🟢 A **Base {numero}** ({ilha.nome_ilha}) acabou de ficar **livre**!\n"
+            f"Veja o painel em <#{ilha.canal_vendas_id}> para garantir a sua."
+        )
+        inicio = time.perf_counter()
+        sem_dm = []
+        for i in range(0, len(usuarios), AVISOS_POR_LOTE):
+            if i:
+                await asyncio.sleep(AVISOS_INTERVALO_LOTE)
+            lote = usuarios[i:i + AVISOS_POR_LOTE]
+            resultados = await asyncio.gather(*(
+                agendador.agendar(lambda uid=uid: _enviar_dm_aviso(uid, texto), PRIORIDADE_FUNDO, rota="aviso_dm")
+                for uid in lote
+            ), return_exceptions=True)
+            sem_dm += [uid for uid, ok in zip(lote, resultados) if ok is not True]
         
-        if mostrar_nome and self.nome:
-            info += f" ({self.nome})"
+        canal = bot.get_channel(ilha.canal_vendas_id)
+        if sem_dm and canal is not None:
+            for i in range(0, len(sem_dm), MENCOES_POR_MENSAGEM):
+                mencoes = " ".join(f"<@{uid}>" for uid in sem_dm[i:i + MENCOES_POR_MENSAGEM])
+                await agendador.agendar(
+                    lambda mencoes=mencoes: canal.send(
+                        f"🟢 A **Base {numero}** acabou de ficar **livre**! {mencoes}",
+                        allowed_mentions=discord.AllowedMentions(users=True, everyone=False, roles=False),
+                    ),
+                    PRIORIDADE_FUNDO, rota="aviso_canal",
+                )
         
-        return info
-
-# Carrega as bases do banco de dados
-bases = carregar_bases_do_banco()
+        metricas["avisos_enviados"] += len(usuarios) - len(sem_dm)
+        metricas["avisos_mencoes"] += len(sem_dm)
+        print(
+            f"🔔 Base {numero} de {ilha.nome_ilha} livre: {len(usuarios)} aviso(s) "
+            f"({len(sem_dm)} por menção) em {time.perf_counter() - inicio:.1f} s"
+        )
+    except Exception as e:
+        print(f"Erro ao avisar que a base {numero} ficou livre: {e}")
+        traceback.print_exc()
 
-# -------------------------------------------------
-#  Funções auxiliares
-# -------------------------------------------------
-def atualizar_painel_principal():
-    """Atualiza o painel principal no canal de vendas."""
-    channel = bot.get_channel(CANAL_VENDAS_ID)
-    if channel:
-        async def encontrar_e_atualizar():
-            async for msg in channel.history(limit=200):
-                if msg.author == bot.user and msg.embeds:
-                    embed = get_embed_main()
-                    await msg.edit(embed=embed, view=MainView())
-                    return True
-            return False
-        
-        import asyncio
-        asyncio.create_task(encontrar_e_atualizar())
-
-def get_embed_main() -> Embed:
-    """Embed principal que será enviado no canal de vendas."""
+def get_embed_main(ilha: Ilha) -> Embed:
+    """Embed principal que será enviado no canal de vendas da ilha."""
     embed = Embed(
-        title=EMBED_TITLE,
-        description=EMBED_DESCRIPTION,
+        title=ilha.embed_title,
+        description=ilha.embed_description,
         colour=Colour.gold(),
     )
     
-    livres = sum(1 for b in bases if b.status == "livre")
-    reservadas = sum(1 for b in bases if b.status == "reservada")
-    ocupadas = sum(1 for b in bases if b.status == "ocupada")
+    livres = len(ilha.estado.numeros_por_status("livre"))
+    reservadas = len(ilha.estado.numeros_por_status("reservada"))
+    ocupadas = len(ilha.estado.numeros_por_status("ocupada"))
     
     embed.add_field(
         name="📊 Status das Bases",
@@ -253,24 +2044,89 @@ def get_embed_main() -> Embed:
             f"🟢 **{livres}** Bases Livres\n"
             f"🟡 **{reservadas}** Bases Reservadas\n"
             f"🔴 **{ocupadas}** Bases Ocupadas\n"
-            f"📦 **Total:** {TOTAL_BASES} Bases"
+            f"📦 **Total:** {ilha.total_bases} Bases"
         ),
         inline=False
     )
     
     return embed
 
+async def obter_mapa_png(ilha: Ilha) -> bytes:
+    """Retorna o PNG do mapa com todas as bases da ilha, coloridas pelo status."""
+    cache = ilha.cache_mapa
+    async with ilha.lock_mapa:
+        if cache["versao"] != ilha.estado.versao:
+            versao = ilha.estado.versao
+            pontos = [
+                (b.numero, b.meta.x, b.meta.y, b.status)
+                for b in ilha.bases if b.meta.x is not None
+            ]
+            import imagens  # Pillow só é carregado quando a primeira imagem é pedida
+            cache["png"] = await processador_imagens.executar(imagens.renderizar_mapa, pontos)
+            cache["versao"] = versao
+        return cache["png"]
+
+async def arquivo_mapa(ilha: Ilha):
+    """Retorna o mapa da ilha como discord.File (ou None se não foi possível gerar)."""
+    try:
+        return discord.File(io.BytesIO(await obter_mapa_png(ilha)), filename="mapa.png")
+    except Exception as e:
+        print(f"Erro ao gerar mapa das bases: {e}")
+        return None
+
+async def get_painel_main(ilha: Ilha) -> tuple:
+    """Embed principal da ilha com o mapa anexado. Retorna (embed, file)."""
+    embed = get_embed_main(ilha)
+    file = await arquivo_mapa(ilha)
+    if file:
+        embed.set_image(url="attachment://mapa.png")
+    return embed, file
+
+# Folhas de miniaturas (ADM): geradas num processo separado, em cache por versão do estado
+MINIATURAS_POR_PAGINA = 20
+
+def total_paginas_miniaturas() -> int:
+    return max((len(ilha_atual().bases) + MINIATURAS_POR_PAGINA - 1) // MINIATURAS_POR_PAGINA, 1)
+
+def _itens_folha(bases_pagina: list) -> list:
+    """Executado numa thread: acrescenta o mtime das fotos (None se não existe) para a folha."""
+    itens = []
+    for numero, caminho, status in bases_pagina:
+        try:
+            mtime = os.path.getmtime(caminho)
+        except OSError:
+            mtime = None
+        itens.append((numero, caminho, mtime, status))
+    return itens
+
+async def obter_folha_miniaturas(pagina: int) -> bytes:
+    """Retorna o JPEG com as miniaturas da página (0 = primeira) de bases da ilha atual."""
+    ilha = ilha_atual()
+    cache = ilha.cache_folhas
+    async with ilha.lock_folhas:
+        if cache["versao"] != ilha.estado.versao:
+            cache["versao"] = ilha.estado.versao
+            cache["folhas"] = {}
+        folhas = cache["folhas"]
+        if pagina not in folhas:
+            inicio = pagina * MINIATURAS_POR_PAGINA
+            bases_pagina = [(b.numero, b.foto_path, b.status) for b in ilha.bases[inicio:inicio + MINIATURAS_POR_PAGINA]]
+            itens = await asyncio.to_thread(_itens_folha, bases_pagina)
+            import imagens
+            folhas[pagina] = await processador_imagens.executar(imagens.gerar_folha_contato, itens)
+        return folhas[pagina]
+
 def listar_bases_simples(mostrar_nome: bool = False) -> str:
     """Retorna uma string formatada com todas as bases (apenas status)."""
     lista = ""
-    for b in bases:
+    for b in ilha_atual().bases:
         lista += b.info_simples(mostrar_nome=mostrar_nome) + "\n"
     return lista or "Nenhuma base encontrada."
 
 def listar_bases_completo(mostrar_cds: bool = False, mostrar_nome: bool = True) -> str:
     """Retorna uma string formatada com todas as bases e suas informações (apenas ADM)."""
     lista = ""
-    for b in bases:
+    for b in ilha_atual().bases:
         if b.status == "livre":
             lista += "🟢 "
         elif b.status == "ocupada":
@@ -298,7 +2154,7 @@ def listar_bases_completo(mostrar_cds: bool = False, mostrar_nome: bool = True)
 def listar_bases(filtro: str = None, mostrar_cds: bool = False, mostrar_nome: bool = True) -> str:
     """Retorna uma string formatada com as bases filtradas."""
     lista = ""
-    for b in bases:
+    for b in ilha_atual().bases:
         if filtro and b.status != filtro:
             continue
         
@@ -321,9 +2177,9 @@ def listar_bases(filtro: str = None, mostrar_cds: bool = False, mostrar_nome: bo
     
     return lista or "Nenhuma base encontrada."
 
-def get_base_info_embed(base_num: int, mostrar_cds: bool = False, mostrar_nome: bool = True) -> tuple:
+async def get_base_info_embed(base_num: int, mostrar_cds: bool = False, mostrar_nome: bool = True) -> tuple:
     """Retorna um embed com informações detalhadas de uma base específica."""
-    base = next((b for b in bases if b.numero == base_num), None)
+    base = ilha_atual().estado.obter(base_num)
     if not base:
         return Embed(title="Base não encontrada", colour=Colour.red()), None, False
     
@@ -349,9 +2205,9 @@ def get_base_info_embed(base_num: int, mostrar_cds: bool = False, mostrar_nome:
     file = None
     foto_carregada = False
     try:
-        if os.path.exists(base.foto_path):
-            file = discord.File(base.foto_path, filename=f"base_{base.numero}.png")
-            embed.set_image(url=f"attachment://base_{base.numero}.png")
+        file = await arquivo_foto(base)
+        if file:
+            embed.set_image(url=f"attachment://{base.meta.nome_anexo}")
             foto_carregada = True
         else:
             embed.add_field(name="⚠️ Aviso", value="Foto da base não encontrada.", inline=False)
@@ -361,6 +2217,7 @@ def get_base_info_embed(base_num: int, mostrar_cds: bool = False, mostrar_nome:
     
     # Adiciona os campos de informação
     embed.add_field(name="Status", value=f"{status_emoji} {base.status.title()}", inline=True)
+    embed.add_field(name="Localização", value=base.meta.nome_ilha, inline=True)
     
     if mostrar_cds:  # Apenas para ADM
         embed.add_field(name="Coordenadas", value=base.cds, inline=True)
@@ -377,15 +2234,15 @@ def get_base_info_embed(base_num: int, mostrar_cds: bool = False, mostrar_nome:
     if base.historico and mostrar_nome:
         historico_text = ""
         for i, registro in enumerate(base.historico[:5], 1):  # 5 mais recentes
-            status_emoji_hist = "🟢" if registro['status'] == "livre" else "🔴" if registro['status'] == "ocupada" else "🟡"
-            data_formatada = registro['data_registro'].split('.')[0] if registro['data_registro'] else "Data desconhecida"
-            historico_text += f"{i}. {status_emoji_hist} {registro['status'].title()} em {data_formatada}\n"
-            if registro['nome']:
-                historico_text += f"   Facção: {registro['nome']}\n"
-            if registro['responsavel']:
-                historico_text += f"   Responsável: {registro['responsavel']}\n"
-            if registro['motivo']:
-                historico_text += f"   Motivo: {registro['motivo']}\n"
+            status_emoji_hist = "🟢" if registro.status == "livre" else "🔴" if registro.status == "ocupada" else "🟡"
+            data_formatada = registro.data_registro.split('.')[0] if registro.data_registro else "Data desconhecida"
+            historico_text += f"{i}. {status_emoji_hist} {registro.status.title()} em {data_formatada}\n"
+            if registro.nome:
+                historico_text += f"   Facção: {registro.nome}\n"
+            if registro.responsavel:
+                historico_text += f"   Responsável: {registro.responsavel}\n"
+            if registro.motivo:
+                historico_text += f"   Motivo: {registro.motivo}\n"
             historico_text += "\n"
         
         if historico_text:
@@ -393,22 +2250,253 @@ def get_base_info_embed(base_num: int, mostrar_cds: bool = False, mostrar_nome:
     
     return embed, file, foto_carregada
 
+# -------------------------------------------------
+#  Permissões
+# -------------------------------------------------
+NIVEL_USUARIO = 0
+NIVEL_MODERADOR = 1  # Vê nomes das facções e responsáveis
+NIVEL_ADM = 2        # Menu ADM e ações nas bases
+
+class ServicoPermissoes:
+    """Resolve o nível de permissão de quem interage, com cache.
+    
+    Os cargos configurados que existem em cada servidor ficam em cache
+    (invalidado nos eventos de cargo) e o nível calculado é guardado por
+    interação: as várias verificações de um mesmo clique custam uma
+    consulta a dicionário.
+    """
+    
+    def __init__(self, cargos_por_nivel: dict):
+        self.cargos_por_nivel = cargos_por_nivel  # nível -> IDs dos cargos
+        self._cargos_existentes = {}  # guild_id -> {nível: frozenset(IDs que existem no servidor)}
+        self._por_interacao = OrderedDict()  # interaction.id -> (user_id, nível)
+    
+    def nivel(self, interaction: Interaction) -> int:
+        """Retorna o nível de permissão do autor da interação."""
+        em_cache = self._por_interacao.get(interaction.id)
+        if em_cache is not None:
+            return em_cache[1]
+        
+        nivel = self._calcular(interaction)
+        self._por_interacao[interaction.id] = (interaction.user.id, nivel)
+        if len(self._por_interacao) > 1024:
+            self._por_interacao.popitem(last=False)
+        return nivel
+    
+    def tem_nivel(self, interaction: Interaction, nivel: int) -> bool:
+        return self.nivel(interaction) >= nivel
+    
+    def _calcular(self, interaction: Interaction) -> int:
+        guild = interaction.guild
+        membro = interaction.user
+        if guild is None or not isinstance(membro, discord.Member):
+            return NIVEL_USUARIO
+        
+        existentes = self._cargos_existentes.get(guild.id)
+        if existentes is None:
+            existentes = self._cargos_existentes[guild.id] = {
+                nivel: frozenset(i for i in ids if guild.get_role(i) is not None)
+                for nivel, ids in self.cargos_por_nivel.items()
+            }
+        
+        # Sem nenhum cargo ADM válido no servidor, vale a permissão de administrador
+        if not existentes.get(NIVEL_ADM) and membro.guild_permissions.administrator:
+            return NIVEL_ADM
+        
+        for nivel in sorted(existentes, reverse=True):
+            # Member.get_role faz busca binária nos IDs de cargo do membro
+            if any(membro.get_role(cargo_id) is not None for cargo_id in existentes[nivel]):
+                return nivel
+        return NIVEL_USUARIO
+    
+    def invalidar_servidor(self, guild_id: int):
+        """Cargos do servidor mudaram: recalcula quais existem e esquece os níveis calculados."""
+        self._cargos_existentes.pop(guild_id, None)
+        self._por_interacao.clear()
+    
+    def invalidar_membro(self, user_id: int):
+        """Cargos de um membro mudaram (requer o intent members)."""
+        for chave in [k for k, (uid, _) in self._por_interacao.items() if uid == user_id]:
+            del self._por_interacao[chave]
+
+
+permissoes = ServicoPermissoes({
+    # Cargos de outros servidores não existem no servidor da interação e são ignorados
+    NIVEL_ADM: {*(ilha.cargo_adm_id for ilha in ilhas.values()), *CARGOS_ADM_IDS} - {0, None},
+    NIVEL_MODERADOR: set(CARGOS_MODERADOR_IDS),
+})
+
 def has_admin_role(interaction: Interaction) -> bool:
     """Verifica se o usuário tem o cargo de administrador."""
-    if not CARGO_ADM_ID:
-        return interaction.user.guild_permissions.administrator
+    return permissoes.tem_nivel(interaction, NIVEL_ADM)
+
+def registrar_permissao_negada(interaction: Interaction):
+    """Auditoria: alguém sem o cargo ADM tentou usar uma função de ADM."""
+    acao = interaction.command.qualified_name if interaction.command else (interaction.data or {}).get("custom_id")
+    registrar_evento("permissao_negada", interaction, acao=acao)
+
+def pode_ver_nomes(interaction: Interaction) -> bool:
+    """Verifica se o usuário pode ver nomes de facções e responsáveis (moderador ou ADM)."""
+    return permissoes.tem_nivel(interaction, NIVEL_MODERADOR)
+
+# -------------------------------------------------
+#  Recarga de configuração sem reiniciar
+# -------------------------------------------------
+CAMINHO_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.py")
+_config_mtime = os.path.getmtime(CAMINHO_CONFIG)
+
+_lock_config = asyncio.Lock()  # O comando e a verificação periódica não recarregam juntos
+
+async def recarregar_config() -> list:
+    """Relê o config.py e aplica os valores recarregáveis de todas as ilhas de uma só vez.
+    
+    Retorna a lista de chaves alteradas. Se o arquivo tiver erro, nada é
+    aplicado e a exceção é propagada. O banco é acessado numa thread.
+    """
+    async with _lock_config:
+        return await _recarregar_config()
+
+async def _recarregar_config() -> list:
+    global _config_mtime
+    
+    # Marca a versão do arquivo mesmo se falhar, para não repetir o erro a cada verificação
+    _config_mtime = os.path.getmtime(CAMINHO_CONFIG)
+    # Valida tudo antes de aplicar qualquer coisa
+    novos = configs_ilhas(await asyncio.to_thread(runpy.run_path, CAMINHO_CONFIG))
+    
+    alteradas = []
+    for guild_id, ilha in ilhas.items():
+        cfg = novos.get(guild_id)
+        if cfg is None:
+            continue  # Servidor removido: só sai da lista ao reiniciar
+        mudaram = [chave for chave in CHAVES_RECARREGAVEIS if cfg[chave] != getattr(ilha, chave)]
+        if not mudaram:
+            continue
+        prefixo = f"{cfg['nome_ilha']}: " if len(ilhas) > 1 else ""
+        alteradas.extend(prefixo + chave.upper() for chave in mudaram)
+        
+        total_mudou = cfg["total_bases"] != ilha.total_bases
+        ilha.configurar(cfg)
+        if total_mudou:
+            # Cria as novas bases no banco (bases existentes nunca são apagadas)
+            await asyncio.to_thread(init_database)
+            await ilha.estado.recarregar()
+        for base in ilha.bases:
+            base.meta = ilha.obter_meta_base(base.numero)
+        
+        ilha.estado.versao += 1
+        atualizar_painel_principal(ilha)
+    
+    if set(novos) != set(ilhas):
+        alteradas.append("ILHAS_EXTRAS (servidores adicionados/removidos valem após reiniciar)")
+    return alteradas
+
+@tasks.loop(seconds=CONFIG_INTERVALO_VERIFICACAO)
+async def observar_config():
+    """Recarrega o config.py quando o arquivo é alterado."""
+    try:
+        if os.path.getmtime(CAMINHO_CONFIG) == _config_mtime:
+            return
+        alteradas = await recarregar_config()
+        if alteradas:
+            print(f"🔄 Configuração recarregada: {', '.join(alteradas)}")
+    except Exception as e:
+        print(f"❌ Erro ao recarregar config.py (mantendo a configuração atual): {e}")
+
+# -------------------------------------------------
+#  Leitura das fotos fora do event loop
+# -------------------------------------------------
+CACHE_FOTOS_MAX_BYTES = 64 * 1024 * 1024  # Fotos têm ~2 MB cada
+_cache_fotos = OrderedDict()  # caminho -> (mtime, bytes), do menos ao mais usado
+_cache_fotos_bytes = 0
+_leituras_pendentes = {}  # caminho -> Task (evita ler o mesmo arquivo duas vezes)
+
+def _ler_foto(caminho: str, mtime_em_cache):
+    """Executado numa thread: retorna (mtime, bytes), ou bytes None se o cache está atualizado."""
+    try:
+        mtime = os.path.getmtime(caminho)
+    except OSError:
+        return None, None
+    if mtime == mtime_em_cache:
+        return mtime, None
+    with open(caminho, "rb") as f:
+        return mtime, f.read()
+
+async def _carregar_foto(caminho: str):
+    global _cache_fotos_bytes
+    em_cache = _cache_fotos.get(caminho)
+    mtime, dados = await asyncio.to_thread(_ler_foto, caminho, em_cache[0] if em_cache else None)
     
-    admin_role = interaction.guild.get_role(CARGO_ADM_ID)
-    if not admin_role:
-        return interaction.user.guild_permissions.administrator
+    if mtime is None:  # Arquivo não existe (mais)
+        if em_cache:
+            _cache_fotos_bytes -= len(_cache_fotos.pop(caminho)[1])
+        return None
+    if dados is None:  # Cache ainda válido
+        _cache_fotos.move_to_end(caminho)
+        return em_cache[1]
+    
+    if em_cache:
+        _cache_fotos_bytes -= len(_cache_fotos.pop(caminho)[1])
+    _cache_fotos[caminho] = (mtime, dados)
+    _cache_fotos_bytes += len(dados)
+    while _cache_fotos_bytes > CACHE_FOTOS_MAX_BYTES and len(_cache_fotos) > 1:
+        _, (_, antigos) = _cache_fotos.popitem(last=False)
+        _cache_fotos_bytes -= len(antigos)
+    return dados
+
+async def carregar_foto(caminho: str):
+    """Retorna os bytes da foto (ou None se não existir) sem bloquear o event loop."""
+    tarefa = _leituras_pendentes.get(caminho)
+    if tarefa is None:
+        tarefa = _leituras_pendentes[caminho] = asyncio.create_task(_carregar_foto(caminho))
+        tarefa.add_done_callback(lambda _: _leituras_pendentes.pop(caminho, None))
+    return await asyncio.shield(tarefa)
+
+def operacoes_foto_envio(base: Base) -> tuple:
+    """Operações aplicadas à foto da base antes de ir para os embeds (vazio = foto original)."""
+    operacoes = []
+    if FOTOS_LARGURA_ENVIO is not None:
+        operacoes.append(("redimensionar", FOTOS_LARGURA_ENVIO, FOTOS_LARGURA_ENVIO))
+    if FOTOS_SELO_STATUS:
+        operacoes.append(("selo", base.numero, base.status))
+    return tuple(operacoes)
+
+async def carregar_foto_envio(base: Base):
+    """Retorna a foto como vai nos embeds: reduzida, em JPEG e com o selo do status.
     
-    return admin_role in interaction.user.roles
+    A imagem vem do cache do processador (memória ou disco), que usa o hash da
+    foto original; só é gerada de novo se a foto ou o status mudar.
+    """
+    operacoes = operacoes_foto_envio(base)
+    if not operacoes:
+        return await carregar_foto(base.foto_path)
+    try:
+        return await processador_imagens.processar(
+            base.foto_path, operacoes, "JPEG", FOTOS_QUALIDADE_ENVIO, em_disco=FOTOS_SELO_STATUS
+        )
+    except Exception as e:
+        print(f"Erro ao processar a foto da base {base.numero} (enviando o original): {e}")
+        return await carregar_foto(base.foto_path)
+
+def preparar_foto_envio(base: Base):
+    """Chamado nas mudanças de status: gera em segundo plano a foto com o selo novo."""
+    if FOTOS_SELO_STATUS:
+        processador_imagens.processar_em_segundo_plano(
+            base.foto_path, operacoes_foto_envio(base), "JPEG", FOTOS_QUALIDADE_ENVIO, em_disco=True
+        )
+
+async def arquivo_foto(base: Base):
+    """Retorna a foto da base como discord.File (ou None se não existir)."""
+    dados = await carregar_foto_envio(base)
+    if dados is None:
+        return None
+    return discord.File(io.BytesIO(dados), filename=base.meta.nome_anexo)
 
 # -------------------------------------------------
 #  Funções para criar embeds com fotos
 # -------------------------------------------------
-async def criar_embed_com_foto(base: Base, posicao: int, total: int, mostrar_cds: bool = False, mostrar_nome: bool = True):
-    """Cria um embed com foto da base."""
+async def montar_embed_foto(base: Base, posicao: int, total: int, mostrar_cds: bool = False, mostrar_nome: bool = True):
+    """Monta o embed de uma página da galeria. Retorna (embed, bytes da foto ou None)."""
     if base.status == "livre":
         colour = Colour.green()
         status_emoji = "🟢"
@@ -447,21 +2535,59 @@ async def criar_embed_com_foto(base: Base, posicao: int, total: int, mostrar_cds
         embed.set_footer(text=f"Base {posicao}/{total} disponíveis • Navegue usando as setas")
     
     # Carrega a foto
-    file = None
-    if os.path.exists(base.foto_path):
-        file = discord.File(base.foto_path, filename=f"base_{base.numero}.png")
-        embed.set_image(url=f"attachment://base_{base.numero}.png")
+    dados = await carregar_foto_envio(base)
+    if dados is not None:
+        embed.set_image(url=f"attachment://{base.meta.nome_anexo}")
     else:
         embed.add_field(name="⚠️ Aviso", value="Foto da base não encontrada.", inline=False)
     
+    return embed, dados
+
+async def criar_embed_com_foto(base: Base, posicao: int, total: int, mostrar_cds: bool = False, mostrar_nome: bool = True):
+    """Cria um embed com foto da base."""
+    embed, dados = await montar_embed_foto(base, posicao, total, mostrar_cds, mostrar_nome)
+    file = discord.File(io.BytesIO(dados), filename=base.meta.nome_anexo) if dados is not None else None
     return embed, file
 
+
+class PaginasPreparadas:
+    """Cache pequeno, por view, das páginas da galeria montadas antes do clique."""
+    
+    def __init__(self, limite: int = 4):
+        self.limite = limite
+        self._paginas = OrderedDict()  # chave -> Task[(embed, dados)]
+    
+    def preparar(self, chave, fabrica):
+        """Começa a montar a página em segundo plano (fabrica() retorna a corrotina)."""
+        if chave in self._paginas:
+            return
+        tarefa = asyncio.create_task(fabrica())
+        # Evita avisos de exceção não lida; o erro reaparece se a página for pedida
+        tarefa.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._paginas[chave] = tarefa
+        while len(self._paginas) > self.limite:
+            _, antiga = self._paginas.popitem(last=False)
+            antiga.cancel()
+    
+    async def obter(self, chave, fabrica):
+        """Retorna a página preparada (acerto) ou a monta agora (falha)."""
+        tarefa = self._paginas.pop(chave, None)
+        if tarefa is None or tarefa.cancelled():
+            metricas["galeria_prefetch_falha"] += 1
+            return await fabrica()
+        metricas["galeria_prefetch_acerto"] += 1
+        return await tarefa
+
 # -------------------------------------------------
 #  Classes base melhoradas
 # -------------------------------------------------
 class SafeView(ui.View):
     """View base com tratamento seguro de interações."""
     
+    async def interaction_check(self, interaction: Interaction) -> bool:
+        """Segura a interação até as bases terem sido carregadas e entra na ilha do servidor."""
+        return await entrar_na_ilha(interaction)
+    
     async def on_error(self, interaction: Interaction, error: Exception, item: ui.Item):
         """Trata erros nas views."""
         if isinstance(error, discord.errors.NotFound):
@@ -479,7 +2605,7 @@ class SafeView(ui.View):
                     ephemeral=True
                 )
             elif not interaction.is_expired():
-                await interaction.followup.send(
+                await enviar_followup(interaction, 
                     "❌ Ocorreu um erro ao processar sua ação. Tente novamente.",
                     ephemeral=True
                 )
@@ -506,7 +2632,7 @@ class MainView(SafeView):
             await interaction.response.defer(ephemeral=True)
             
             view = MenuVisualizacaoView()
-            await interaction.followup.send(
+            await enviar_followup(interaction, 
                 embed=Embed(
                     title="📍 Visualização de Bases",
                     description="Escolha uma opção:",
@@ -543,15 +2669,16 @@ class MainView(SafeView):
             await interaction.response.defer(ephemeral=True)
             
             if not has_admin_role(interaction):
-                await interaction.followup.send(
+                registrar_permissao_negada(interaction)
+                await enviar_followup(interaction, 
                     f"❌ Você não tem permissão para acessar o menu administrativo.\n"
-                    f"É necessário ter o cargo <@&{CARGO_ADM_ID}> para usar esta função.", 
+                    f"É necessário ter o cargo <@&{ilha_atual().cargo_adm_id}> para usar esta função.", 
                     ephemeral=True
                 )
                 return
 
             view = AdminMenuView()
-            await interaction.followup.send(
+            await enviar_followup(interaction, 
                 embed=Embed(
                     title="⚙️ Menu Administrativo",
                     description="Escolha uma opção:",
@@ -591,7 +2718,7 @@ class MenuVisualizacaoView(SafeView):
                 return
             
             # Para usuários comuns, não mostra nomes
-            mostrar_nome = has_admin_role(interaction)
+            mostrar_nome = pode_ver_nomes(interaction)
             embed = Embed(
                 title="📍 Todas as Bases",
                 description=listar_bases_simples(mostrar_nome=mostrar_nome),
@@ -625,7 +2752,7 @@ class MenuVisualizacaoView(SafeView):
             if interaction.response.is_done():
                 return
             
-            bases_disponiveis = [b for b in bases if b.status == "livre"]
+            bases_disponiveis = ilha_atual().estado.bases_com_status("livre")
             if not bases_disponiveis:
                 await interaction.response.edit_message(
                     embed=Embed(
@@ -640,11 +2767,11 @@ class MenuVisualizacaoView(SafeView):
             
             primeira_base = bases_disponiveis[0]
             # Para usuários comuns, não mostra nomes
-            mostrar_nome = has_admin_role(interaction)
+            mostrar_nome = pode_ver_nomes(interaction)
             embed, file = await criar_embed_com_foto(primeira_base, 1, len(bases_disponiveis), 
                                                     mostrar_cds=False, mostrar_nome=mostrar_nome)
             
-            view = BasePhotosDisponiveisView(current_page=primeira_base.numero)
+            view = BasePhotosDisponiveisView(current_page=primeira_base.numero, mostrar_nome=mostrar_nome)
             
             if file:
                 await interaction.response.edit_message(embed=embed, view=view, attachments=[file])
@@ -714,13 +2841,16 @@ class ListaCompletaView(SafeView):
                 return
             
             # Para usuários comuns, não mostra nomes
-            mostrar_nome = has_admin_role(interaction)
+            mostrar_nome = pode_ver_nomes(interaction)
             embed = Embed(
                 title="📍 Todas as Bases",
                 description=listar_bases_simples(mostrar_nome=mostrar_nome),
                 colour=Colour.blurple(),
             )
-            embed.set_footer(text="Última atualização: " + datetime.now().strftime("%d/%m/%Y %H:%M"))
+            embed.set_footer(
+                text="Última atualização: " + datetime.now().strftime("%d/%m/%Y %H:%M")
+                + " • Use /avisar_quando_livre para ser avisado quando uma base vagar"
+            )
             await interaction.response.edit_message(embed=embed, view=self, attachments=[])
         except discord.errors.NotFound:
             # Interação expirada, ignore
@@ -790,9 +2920,10 @@ class AdminMenuView(SafeView):
                 return
             
             if not has_admin_role(interaction):
+                registrar_permissao_negada(interaction)
                 await interaction.response.send_message(
                     f"❌ Você não tem permissão.\n"
-                    f"É necessário ter o cargo <@&{CARGO_ADM_ID}>.", 
+                    f"É necessário ter o cargo <@&{ilha_atual().cargo_adm_id}>.", 
                     ephemeral=True
                 )
                 return
@@ -829,9 +2960,10 @@ class AdminMenuView(SafeView):
                 return
             
             if not has_admin_role(interaction):
+                registrar_permissao_negada(interaction)
                 await interaction.response.send_message(
                     f"❌ Você não tem permissão.\n"
-                    f"É necessário ter o cargo <@&{CARGO_ADM_ID}>.", 
+                    f"É necessário ter o cargo <@&{ilha_atual().cargo_adm_id}>.", 
                     ephemeral=True
                 )
                 return
@@ -868,9 +3000,10 @@ class AdminMenuView(SafeView):
                 return
             
             if not has_admin_role(interaction):
+                registrar_permissao_negada(interaction)
                 await interaction.response.send_message(
                     f"❌ Você não tem permissão.\n"
-                    f"É necessário ter o cargo <@&{CARGO_ADM_ID}>.", 
+                    f"É necessário ter o cargo <@&{ilha_atual().cargo_adm_id}>.", 
                     ephemeral=True
                 )
                 return
@@ -907,9 +3040,10 @@ class AdminMenuView(SafeView):
                 return
             
             if not has_admin_role(interaction):
+                registrar_permissao_negada(interaction)
                 await interaction.response.send_message(
                     f"❌ Você não tem permissão.\n"
-                    f"É necessário ter o cargo <@&{CARGO_ADM_ID}>.", 
+                    f"É necessário ter o cargo <@&{ilha_atual().cargo_adm_id}>.", 
                     ephemeral=True
                 )
                 return
@@ -948,15 +3082,16 @@ class AdminMenuView(SafeView):
                 return
             
             if not has_admin_role(interaction):
+                registrar_permissao_negada(interaction)
                 await interaction.response.send_message(
                     f"❌ Você não tem permissão.\n"
-                    f"É necessário ter o cargo <@&{CARGO_ADM_ID}>.", 
+                    f"É necessário ter o cargo <@&{ilha_atual().cargo_adm_id}>.", 
                     ephemeral=True
                 )
                 return
             
-            primeira_base = bases[0]
-            embed, file = await criar_embed_com_foto(primeira_base, 1, TOTAL_BASES, 
+            primeira_base = ilha_atual().bases[0]
+            embed, file = await criar_embed_com_foto(primeira_base, 1, ilha_atual().total_bases, 
                                                     mostrar_cds=True, mostrar_nome=True)
             
             view = AdminFotosTodasView(current_page=1)
@@ -1074,132 +3209,7 @@ class AdminListaCompletaView(SafeView):
             # Interação expirada, ignore
             pass
         except Exception as e:
-            print(f"Erro em voltar ADM: {e}")
-            traceback.print_exc()
-            
-            # Tenta enviar mensagem de erro
-            try:
-                if not interaction.response.is_done():
-                    await interaction.response.send_message(
-                        "❌ Ocorreu um erro. Tente novamente.",
-                        ephemeral=True
-                    )
-            except:
-                pass
-
-
-# -------------------------------------------------
-#  Views de ações ADM - BASES DISPONÍVEIS
-# -------------------------------------------------
-class AdminBasesDisponiveisView(SafeView):
-    """View para bases disponíveis no menu ADM."""
-    def __init__(self):
-        super().__init__(timeout=None)
-
-    @ui.button(label="OCUPAR", style=discord.ButtonStyle.success, custom_id="adm_disp:ocupar")
-    async def ocupar(self, interaction: Interaction, button: ui.Button):
-        try:
-            # Verificação de segurança
-            if interaction.response.is_done():
-                return
-            
-            if not has_admin_role(interaction):
-                await interaction.response.send_message(
-                    f"❌ Você não tem permissão.\n"
-                    f"É necessário ter o cargo <@&{CARGO_ADM_ID}>.", 
-                    ephemeral=True
-                )
-                return
-
-            bases_livres = [b for b in bases if b.status == "livre"]
-            if not bases_livres:
-                await interaction.response.send_message(
-                    "❌ Não há bases livres para ocupar.",
-                    ephemeral=True
-                )
-                return
-
-            await interaction.response.send_modal(OcuparBaseModal())
-        except discord.errors.NotFound:
-            # Interação expirada, ignore
-            pass
-        except Exception as e:
-            print(f"Erro em ocupar: {e}")
-            traceback.print_exc()
-            
-            # Tenta enviar mensagem de erro
-            try:
-                if not interaction.response.is_done():
-                    await interaction.response.send_message(
-                        "❌ Ocorreu um erro. Tente novamente.",
-                        ephemeral=True
-                    )
-            except:
-                pass
-
-    @ui.button(label="EM PROCESSO", style=discord.ButtonStyle.primary, custom_id="adm_disp:reservar")
-    async def reservar(self, interaction: Interaction, button: ui.Button):
-        try:
-            # Verificação de segurança
-            if interaction.response.is_done():
-                return
-            
-            if not has_admin_role(interaction):
-                await interaction.response.send_message(
-                    f"❌ Você não tem permissão.\n"
-                    f"É necessário ter o cargo <@&{CARGO_ADM_ID}>.", 
-                    ephemeral=True
-                )
-                return
-
-            bases_livres = [b for b in bases if b.status == "livre"]
-            if not bases_livres:
-                await interaction.response.send_message(
-                    "❌ Não há bases livres para reservar.",
-                    ephemeral=True
-                )
-                return
-
-            await interaction.response.send_modal(ReservarBaseModal())
-        except discord.errors.NotFound:
-            # Interação expirada, ignore
-            pass
-        except Exception as e:
-            print(f"Erro em reservar: {e}")
-            traceback.print_exc()
-            
-            # Tenta enviar mensagem de erro
-            try:
-                if not interaction.response.is_done():
-                    await interaction.response.send_message(
-                        "❌ Ocorreu um erro. Tente novamente.",
-                        ephemeral=True
-                    )
-            except:
-                pass
-
-    @ui.button(label="↩️ Voltar", style=discord.ButtonStyle.secondary, custom_id="adm_disp:voltar")
-    async def voltar(self, interaction: Interaction, button: ui.Button):
-        try:
-            # Verificação de segurança
-            if interaction.response.is_done():
-                return
-            
-            view = AdminMenuView()
-            await interaction.response.edit_message(
-                embed=Embed(
-                    title="⚙️ Menu Administrativo",
-                    description="Escolha uma opção:",
-                    colour=Colour.dark_green(),
-                ),
-                view=view,
-                attachments=[]
-            )
-        except discord.errors.NotFound:
-            # Interação expirada, ignore
-            pass
-        except Exception as e:
-            print(f"Erro em voltar disponiveis: {e}")
+            print(f"Erro em voltar ADM: {e}")
             traceback.print_exc()
             
             # Tenta enviar mensagem de erro
@@ -1214,45 +3224,69 @@ class AdminBasesDisponiveisView(SafeView):
 
 
 # -------------------------------------------------
-#  Views de ações ADM - BASES RESERVADAS (NOVO)
+#  Seleção de bases para as ações ADM
 # -------------------------------------------------
-class AdminBasesReservadasView(SafeView):
-    """View para bases reservadas no menu ADM."""
-    def __init__(self):
-        super().__init__(timeout=None)
+OPCOES_POR_SELETOR = 25  # Limite do Discord por menu de seleção
 
-    @ui.button(label="OCUPAR", style=discord.ButtonStyle.success, custom_id="adm_res:ocupar")
-    async def ocupar(self, interaction: Interaction, button: ui.Button):
+class SeletorBases(ui.Select):
+    """Menu com as bases elegíveis para uma ação; escolher uma abre o modal já com a base."""
+    def __init__(self, status: str, placeholder: str, abrir_modal, pagina: int = 0, row: int = 0):
+        self.status = status
+        self.abrir_modal = abrir_modal
+        
+        numeros = ilha_atual().estado.numeros_por_status(status)
+        trecho = numeros[pagina * OPCOES_POR_SELETOR:(pagina + 1) * OPCOES_POR_SELETOR]
+        opcoes = []
+        for numero in trecho:
+            base = ilha_atual().estado.obter(numero)
+            opcoes.append(discord.SelectOption(
+                label=f"Base {numero}",
+                value=str(numero),
+                description=base.nome[:100] if base.nome else None,
+            ))
+        
+        if not opcoes:
+            # O Discord exige ao menos uma opção: mostra o menu desativado
+            opcoes = [discord.SelectOption(label="Nenhuma base", value="0")]
+            placeholder = f"Nenhuma base {status} no momento"
+        elif len(numeros) > OPCOES_POR_SELETOR:
+            placeholder += f" ({trecho[0]}-{trecho[-1]})"
+        
+        super().__init__(placeholder=placeholder[:150], options=opcoes, disabled=not trecho, row=row)
+    
+    async def callback(self, interaction: Interaction):
         try:
-            # Verificação de segurança
             if interaction.response.is_done():
                 return
             
             if not has_admin_role(interaction):
+                registrar_permissao_negada(interaction)
                 await interaction.response.send_message(
                     f"❌ Você não tem permissão.\n"
-                    f"É necessário ter o cargo <@&{CARGO_ADM_ID}>.", 
+                    f"É necessário ter o cargo <@&{ilha_atual().cargo_adm_id}>.", 
                     ephemeral=True
                 )
                 return
-
-            bases_reservadas = [b for b in bases if b.status == "reservada"]
-            if not bases_reservadas:
+            
+            # O menu pode ter sido aberto antes de outra pessoa mexer na base
+            numero = int(self.values[0])
+            base = ilha_atual().estado.obter(numero)
+            if base is None or base.status != self.status:
+                atual = base.status if base else "inexistente"
                 await interaction.response.send_message(
-                    "❌ Não há bases reservadas para ocupar.",
+                    f"❌ Base {numero} não está mais {self.status} (status atual: {atual}).",
                     ephemeral=True
                 )
                 return
-
-            await interaction.response.send_modal(OcuparBaseReservadaModal())
+            
+            await interaction.response.send_modal(self.abrir_modal(numero))
         except discord.errors.NotFound:
             # Interação expirada, ignore
             pass
         except Exception as e:
-            print(f"Erro em ocupar reservada: {e}")
+            print(f"Erro em SeletorBases ({self.status}): {e}")
             traceback.print_exc()
             
-            # Tenta enviar mensagem de erro
             try:
                 if not interaction.response.is_done():
                     await interaction.response.send_message(
@@ -1262,48 +3296,69 @@ class AdminBasesReservadasView(SafeView):
             except:
                 pass
 
-    @ui.button(label="DISPONIBILIZAR", style=discord.ButtonStyle.danger, custom_id="adm_res:disponibilizar")
-    async def disponibilizar(self, interaction: Interaction, button: ui.Button):
+
+class AdminAcoesBasesView(SafeView):
+    """Base das views de ações ADM: um menu de bases por ação, paginado de 25 em 25.
+    
+    As subclasses definem ACOES como (status, placeholder, função que cria o modal).
+    """
+    ACOES = ()
+    
+    def __init__(self):
+        super().__init__(timeout=None)
+        self.pagina = 0
+        self.montar_seletores()
+    
+    def total_paginas(self) -> int:
+        status = {acao[0] for acao in self.ACOES}
+        maior = max((len(ilha_atual().estado.numeros_por_status(s)) for s in status), default=0)
+        return max((maior + OPCOES_POR_SELETOR - 1) // OPCOES_POR_SELETOR, 1)
+    
+    def montar_seletores(self):
+        for item in list(self.children):
+            if isinstance(item, SeletorBases) or getattr(item, "custom_id", None) == "adm_acoes:mais":
+                self.remove_item(item)
+        
+        for linha, (status, placeholder, abrir_modal) in enumerate(self.ACOES):
+            self.add_item(SeletorBases(status, placeholder, abrir_modal, self.pagina, row=linha))
+        
+        if self.total_paginas() > 1:
+            mais_button = ui.Button(
+                label="▶️ Mais bases",
+                style=discord.ButtonStyle.primary,
+                custom_id="adm_acoes:mais",
+                row=2
+            )
+            mais_button.callback = self.mais_bases_callback
+            self.add_item(mais_button)
+    
+    async def mais_bases_callback(self, interaction: Interaction):
         try:
-            # Verificação de segurança
             if interaction.response.is_done():
                 return
             
-            if not has_admin_role(interaction):
-                await interaction.response.send_message(
-                    f"❌ Você não tem permissão.\n"
-                    f"É necessário ter o cargo <@&{CARGO_ADM_ID}>.", 
-                    ephemeral=True
-                )
-                return
-
-            bases_reservadas = [b for b in bases if b.status == "reservada"]
-            if not bases_reservadas:
-                await interaction.response.send_message(
-                    "❌ Não há bases reservadas para disponibilizar.",
-                    ephemeral=True
-                )
-                return
-
-            await interaction.response.send_modal(DisponibilizarBaseModal())
+            self.pagina = (self.pagina + 1) % self.total_paginas()
+            self.montar_seletores()
+            await interaction.response.edit_message(view=self)
         except discord.errors.NotFound:
             # Interação expirada, ignore
             pass
         except Exception as e:
-            print(f"Erro em disponibilizar: {e}")
+            print(f"Erro em mais_bases_callback: {e}")
             traceback.print_exc()
-            
-            # Tenta enviar mensagem de erro
-            try:
-                if not interaction.response.is_done():
-                    await interaction.response.send_message(
-                        "❌ Ocorreu um erro. Tente novamente.",
-                        ephemeral=True
-                    )
-            except:
-                pass
 
-    @ui.button(label="↩️ Voltar", style=discord.ButtonStyle.secondary, custom_id="adm_res:voltar")
+
+# -------------------------------------------------
+#  Views de ações ADM - BASES DISPONÍVEIS
+# -------------------------------------------------
+class AdminBasesDisponiveisView(AdminAcoesBasesView):
+    """View para bases disponíveis no menu ADM."""
+    ACOES = (
+        ("livre", "🔴 OCUPAR: escolha a base livre", lambda numero: OcuparBaseModal(numero)),
+        ("livre", "🟡 EM PROCESSO: escolha a base livre", lambda numero: ReservarBaseModal(numero)),
+    )
+
+    @ui.button(label="↩️ Voltar", style=discord.ButtonStyle.secondary, custom_id="adm_disp:voltar", row=2)
     async def voltar(self, interaction: Interaction, button: ui.Button):
         try:
             # Verificação de segurança
@@ -1324,7 +3379,7 @@ class AdminBasesReservadasView(SafeView):
             # Interação expirada, ignore
             pass
         except Exception as e:
-            print(f"Erro em voltar reservadas: {e}")
+            print(f"Erro em voltar disponiveis: {e}")
             traceback.print_exc()
             
             # Tenta enviar mensagem de erro
@@ -1339,34 +3394,37 @@ class AdminBasesReservadasView(SafeView):
 
 
 # -------------------------------------------------
-#  Views de ações ADM - BASES OCUPADAS
+#  Views de ações ADM - BASES RESERVADAS (NOVO)
 # -------------------------------------------------
-class AdminBasesOcupadasView(SafeView):
-    """View para bases ocupadas no menu ADM."""
-    def __init__(self):
-        super().__init__(timeout=None)
+class AdminBasesReservadasView(AdminAcoesBasesView):
+    """View para bases reservadas no menu ADM."""
+    ACOES = (
+        ("reservada", "🔴 OCUPAR: escolha a base reservada", lambda numero: OcuparBaseReservadaModal(numero)),
+        ("reservada", "🟢 DISPONIBILIZAR: escolha a base reservada", lambda numero: DisponibilizarBaseModal(numero)),
+    )
 
-    @ui.button(label="🔄 DESOCUPAR BASE", style=discord.ButtonStyle.danger, custom_id="adm_ocup:desocupar")
-    async def desocupar(self, interaction: Interaction, button: ui.Button):
+    @ui.button(label="↩️ Voltar", style=discord.ButtonStyle.secondary, custom_id="adm_res:voltar", row=2)
+    async def voltar(self, interaction: Interaction, button: ui.Button):
         try:
             # Verificação de segurança
             if interaction.response.is_done():
                 return
             
-            if not has_admin_role(interaction):
-                await interaction.response.send_message(
-                    f"❌ Você não tem permissão.\n"
-                    f"É necessário ter o cargo <@&{CARGO_ADM_ID}>.", 
-                    ephemeral=True
-                )
-                return
-
-            await interaction.response.send_modal(DesocuparBaseModal())
+            view = AdminMenuView()
+            await interaction.response.edit_message(
+                embed=Embed(
+                    title="⚙️ Menu Administrativo",
+                    description="Escolha uma opção:",
+                    colour=Colour.dark_green(),
+                ),
+                view=view,
+                attachments=[]
+            )
         except discord.errors.NotFound:
             # Interação expirada, ignore
             pass
         except Exception as e:
-            print(f"Erro em desocupar: {e}")
+            print(f"Erro em voltar reservadas: {e}")
             traceback.print_exc()
             
             # Tenta enviar mensagem de erro
@@ -1379,7 +3437,17 @@ class AdminBasesOcupadasView(SafeView):
             except:
                 pass
 
-    @ui.button(label="↩️ Voltar", style=discord.ButtonStyle.secondary, custom_id="adm_ocup:voltar")
+
+# -------------------------------------------------
+#  Views de ações ADM - BASES OCUPADAS
+# -------------------------------------------------
+class AdminBasesOcupadasView(AdminAcoesBasesView):
+    """View para bases ocupadas no menu ADM."""
+    ACOES = (
+        ("ocupada", "🔄 DESOCUPAR: escolha a base ocupada", lambda numero: DesocuparBaseModal(numero)),
+    )
+
+    @ui.button(label="↩️ Voltar", style=discord.ButtonStyle.secondary, custom_id="adm_ocup:voltar", row=2)
     async def voltar(self, interaction: Interaction, button: ui.Button):
         try:
             # Verificação de segurança
@@ -1419,18 +3487,40 @@ class AdminBasesOcupadasView(SafeView):
 # -------------------------------------------------
 class BasePhotosDisponiveisView(SafeView):
     """View para navegar entre as fotos das bases disponíveis."""
-    def __init__(self, current_page: int = 1):
+    def __init__(self, current_page: int = 1, mostrar_nome: bool = False):
         super().__init__(timeout=180)
         self.current_page = current_page
+        self.mostrar_nome = mostrar_nome
+        self.paginas = PaginasPreparadas()
         
         # Encontra próxima base disponível
-        bases_disponiveis = [b for b in bases if b.status == "livre"]
+        bases_disponiveis = ilha_atual().estado.bases_com_status("livre")
         self.numeros_disponiveis = [b.numero for b in bases_disponiveis]
         
         if self.current_page not in self.numeros_disponiveis:
             self.current_page = self.numeros_disponiveis[0] if self.numeros_disponiveis else 1
         
         self.update_buttons()
+        self.pre_carregar_vizinhas()
+    
+    def pre_carregar_vizinhas(self):
+        """Prepara em segundo plano as páginas anterior e seguinte."""
+        if self.current_page not in self.numeros_disponiveis:
+            return
+        idx = self.numeros_disponiveis.index(self.current_page)
+        for vizinho in (idx - 1, idx + 1):
+            if 0 <= vizinho < len(self.numeros_disponiveis):
+                numero = self.numeros_disponiveis[vizinho]
+                self.paginas.preparar(self._chave_pagina(numero), lambda n=numero: self._montar_pagina(n))
+    
+    def _chave_pagina(self, numero: int) -> tuple:
+        return (numero, self.mostrar_nome, ilha_atual().estado.versao)
+    
+    async def _montar_pagina(self, numero: int):
+        base = ilha_atual().estado.obter(numero)
+        posicao = self.numeros_disponiveis.index(numero) + 1
+        total = len(self.numeros_disponiveis)
+        return await montar_embed_foto(base, posicao, total, mostrar_cds=False, mostrar_nome=self.mostrar_nome)
     
     def update_buttons(self):
         self.clear_items()
@@ -1538,7 +3628,7 @@ class BasePhotosDisponiveisView(SafeView):
                 return
             
             self.update_buttons()
-            base = next((b for b in bases if b.numero == self.current_page), None)
+            base = ilha_atual().estado.obter(self.current_page)
             
             if not base or base.status != "livre":
                 await interaction.response.edit_message(
@@ -1552,17 +3642,18 @@ class BasePhotosDisponiveisView(SafeView):
                 )
                 return
             
-            posicao = self.numeros_disponiveis.index(self.current_page) + 1
-            total = len(self.numeros_disponiveis)
             # Para usuários comuns, não mostra nomes
-            mostrar_nome = has_admin_role(interaction)
-            embed, file = await criar_embed_com_foto(base, posicao, total, 
-                                                    mostrar_cds=False, mostrar_nome=mostrar_nome)
+            self.mostrar_nome = pode_ver_nomes(interaction)
+            numero = self.current_page
+            embed, dados = await self.paginas.obter(self._chave_pagina(numero), lambda: self._montar_pagina(numero))
             
-            if file:
+            if dados is not None:
+                file = discord.File(io.BytesIO(dados), filename=base.meta.nome_anexo)
                 await interaction.response.edit_message(embed=embed, view=self, attachments=[file])
             else:
                 await interaction.response.edit_message(embed=embed, view=self, attachments=[])
+            
+            self.pre_carregar_vizinhas()
         except discord.errors.NotFound:
             # Interação expirada, ignore
             pass
@@ -1576,7 +3667,21 @@ class AdminFotosTodasView(SafeView):
     def __init__(self, current_page: int = 1):
         super().__init__(timeout=180)
         self.current_page = current_page
+        self.paginas = PaginasPreparadas()
         self.update_buttons()
+        self.pre_carregar_vizinhas()
+    
+    def pre_carregar_vizinhas(self):
+        """Prepara em segundo plano as páginas anterior e seguinte."""
+        for numero in (self.current_page - 1, self.current_page + 1):
+            if ilha_atual().estado.obter(numero) is not None:
+                self.paginas.preparar(self._chave_pagina(numero), lambda n=numero: self._montar_pagina(n))
+    
+    def _chave_pagina(self, numero: int) -> tuple:
+        return (numero, ilha_atual().estado.versao)
+    
+    async def _montar_pagina(self, numero: int):
+        return await montar_embed_foto(ilha_atual().estado.obter(numero), numero, ilha_atual().total_bases, mostrar_cds=True, mostrar_nome=True)
     
     def update_buttons(self):
         self.clear_items()
@@ -1594,11 +3699,19 @@ class AdminFotosTodasView(SafeView):
         next_button = ui.Button(
             label="Próximo ▶️", 
             style=discord.ButtonStyle.primary,
-            disabled=(self.current_page == TOTAL_BASES)
+            disabled=(self.current_page == ilha_atual().total_bases)
         )
         next_button.callback = self.next_page_callback
         self.add_item(next_button)
         
+        # Botão Miniaturas (todas as bases numa imagem só)
+        miniaturas_button = ui.Button(
+            label="🗂️ Miniaturas", 
+            style=discord.ButtonStyle.secondary
+        )
+        miniaturas_button.callback = self.miniaturas_callback
+        self.add_item(miniaturas_button)
+        
         # Botão Voltar
         voltar_button = ui.Button(
             label="↩️ Voltar", 
@@ -1607,6 +3720,21 @@ class AdminFotosTodasView(SafeView):
         voltar_button.callback = self.voltar_callback
         self.add_item(voltar_button)
     
+    async def miniaturas_callback(self, interaction: Interaction):
+        try:
+            # Verificação de segurança
+            if interaction.response.is_done():
+                return
+            
+            pagina = (self.current_page - 1) // MINIATURAS_POR_PAGINA
+            await AdminMiniaturasView(pagina).mostrar(interaction)
+        except discord.errors.NotFound:
+            # Interação expirada, ignore
+            pass
+        except Exception as e:
+            print(f"Erro em miniaturas_callback ADM: {e}")
+            traceback.print_exc()
+    
     async def prev_page_callback(self, interaction: Interaction):
         try:
             # Verificação de segurança
@@ -1667,7 +3795,7 @@ class AdminFotosTodasView(SafeView):
                 return
             
             self.update_buttons()
-            base = next((b for b in bases if b.numero == self.current_page), None)
+            base = ilha_atual().estado.obter(self.current_page)
             
             if not base:
                 await interaction.response.edit_message(
@@ -1681,13 +3809,16 @@ class AdminFotosTodasView(SafeView):
                 )
                 return
             
-            embed, file = await criar_embed_com_foto(base, self.current_page, TOTAL_BASES, 
-                                                    mostrar_cds=True, mostrar_nome=True)
+            numero = self.current_page
+            embed, dados = await self.paginas.obter(self._chave_pagina(numero), lambda: self._montar_pagina(numero))
             
-            if file:
+            if dados is not None:
+                file = discord.File(io.BytesIO(dados), filename=base.meta.nome_anexo)
                 await interaction.response.edit_message(embed=embed, view=self, attachments=[file])
             else:
                 await interaction.response.edit_message(embed=embed, view=self, attachments=[])
+            
+            self.pre_carregar_vizinhas()
         except discord.errors.NotFound:
             # Interação expirada, ignore
             pass
@@ -1696,14 +3827,132 @@ class AdminFotosTodasView(SafeView):
             traceback.print_exc()
 
 
+class AdminMiniaturasView(SafeView):
+    """View com as miniaturas de todas as bases (folha de contato) no menu ADM."""
+    def __init__(self, pagina: int = 0):
+        super().__init__(timeout=180)
+        self.pagina = pagina
+        self.update_buttons()
+    
+    def update_buttons(self):
+        self.clear_items()
+        total = total_paginas_miniaturas()
+        
+        # Botão Anterior
+        prev_button = ui.Button(
+            label="◀️ Anterior", 
+            style=discord.ButtonStyle.primary,
+            disabled=(self.pagina == 0)
+        )
+        prev_button.callback = self.prev_page_callback
+        self.add_item(prev_button)
+        
+        # Botão Próximo
+        next_button = ui.Button(
+            label="Próximo ▶️", 
+            style=discord.ButtonStyle.primary,
+            disabled=(self.pagina >= total - 1)
+        )
+        next_button.callback = self.next_page_callback
+        self.add_item(next_button)
+        
+        # Botão Voltar (para as fotos em tamanho real)
+        voltar_button = ui.Button(
+            label="📸 Fotos", 
+            style=discord.ButtonStyle.secondary
+        )
+        voltar_button.callback = self.voltar_callback
+        self.add_item(voltar_button)
+    
+    async def mostrar(self, interaction: Interaction):
+        """Gera (ou pega do cache) a folha da página atual e mostra na mensagem."""
+        # A primeira geração pode levar alguns segundos
+        await interaction.response.defer()
+        
+        self.update_buttons()
+        dados = await obter_folha_miniaturas(self.pagina)
+        file = discord.File(io.BytesIO(dados), filename="miniaturas.jpg")
+        
+        inicio = self.pagina * MINIATURAS_POR_PAGINA
+        fim = min(inicio + MINIATURAS_POR_PAGINA, len(ilha_atual().bases))
+        embed = Embed(title="🗂️ Miniaturas das Bases", colour=Colour.purple())
+        embed.set_image(url="attachment://miniaturas.jpg")
+        embed.set_footer(
+            text=f"Bases {inicio + 1}-{fim} de {len(ilha_atual().bases)} • Página {self.pagina + 1}/{total_paginas_miniaturas()}"
+        )
+        await agendador.executar(
+            lambda: interaction.edit_original_response(embed=embed, view=self, attachments=[file]),
+            PRIORIDADE_INTERACAO, rota="editar_resposta", balde=f"interacao:{interaction.id}",
+        )
+    
+    async def prev_page_callback(self, interaction: Interaction):
+        try:
+            # Verificação de segurança
+            if interaction.response.is_done():
+                return
+            
+            if self.pagina > 0:
+                self.pagina -= 1
+            await self.mostrar(interaction)
+        except discord.errors.NotFound:
+            # Interação expirada, ignore
+            pass
+        except Exception as e:
+            print(f"Erro em prev_page_callback miniaturas: {e}")
+            traceback.print_exc()
+    
+    async def next_page_callback(self, interaction: Interaction):
+        try:
+            # Verificação de segurança
+            if interaction.response.is_done():
+                return
+            
+            if self.pagina < total_paginas_miniaturas() - 1:
+                self.pagina += 1
+            await self.mostrar(interaction)
+        except discord.errors.NotFound:
+            # Interação expirada, ignore
+            pass
+        except Exception as e:
+            print(f"Erro em next_page_callback miniaturas: {e}")
+            traceback.print_exc()
+    
+    async def voltar_callback(self, interaction: Interaction):
+        try:
+            # Verificação de segurança
+            if interaction.response.is_done():
+                return
+            
+            # Volta para a foto da primeira base desta página
+            current_page = min(self.pagina * MINIATURAS_POR_PAGINA + 1, ilha_atual().total_bases)
+            view = AdminFotosTodasView(current_page=current_page)
+            await view.update_photo(interaction)
+        except discord.errors.NotFound:
+            # Interação expirada, ignore
+            pass
+        except Exception as e:
+            print(f"Erro em voltar_callback miniaturas: {e}")
+            traceback.print_exc()
+
+
 # -------------------------------------------------
 #  Modais
 # -------------------------------------------------
-class BaseActionModal(ui.Modal):
+class ModalIlha(ui.Modal):
+    """Modal base: entra na ilha do servidor antes do on_submit."""
+    
+    async def interaction_check(self, interaction: Interaction) -> bool:
+        return await entrar_na_ilha(interaction)
+
+
+class BaseActionModal(ModalIlha):
     """Modal base para ações nas bases."""
-    def __init__(self, title: str, target_status: str):
+    def __init__(self, title: str, target_status: str, numero: Optional[int] = None):
+        if numero is not None:
+            title = f"{title} {numero}"
         super().__init__(title=title, timeout=None)
         self.target_status = target_status
+        self.numero = numero  # Base já escolhida no menu (sem campo de número)
         
         self.numero_base = ui.TextInput(
             label="Número da Base (1-14)",
@@ -1730,22 +3979,23 @@ class BaseActionModal(ui.Modal):
             max_length=50
         )
         
-        self.add_item(self.numero_base)
+        if numero is None:
+            self.add_item(self.numero_base)
         self.add_item(self.nome)
         self.add_item(self.data)
         self.add_item(self.responsavel)
 
     async def on_submit(self, interaction: Interaction):
         try:
-            numero = int(self.numero_base.value)
-            if numero < 1 or numero > TOTAL_BASES:
+            numero = self.numero if self.numero is not None else int(self.numero_base.value)
+            if numero < 1 or numero > ilha_atual().total_bases:
                 await interaction.response.send_message(
-                    f"❌ Número inválido. Use um número entre 1 e {TOTAL_BASES}.",
+                    f"❌ Número inválido. Use um número entre 1 e {ilha_atual().total_bases}.",
                     ephemeral=True
                 )
                 return
             
-            base = next((b for b in bases if b.numero == numero), None)
+            base = ilha_atual().estado.obter(numero)
             if not base:
                 await interaction.response.send_message(f"❌ Base {numero} não encontrada.", ephemeral=True)
                 return
@@ -1754,22 +4004,34 @@ class BaseActionModal(ui.Modal):
                 await interaction.response.send_message(f"❌ Base {numero} já está {base.status}.", ephemeral=True)
                 return
             
-            # Salva histórico antes de mudar
-            adicionar_historico(base, base.status, base.nome, base.data, 
-                              base.responsavel, f"Status anterior: {base.status}")
-            
-            # Atualiza dados
-            base.nome = self.nome.value
-            base.data = self.data.value
-            base.responsavel = self.responsavel.value
-            base.status = self.target_status
-            
-            # Salva no banco de dados
-            salvar_base(base)
-            
-            # Adiciona novo registro ao histórico
-            adicionar_historico(base, self.target_status, self.nome.value, self.data.value, 
-                              self.responsavel.value, f"Base {self.target_status}")
+            # Histórico do estado anterior + novo estado + histórico novo, numa transação só
+            transicao = Transicao(
+                acao=self.target_status, status_esperado="livre", status=self.target_status,
+                nome=self.nome.value, data=self.data.value, responsavel=self.responsavel.value,
+                historico=(
+                    (base.status, base.nome, base.data, base.responsavel, f"Status anterior: {base.status}"),
+                    (self.target_status, self.nome.value, self.data.value, self.responsavel.value,
+                     f"Base {self.target_status}"),
+                ),
+            )
+            resultado = await aplicar_transicao(str(interaction.id), base, transicao)
+            registrar_evento(
+                "transicao", interaction, base=numero, acao=transicao.acao,
+                de=transicao.status_esperado, para=transicao.status, resultado=resultado, chave=str(interaction.id),
+            )
+            if resultado == "duplicada":
+                # Reenvio da mesma interação: a ação já foi registrada, só falta responder
+                if not interaction.response.is_done():
+                    await interaction.response.send_message(
+                        f"ℹ️ Esta ação na Base {numero} já foi registrada.", ephemeral=True
+                    )
+                return
+            if resultado == "desfeita":
+                await interaction.response.send_message(
+                    f"❌ Base {numero} mudou de status enquanto o formulário estava aberto. Nada foi alterado.",
+                    ephemeral=True
+                )
+                return
             
             status_emoji = "🟡" if self.target_status == "reservada" else "🔴"
             status_text = "reservada" if self.target_status == "reservada" else "ocupada"
@@ -1795,19 +4057,19 @@ class BaseActionModal(ui.Modal):
 
 
 class OcuparBaseModal(BaseActionModal):
-    def __init__(self):
-        super().__init__(title="Ocupar Base", target_status="ocupada")
+    def __init__(self, numero: Optional[int] = None):
+        super().__init__(title="Ocupar Base", target_status="ocupada", numero=numero)
 
 
 class ReservarBaseModal(BaseActionModal):
-    def __init__(self):
-        super().__init__(title="Reservar Base", target_status="reservada")
+    def __init__(self, numero: Optional[int] = None):
+        super().__init__(title="Reservar Base", target_status="reservada", numero=numero)
 
 
 # -------------------------------------------------
 #  NOVOS MODAIS PARA BASES RESERVADAS
 # -------------------------------------------------
-class OcuparBaseReservadaModal(ui.Modal, title="Ocupar Base Reservada"):
+class OcuparBaseReservadaModal(ModalIlha, title="Ocupar Base Reservada"):
     """Modal para ocupar uma base que está reservada."""
     
     numero_base = ui.TextInput(
@@ -1835,17 +4097,24 @@ class OcuparBaseReservadaModal(ui.Modal, title="Ocupar Base Reservada"):
         max_length=50
     )
 
+    def __init__(self, numero: Optional[int] = None):
+        super().__init__()
+        self.numero = numero  # Base já escolhida no menu (sem campo de número)
+        if numero is not None:
+            self.title = f"Ocupar Base Reservada {numero}"
+            self.remove_item(self.numero_base)
+
     async def on_submit(self, interaction: Interaction):
         try:
-            numero = int(self.numero_base.value)
-            if numero < 1 or numero > TOTAL_BASES:
+            numero = self.numero if self.numero is not None else int(self.numero_base.value)
+            if numero < 1 or numero > ilha_atual().total_bases:
                 await interaction.response.send_message(
-                    f"❌ Número inválido. Use um número entre 1 e {TOTAL_BASES}.",
+                    f"❌ Número inválido. Use um número entre 1 e {ilha_atual().total_bases}.",
                     ephemeral=True
                 )
                 return
             
-            base = next((b for b in bases if b.numero == numero), None)
+            base = ilha_atual().estado.obter(numero)
             if not base:
                 await interaction.response.send_message(f"❌ Base {numero} não encontrada.", ephemeral=True)
                 return
@@ -1857,22 +4126,33 @@ class OcuparBaseReservadaModal(ui.Modal, title="Ocupar Base Reservada"):
                 )
                 return
             
-            # Salva histórico antes de mudar
-            adicionar_historico(base, base.status, base.nome, base.data, 
-                              base.responsavel, f"Ocupação de base reservada")
-            
-            # Atualiza dados
-            base.nome = self.nome.value
-            base.data = self.data.value
-            base.responsavel = self.responsavel.value
-            base.status = "ocupada"
-            
-            # Salva no banco de dados
-            salvar_base(base)
-            
-            # Adiciona novo registro ao histórico
-            adicionar_historico(base, "ocupada", self.nome.value, self.data.value, 
-                              self.responsavel.value, "Ocupação de base reservada")
+            # Histórico do estado anterior + novo estado + histórico novo, numa transação só
+            transicao = Transicao(
+                acao="ocupar_reservada", status_esperado="reservada", status="ocupada",
+                nome=self.nome.value, data=self.data.value, responsavel=self.responsavel.value,
+                historico=(
+                    (base.status, base.nome, base.data, base.responsavel, "Ocupação de base reservada"),
+                    ("ocupada", self.nome.value, self.data.value, self.responsavel.value, "Ocupação de base reservada"),
+                ),
+            )
+            resultado = await aplicar_transicao(str(interaction.id), base, transicao)
+            registrar_evento(
+                "transicao", interaction, base=numero, acao=transicao.acao,
+                de=transicao.status_esperado, para=transicao.status, resultado=resultado, chave=str(interaction.id),
+            )
+            if resultado == "duplicada":
+                # Reenvio da mesma interação: a ação já foi registrada, só falta responder
+                if not interaction.response.is_done():
+                    await interaction.response.send_message(
+                        f"ℹ️ Esta ação na Base {numero} já foi registrada.", ephemeral=True
+                    )
+                return
+            if resultado == "desfeita":
+                await interaction.response.send_message(
+                    f"❌ Base {numero} mudou de status enquanto o formulário estava aberto. Nada foi alterado.",
+                    ephemeral=True
+                )
+                return
             
             await interaction.response.send_message(
                 f"✅ 🔴 Base **{numero}** (reservada) agora está **OCUPADA**!\n"
@@ -1894,7 +4174,7 @@ class OcuparBaseReservadaModal(ui.Modal, title="Ocupar Base Reservada"):
                 pass
 
 
-class DisponibilizarBaseModal(ui.Modal, title="Disponibilizar Base Reservada"):
+class DisponibilizarBaseModal(ModalIlha, title="Disponibilizar Base Reservada"):
     """Modal para disponibilizar uma base reservada."""
     
     numero_base = ui.TextInput(
@@ -1923,17 +4203,24 @@ class DisponibilizarBaseModal(ui.Modal, title="Disponibilizar Base Reservada"):
         max_length=500
     )
 
+    def __init__(self, numero: Optional[int] = None):
+        super().__init__()
+        self.numero = numero  # Base já escolhida no menu (sem campo de número)
+        if numero is not None:
+            self.title = f"Disponibilizar Base Reservada {numero}"
+            self.remove_item(self.numero_base)
+
     async def on_submit(self, interaction: Interaction):
         try:
-            numero = int(self.numero_base.value)
-            if numero < 1 or numero > TOTAL_BASES:
+            numero = self.numero if self.numero is not None else int(self.numero_base.value)
+            if numero < 1 or numero > ilha_atual().total_bases:
                 await interaction.response.send_message(
-                    f"❌ Número inválido. Use um número entre 1 e {TOTAL_BASES}.",
+                    f"❌ Número inválido. Use um número entre 1 e {ilha_atual().total_bases}.",
                     ephemeral=True
                 )
                 return
             
-            base = next((b for b in bases if b.numero == numero), None)
+            base = ilha_atual().estado.obter(numero)
             if not base:
                 await interaction.response.send_message(f"❌ Base {numero} não encontrada.", ephemeral=True)
                 return
@@ -1945,22 +4232,33 @@ class DisponibilizarBaseModal(ui.Modal, title="Disponibilizar Base Reservada"):
                 )
                 return
             
-            # Salva histórico antes de mudar
-            adicionar_historico(base, base.status, base.nome, base.data, 
-                              base.responsavel, f"Disponibilização: {self.motivo.value}")
-            
-            # Remove dados da reserva
-            base.status = "livre"
-            base.nome = None
-            base.data = None
-            base.responsavel = None
-            
-            # Salva no banco de dados
-            salvar_base(base)
-            
-            # Adiciona registro de disponibilização
-            adicionar_historico(base, "livre", motivo=self.motivo.value, 
-                              data=self.data.value, responsavel=self.responsavel.value)
+            # Histórico da reserva + base livre + registro da disponibilização, numa transação só
+            transicao = Transicao(
+                acao="disponibilizar", status_esperado="reservada", status="livre",
+                nome=None, data=None, responsavel=None,
+                historico=(
+                    (base.status, base.nome, base.data, base.responsavel, f"Disponibilização: {self.motivo.value}"),
+                    ("livre", None, self.data.value, self.responsavel.value, self.motivo.value),
+                ),
+            )
+            resultado = await aplicar_transicao(str(interaction.id), base, transicao)
+            registrar_evento(
+                "transicao", interaction, base=numero, acao=transicao.acao,
+                de=transicao.status_esperado, para=transicao.status, resultado=resultado, chave=str(interaction.id),
+            )
+            if resultado == "duplicada":
+                # Reenvio da mesma interação: a ação já foi registrada, só falta responder
+                if not interaction.response.is_done():
+                    await interaction.response.send_message(
+                        f"ℹ️ Esta ação na Base {numero} já foi registrada.", ephemeral=True
+                    )
+                return
+            if resultado == "desfeita":
+                await interaction.response.send_message(
+                    f"❌ Base {numero} mudou de status enquanto o formulário estava aberto. Nada foi alterado.",
+                    ephemeral=True
+                )
+                return
             
             await interaction.response.send_message(
                 f"✅ 🟢 Base **{numero}** (reservada) foi **DISPONIBILIZADA**!\n"
@@ -1972,6 +4270,7 @@ class DisponibilizarBaseModal(ui.Modal, title="Disponibilizar Base Reservada"):
             )
             
             atualizar_painel_principal()
+            criar_tarefa(avisar_base_livre(ilha_atual(), numero))  # Quem pediu aviso
                 
         except ValueError:
             await interaction.response.send_message("❌ Por favor, insira um número válido para a base.", ephemeral=True)
@@ -1983,7 +4282,7 @@ class DisponibilizarBaseModal(ui.Modal, title="Disponibilizar Base Reservada"):
                 pass
 
 
-class DesocuparBaseModal(ui.Modal, title="Desocupar Base"):
+class DesocuparBaseModal(ModalIlha, title="Desocupar Base"):
     numero_base = ui.TextInput(
         label="Número da Base a Desocupar (1-14)",
         placeholder="Ex.: 5",
@@ -2004,45 +4303,63 @@ class DesocuparBaseModal(ui.Modal, title="Desocupar Base"):
         max_length=500
     )
 
+    def __init__(self, numero: Optional[int] = None):
+        super().__init__()
+        self.numero = numero  # Base já escolhida no menu (sem campo de número)
+        if numero is not None:
+            self.title = f"Desocupar Base {numero}"
+            self.remove_item(self.numero_base)
+
     async def on_submit(self, interaction: Interaction):
         try:
-            numero = int(self.numero_base.value)
-            if numero < 1 or numero > TOTAL_BASES:
+            numero = self.numero if self.numero is not None else int(self.numero_base.value)
+            if numero < 1 or numero > ilha_atual().total_bases:
                 await interaction.response.send_message(
-                    f"❌ Número inválido. Use um número entre 1 e {TOTAL_BASES}.",
+                    f"❌ Número inválido. Use um número entre 1 e {ilha_atual().total_bases}.",
                     ephemeral=True
                 )
                 return
             
-            base = next((b for b in bases if b.numero == numero), None)
+            base = ilha_atual().estado.obter(numero)
             if not base:
                 await interaction.response.send_message(f"❌ Base {numero} não encontrada.", ephemeral=True)
                 return
-            
-            if base.status != "ocupada":
+            
+            if base.status != "ocupada":
+                await interaction.response.send_message(
+                    f"❌ Base {numero} não está ocupada. Status atual: {base.status}",
+                    ephemeral=True
+                )
+                return
+            
+            # Histórico da ocupação + base livre + registro da desocupação, numa transação só
+            transicao = Transicao(
+                acao="desocupar", status_esperado="ocupada", status="livre",
+                nome=None, data=None, responsavel=None,
+                historico=(
+                    (base.status, base.nome, base.data, base.responsavel, f"Desocupação: {self.motivo.value}"),
+                    ("livre", None, self.data.value, interaction.user.name, self.motivo.value),
+                ),
+            )
+            resultado = await aplicar_transicao(str(interaction.id), base, transicao)
+            registrar_evento(
+                "transicao", interaction, base=numero, acao=transicao.acao,
+                de=transicao.status_esperado, para=transicao.status, resultado=resultado, chave=str(interaction.id),
+            )
+            if resultado == "duplicada":
+                # Reenvio da mesma interação: a ação já foi registrada, só falta responder
+                if not interaction.response.is_done():
+                    await interaction.response.send_message(
+                        f"ℹ️ Esta ação na Base {numero} já foi registrada.", ephemeral=True
+                    )
+                return
+            if resultado == "desfeita":
                 await interaction.response.send_message(
-                    f"❌ Base {numero} não está ocupada. Status atual: {base.status}",
+                    f"❌ Base {numero} mudou de status enquanto o formulário estava aberto. Nada foi alterado.",
                     ephemeral=True
                 )
                 return
             
-            # Salva histórico antes de mudar
-            adicionar_historico(base, base.status, base.nome, base.data, 
-                              base.responsavel, f"Desocupação: {self.motivo.value}")
-            
-            # Remove dados da ocupação
-            base.status = "livre"
-            base.nome = None
-            base.data = None
-            base.responsavel = None
-            
-            # Salva no banco de dados
-            salvar_base(base)
-            
-            # Adiciona registro de desocupação
-            adicionar_historico(base, "livre", motivo=self.motivo.value, 
-                              data=self.data.value, responsavel=interaction.user.name)
-            
             await interaction.response.send_message(
                 f"✅ 🟢 Base **{numero}** desocupada com sucesso!\n"
                 f"**Motivo:** {self.motivo.value}\n"
@@ -2053,6 +4370,7 @@ class DesocuparBaseModal(ui.Modal, title="Desocupar Base"):
             )
             
             atualizar_painel_principal()
+            criar_tarefa(avisar_base_livre(ilha_atual(), numero))  # Quem pediu aviso
                 
         except ValueError:
             await interaction.response.send_message("❌ Por favor, insira um número válido para a base.", ephemeral=True)
@@ -2065,79 +4383,360 @@ class DesocuparBaseModal(ui.Modal, title="Desocupar Base"):
 
 
 # -------------------------------------------------
-#  Eventos
+#  View da busca no histórico
 # -------------------------------------------------
-@bot.event
-async def on_ready():
-    print(f"🤖 Bot conectado como {bot.user} (ID: {bot.user.id})")
+EMOJI_STATUS = {"livre": "🟢", "reservada": "🟡", "ocupada": "🔴"}
+
+class BuscaHistoricoView(SafeView):
+    """Resultados do /buscar, paginados pelo id do último registro de cada página."""
+    def __init__(self, consulta: str, descricao: str, base: Optional[int] = None):
+        super().__init__(timeout=300)
+        self.guild_id = ilha_atual().guild_id
+        self.consulta = consulta
+        self.descricao = descricao
+        self.base = base
+        self.cursores = [None]  # `antes_de` de cada página já visitada
+        self.pagina = 0
+        self.tem_proxima = False
+    
+    async def carregar_pagina(self) -> Embed:
+        """Busca a página atual (um registro a mais só para saber se há próxima), fora do event loop."""
+        inicio = time.perf_counter()
+        linhas = await asyncio.to_thread(
+            buscar_historico, self.guild_id, self.consulta, self.base, self.cursores[self.pagina], RESULTADOS_POR_PAGINA + 1
+        )
+        metricas["busca_consultas"] += 1
+        metricas["busca_ms"] += int((time.perf_counter() - inicio) * 1000)
+        
+        self.tem_proxima = len(linhas) > RESULTADOS_POR_PAGINA
+        linhas = linhas[:RESULTADOS_POR_PAGINA]
+        if self.tem_proxima and len(self.cursores) == self.pagina + 1:
+            self.cursores.append(linhas[-1][0])
+        
+        embed = Embed(title="🔍 Busca no Histórico", description=f"**Busca:** {self.descricao}", colour=Colour.blurple())
+        for id_registro, numero, status, nome, responsavel, motivo, data_registro in linhas:
+            detalhes = [f"**Nome:** {nome}" if nome else None,
+                        f"**Responsável:** {responsavel}" if responsavel else None,
+                        f"**Motivo:** {motivo}" if motivo else None,
+                        f"**Registrado em:** {data_registro}"]
+            embed.add_field(
+                name=f"{EMOJI_STATUS.get(status, '⚪')} Base {numero} • {str(status).title()} (#{id_registro})",
+                value="\n".join(d for d in detalhes if d)[:1024],
+                inline=False,
+            )
+        if not linhas:
+            embed.add_field(name="Nenhum resultado", value="Tente outras palavras ou outro campo.", inline=False)
+        embed.set_footer(text=f"Página {self.pagina + 1}")
+        
+        self.update_buttons()
+        return embed
+    
+    def update_buttons(self):
+        self.clear_items()
+        
+        prev_button = ui.Button(label="◀️ Anterior", style=discord.ButtonStyle.primary, disabled=(self.pagina == 0))
+        prev_button.callback = self.prev_page_callback
+        self.add_item(prev_button)
+        
+        next_button = ui.Button(label="Próximo ▶️", style=discord.ButtonStyle.primary, disabled=not self.tem_proxima)
+        next_button.callback = self.next_page_callback
+        self.add_item(next_button)
+    
+    async def prev_page_callback(self, interaction: Interaction):
+        try:
+            if interaction.response.is_done():
+                return
+            
+            if self.pagina > 0:
+                self.pagina -= 1
+            await interaction.response.edit_message(embed=await self.carregar_pagina(), view=self)
+        except discord.errors.NotFound:
+            pass
+        except Exception as e:
+            print(f"Erro em prev_page_callback busca: {e}")
+            traceback.print_exc()
+    
+    async def next_page_callback(self, interaction: Interaction):
+        try:
+            if interaction.response.is_done():
+                return
+            
+            if self.tem_proxima:
+                self.pagina += 1
+            await interaction.response.edit_message(embed=await self.carregar_pagina(), view=self)
+        except discord.errors.NotFound:
+            pass
+        except Exception as e:
+            print(f"Erro em next_page_callback busca: {e}")
+            traceback.print_exc()
+
+
+# -------------------------------------------------
+#  Inicialização
+# -------------------------------------------------
+def _comando_para_dict(comando) -> dict:
+    """Payload do comando como enviado ao Discord (compatível com discord.py 2.3 e 2.4+)."""
+    try:
+        return comando.to_dict(bot.tree)
+    except TypeError:
+        return comando.to_dict()
+
+def hash_comandos(guild: discord.abc.Snowflake) -> str:
+    """Hash da assinatura de todos os comandos slash registrados para o servidor."""
+    dados = {
+        "aplicacao": bot.application_id,
+        "guild": guild.id,
+        "comandos": sorted(
+            (_comando_para_dict(c) for c in bot.tree.get_commands(guild=guild)),
+            key=lambda c: c["name"]
+        ),
+    }
+    return hashlib.sha256(json.dumps(dados, sort_keys=True, default=str).encode()).hexdigest()
+
+async def sincronizar_comandos() -> int:
+    """Sincroniza os comandos slash de cada servidor apenas se mudaram desde a última vez.
+    
+    Retorna em quantos servidores foi preciso sincronizar.
+    """
+    sincronizados = 0
+    for guild in GUILDS_COMANDOS:
+        assinatura = hash_comandos(guild)
+        if await asyncio.to_thread(ler_meta, f"hash_comandos:{guild.id}") == assinatura:
+            continue
+        await bot.tree.sync(guild=guild)
+        await asyncio.to_thread(gravar_meta, f"hash_comandos:{guild.id}", assinatura)
+        sincronizados += 1
+    return sincronizados
+
+async def limpar_cache_fotos():
+    caminhos = [base.foto_path for ilha in ilhas.values() for base in ilha.bases]
+    try:
+        removidos = await processador_imagens.limpar_cache_disco(caminhos)
+        if removidos:
+            print(f"🧹 Cache de fotos: {removidos} arquivo(s) de fotos antigas removido(s).")
+    except Exception as e:
+        print(f"Erro ao limpar o cache de fotos: {e}")
+
+# Fases da inicialização: "parado" -> "iniciando" -> "pronto" (uma vez por processo)
+fase_inicializacao = "parado"
+
+# Espera entre as tentativas de carregar o banco (dobra a cada falha, até o máximo)
+INICIALIZACAO_ESPERA_INICIAL = 5.0
+INICIALIZACAO_ESPERA_MAXIMA = 120.0
+
+async def inicializar():
+    """Inicialização em etapas, rodando em paralelo com a conexão ao gateway.
+    
+    Executa apenas uma vez por processo; reconexões usam reconciliar_painel().
+    """
+    global fase_inicializacao
+    if fase_inicializacao != "parado":
+        return
+    fase_inicializacao = "iniciando"
+    
+    inicio = time.perf_counter()
+    etapas = []
+    
+    # 1. Banco de dados e estado das bases de todas as ilhas (fora do event loop).
+    # Uma falha aqui (banco travado, disco cheio) é tentada de novo com espera
+    # crescente: sem as bases carregadas nenhuma interação pode ser atendida
+    t = time.perf_counter()
+    espera = INICIALIZACAO_ESPERA_INICIAL
+    while True:
+        try:
+            await asyncio.to_thread(init_database)
+            # Ações ADM interrompidas por uma queda são concluídas antes de carregar as bases
+            recuperadas = await asyncio.to_thread(recuperar_operacoes)
+            if recuperadas:
+                print(f"🔁 Diário de operações: {recuperadas['aplicada']} concluída(s), {recuperadas['desfeita']} desfeita(s).")
+            for ilha in ilhas.values():
+                await asyncio.to_thread(ilha.estado.carregar)
+            break
+        except Exception as e:
+            print(f"❌ Erro ao carregar as bases do banco: {e} (nova tentativa em {espera:.0f}s)")
+            traceback.print_exc()
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, INICIALIZACAO_ESPERA_MAXIMA)
+    estado_pronto.set()
+    etapas.append(("banco", time.perf_counter() - t))
     
-    if not os.path.exists("fotos-base"):
-        print("⚠️ Pasta 'fotos-base' não encontrada. Criando...")
-        os.makedirs("fotos-base")
-        print("✅ Pasta 'fotos-base' criada.")
+    for pasta in sorted({ilha.pasta_fotos for ilha in ilhas.values()}):
+        if not os.path.exists(pasta):
+            print(f"⚠️ Pasta '{pasta}' não encontrada. Criando...")
+            os.makedirs(pasta)
+            print(f"✅ Pasta '{pasta}' criada.")
+    if FOTOS_SELO_STATUS:
+        # Fotos trocadas com o bot parado deixam versões antigas no cache em disco
+        criar_tarefa(limpar_cache_fotos())
     
+    # 2. Comandos slash (só sincroniza se a assinatura mudou)
+    t = time.perf_counter()
     try:
-        await bot.tree.sync(guild=discord.Object(id=GUILD_ID))
-        print("✅ Comandos slash sincronizados.")
+        sincronizados = await sincronizar_comandos()
+        if sincronizados:
+            print(f"✅ Comandos slash sincronizados em {sincronizados} servidor(es).")
+            etapas.append(("comandos", time.perf_counter() - t))
+        else:
+            etapas.append(("comandos (sem mudanças)", time.perf_counter() - t))
     except Exception as e:
         print(f"❌ Erro ao sincronizar commands: {e}")
     
-    # Apenas a MainView precisa ser registrada como persistente
-    bot.add_view(MainView())
-    print("✅ Views persistentes registradas.")
-
-    channel = bot.get_channel(CANAL_VENDAS_ID)
-    if channel:
-        embed = get_embed_main()
-        async for msg in channel.history(limit=200):
-            if msg.author == bot.user and msg.embeds:
-                await msg.edit(embed=embed, view=MainView())
-                print(f"✅ Embed principal atualizado no canal #{channel.name}")
-                break
+    # 3. Espera o gateway (que vem conectando desde o início)
+    await bot.wait_until_ready()
+    etapas.append(("gateway", time.perf_counter() - inicio))
+    
+    for ilha in ilhas.values():
+        await ilha.estado.iniciar()
+    if not observar_config.is_running():
+        observar_config.start()
+    
+    # 4. Painel principal de cada ilha (em paralelo, pela fila da API)
+    t = time.perf_counter()
+    lista_ilhas = list(ilhas.values())
+    resultados = await asyncio.gather(
+        *(agendar_painel(ilha, criar=True) for ilha in lista_ilhas), return_exceptions=True
+    )
+    for ilha, msg in zip(lista_ilhas, resultados):
+        if isinstance(msg, Exception):
+            print(f"❌ Erro ao publicar o painel principal de {ilha.nome_ilha}: {msg}")
+        elif msg:
+            print(f"✅ Embed principal de {ilha.nome_ilha} atualizado no canal #{msg.channel.name}")
         else:
-            await channel.send(embed=embed, view=MainView())
-            print(f"✅ Embed principal enviado no canal #{channel.name}")
-    else:
-        print("⚠️ Canal de vendas não encontrado.")
+            print(f"⚠️ Canal de vendas de {ilha.nome_ilha} não encontrado.")
+    etapas.append(("painel", time.perf_counter() - t))
+    
+    fase_inicializacao = "pronto"
+    detalhes = " | ".join(f"{nome} {segundos * 1000:.0f} ms" for nome, segundos in etapas)
+    print(f"⏱️ Inicialização: {detalhes} | total {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    
+    # Deixa o resumo do histórico em dia antes do primeiro /relatorio
+    criar_tarefa(aquecer_relatorio())
+
+
+# -------------------------------------------------
+#  Eventos
+# -------------------------------------------------
+@bot.event
+async def on_ready():
+    print(f"🤖 Bot conectado como {bot.user} (ID: {bot.user.id})")
+    
+    # on_ready dispara de novo a cada reconexão: a inicialização completa já
+    # foi feita (ou está em andamento) em inicializar()
+    if fase_inicializacao == "pronto":
+        metricas["gateway_reconexoes"] += 1
+        await reconciliar_sem_erros()
+
+
+@bot.event
+async def on_socket_event_type(event_type: str):
+    """Conta os eventos recebidos do gateway, por tipo (ver /metricas)."""
+    metricas[f"gateway_evento:{event_type}"] += 1
+
+
+@bot.event
+async def on_guild_role_create(role: discord.Role):
+    permissoes.invalidar_servidor(role.guild.id)
+
+
+@bot.event
+async def on_guild_role_delete(role: discord.Role):
+    permissoes.invalidar_servidor(role.guild.id)
+
+
+@bot.event
+async def on_guild_role_update(before: discord.Role, after: discord.Role):
+    permissoes.invalidar_servidor(after.guild.id)
+
+
+@bot.event
+async def on_member_update(before: discord.Member, after: discord.Member):
+    if before.roles != after.roles:
+        permissoes.invalidar_membro(after.id)
+
+
+@bot.event
+async def on_resumed():
+    metricas["gateway_retomadas"] += 1
+    if fase_inicializacao == "pronto":
+        await reconciliar_sem_erros()
+
+
+async def reconciliar_sem_erros():
+    try:
+        reeditados = await reconciliar_painel()
+        if reeditados:
+            print(f"🔄 {reeditados} painel(is) reeditado(s) após reconexão.")
+    except Exception as e:
+        print(f"❌ Erro ao reconciliar o painel principal: {e}")
 
 
 # -------------------------------------------------
 #  Comandos slash
 # -------------------------------------------------
-@bot.tree.command(name="test", description="Mostra o embed principal (apenas admin)", guild=discord.Object(id=GUILD_ID))
+NOMES_STATUS = {"livre": "🟢 Livre", "reservada": "🟡 Reservada", "ocupada": "🔴 Ocupada"}
+
+def autocomplete_bases(*status):
+    """Cria um autocomplete de número de base que sugere só as bases nos status pedidos.
+    
+    As sugestões vêm do índice por status do estado, sem tocar no banco.
+    """
+    async def sugerir(interaction: Interaction, atual: str) -> list:
+        digitado = atual.strip()
+        mostrar_nome = pode_ver_nomes(interaction)
+        escolhas = []
+        for numero in ilha_atual().estado.numeros_por_status(*status):
+            if digitado and not str(numero).startswith(digitado):
+                continue
+            base = ilha_atual().estado.obter(numero)
+            nome = f"Base {numero} • {NOMES_STATUS.get(base.status, base.status)}"
+            if mostrar_nome and base.nome:
+                nome += f" • {base.nome}"
+            escolhas.append(app_commands.Choice(name=nome[:100], value=numero))
+            if len(escolhas) == 25:  # Limite do Discord
+                break
+        return escolhas
+    return sugerir
+
+@bot.tree.command(name="test", description="Mostra o embed principal (apenas admin)", guilds=GUILDS_COMANDOS)
 async def test(interaction: Interaction):
     if not has_admin_role(interaction):
-        await interaction.response.send_message(f"❌ É necessário ter o cargo <@&{CARGO_ADM_ID}>.", ephemeral=True)
+        registrar_permissao_negada(interaction)
+        await interaction.response.send_message(f"❌ É necessário ter o cargo <@&{ilha_atual().cargo_adm_id}>.", ephemeral=True)
         return
-    await interaction.response.send_message(embed=get_embed_main(), view=MainView(), ephemeral=True)
+    embed, file = await get_painel_main(ilha_atual())
+    if file:
+        await interaction.response.send_message(embed=embed, view=MainView(), file=file, ephemeral=True)
+    else:
+        await interaction.response.send_message(embed=embed, view=MainView(), ephemeral=True)
 
 
-@bot.tree.command(name="ver_base", description="Visualiza informações de uma base específica", guild=discord.Object(id=GUILD_ID))
-@app_commands.describe(numero="Número da base (1-14)")
+@bot.tree.command(name="ver_base", description="Visualiza informações de uma base específica", guilds=GUILDS_COMANDOS)
+@app_commands.describe(numero="Número da base")
+@app_commands.autocomplete(numero=autocomplete_bases())
 async def ver_base(interaction: Interaction, numero: int):
-    if numero < 1 or numero > TOTAL_BASES:
-        await interaction.response.send_message(f"❌ Número inválido. Use 1-{TOTAL_BASES}.", ephemeral=True)
+    if numero < 1 or numero > ilha_atual().total_bases:
+        await interaction.response.send_message(f"❌ Número inválido. Use 1-{ilha_atual().total_bases}.", ephemeral=True)
         return
     
     # Verifica se é ADM para mostrar CDS e nomes
     mostrar_cds = has_admin_role(interaction)
-    mostrar_nome = has_admin_role(interaction)  # Nomes apenas para ADM
-    embed, file, _ = get_base_info_embed(numero, mostrar_cds, mostrar_nome)
+    mostrar_nome = pode_ver_nomes(interaction)  # Nomes apenas para moderadores/ADM
+    embed, file, _ = await get_base_info_embed(numero, mostrar_cds, mostrar_nome)
     if file:
         await interaction.response.send_message(embed=embed, file=file, ephemeral=True)
     else:
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
-@bot.tree.command(name="status_bases", description="Mostra o status atual de todas as bases", guild=discord.Object(id=GUILD_ID))
+@bot.tree.command(name="status_bases", description="Mostra o status atual de todas as bases", guilds=GUILDS_COMANDOS)
 async def status_bases(interaction: Interaction):
     # Verifica se é ADM para mostrar CDS e nomes
     mostrar_cds = has_admin_role(interaction)
-    mostrar_nome = has_admin_role(interaction)
+    mostrar_nome = pode_ver_nomes(interaction)
     
     embed = Embed(title="📊 Status das Bases", colour=Colour.purple())
     
-    for base in bases:
+    for base in ilha_atual().bases:
         status_emoji = "🟢" if base.status == "livre" else "🔴" if base.status == "ocupada" else "🟡"
         info = f"{status_emoji} **Base {base.numero}** - {base.status.title()}"
         
@@ -2155,17 +4754,22 @@ async def status_bases(interaction: Interaction):
         
         embed.add_field(name=f"Base {base.numero}", value=info, inline=True)
     
-    await interaction.response.send_message(embed=embed, ephemeral=True)
+    file = await arquivo_mapa(ilha_atual())
+    if file:
+        embed.set_image(url="attachment://mapa.png")
+        await interaction.response.send_message(embed=embed, file=file, ephemeral=True)
+    else:
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
-@bot.tree.command(name="ver_fotos", description="Visualiza as fotos das bases disponíveis", guild=discord.Object(id=GUILD_ID))
+@bot.tree.command(name="ver_fotos", description="Visualiza as fotos das bases disponíveis", guilds=GUILDS_COMANDOS)
 async def ver_fotos(interaction: Interaction):
     # Verifica se é ADM para mostrar CDS e nomes
     mostrar_cds = has_admin_role(interaction)
-    mostrar_nome = has_admin_role(interaction)
+    mostrar_nome = pode_ver_nomes(interaction)
     
     if not mostrar_cds:  # Não-ADMs veem apenas bases disponíveis
-        bases_disponiveis = [b for b in bases if b.status == "livre"]
+        bases_disponiveis = ilha_atual().estado.bases_com_status("livre")
         if not bases_disponiveis:
             await interaction.response.send_message("❌ Não há bases disponíveis no momento.", ephemeral=True)
             return
@@ -2173,10 +4777,10 @@ async def ver_fotos(interaction: Interaction):
         primeira_base = bases_disponiveis[0]
         embed, file = await criar_embed_com_foto(primeira_base, 1, len(bases_disponiveis), 
                                                 mostrar_cds=False, mostrar_nome=mostrar_nome)
-        view = BasePhotosDisponiveisView(current_page=primeira_base.numero)
+        view = BasePhotosDisponiveisView(current_page=primeira_base.numero, mostrar_nome=mostrar_nome)
     else:  # ADMs veem todas as bases
-        primeira_base = bases[0]
-        embed, file = await criar_embed_com_foto(primeira_base, 1, TOTAL_BASES, 
+        primeira_base = ilha_atual().bases[0]
+        embed, file = await criar_embed_com_foto(primeira_base, 1, ilha_atual().total_bases, 
                                                 mostrar_cds=True, mostrar_nome=True)
         view = AdminFotosTodasView(current_page=1)
     
@@ -2186,20 +4790,81 @@ async def ver_fotos(interaction: Interaction):
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
 
-@bot.tree.command(name="backup", description="Cria um backup do banco de dados (apenas admin)", guild=discord.Object(id=GUILD_ID))
+@bot.tree.command(name="base_proxima", description="Mostra as bases livres mais próximas de uma posição", guilds=GUILDS_COMANDOS)
+@app_commands.describe(x="Coordenada X", y="Coordenada Y", z="Coordenada Z (opcional)")
+async def base_proxima(interaction: Interaction, x: float, y: float, z: float = 0.0):
+    mostrar_cds = has_admin_role(interaction)
+    
+    ilha = ilha_atual()
+    
+    def livre(numero):
+        base = ilha.estado.obter(numero)
+        return base is not None and base.status == "livre"
+    
+    proximas = ilha.indice_espacial.mais_proximas(x, y, z, 5, filtro=livre)
+    if not proximas:
+        await interaction.response.send_message("❌ Não há bases livres com coordenadas definidas.", ephemeral=True)
+        return
+    
+    lista = ""
+    for i, (distancia, meta) in enumerate(proximas, 1):
+        lista += f"{i}. 🟢 **Base {meta.numero}** - {distancia:.1f} m\n"
+        if mostrar_cds:
+            lista += f"   📍 Coordenadas: {meta.cds}\n"
+    
+    embed = Embed(title="📍 Bases Livres Mais Próximas", description=lista, colour=Colour.green())
+    embed.set_footer(text=f"Posição consultada: {x:.2f}, {y:.2f}, {z:.2f}")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+@bot.tree.command(name="bases_raio", description="Lista as bases dentro de um raio (apenas admin)", guilds=GUILDS_COMANDOS)
+@app_commands.describe(x="Coordenada X", y="Coordenada Y", z="Coordenada Z", raio="Raio em metros")
+async def bases_raio(interaction: Interaction, x: float, y: float, z: float, raio: float):
+    if not has_admin_role(interaction):
+        registrar_permissao_negada(interaction)
+        await interaction.response.send_message(f"❌ É necessário ter o cargo <@&{ilha_atual().cargo_adm_id}>.", ephemeral=True)
+        return
+    
+    encontradas = ilha_atual().indice_espacial.dentro_do_raio(x, y, z, raio)
+    lista = ""
+    for distancia, meta in encontradas:
+        base = ilha_atual().estado.obter(meta.numero)
+        if base is None:
+            continue
+        status_emoji = "🟢" if base.status == "livre" else "🔴" if base.status == "ocupada" else "🟡"
+        linha = f"{status_emoji} **Base {base.numero}** - {base.status.title()} - {distancia:.1f} m"
+        if base.nome:
+            linha += f" ({base.nome})"
+        linha += f"\n   📍 Coordenadas: {meta.cds}\n"
+        if len(lista) + len(linha) > 4000:
+            lista += "…"
+            break
+        lista += linha
+    
+    embed = Embed(
+        title=f"📍 Bases num raio de {raio:.1f} m",
+        description=lista or "Nenhuma base encontrada.",
+        colour=Colour.purple(),
+    )
+    embed.set_footer(text=f"Centro: {x:.2f}, {y:.2f}, {z:.2f} • {len(encontradas)} base(s)")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+@bot.tree.command(name="backup", description="Cria um backup do banco de dados (apenas admin)", guilds=GUILDS_COMANDOS)
 async def backup(interaction: Interaction):
     if not has_admin_role(interaction):
-        await interaction.response.send_message(f"❌ É necessário ter o cargo <@&{CARGO_ADM_ID}>.", ephemeral=True)
+        registrar_permissao_negada(interaction)
+        await interaction.response.send_message(f"❌ É necessário ter o cargo <@&{ilha_atual().cargo_adm_id}>.", ephemeral=True)
         return
     
-    import shutil
     import datetime
     
     data_atual = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     backup_file = f"backup_bases_{data_atual}.db"
     
     try:
-        shutil.copy2('bases.db', backup_file)
+        await asyncio.to_thread(copiar_banco, backup_file)
+        registrar_evento("backup", interaction, arquivo=backup_file, bytes=os.path.getsize(backup_file))
         await interaction.response.send_message(
             f"✅ Backup criado com sucesso!\n"
             f"Arquivo: `{backup_file}`\n"
@@ -2207,9 +4872,324 @@ async def backup(interaction: Interaction):
             ephemeral=True
         )
     except Exception as e:
+        registrar_evento("backup", interaction, arquivo=backup_file, erro=str(e))
         await interaction.response.send_message(f"❌ Erro ao criar backup: {str(e)}", ephemeral=True)
 
 
+@bot.tree.command(name="recarregar_config", description="Recarrega o config.py sem reiniciar o bot (apenas admin)", guilds=GUILDS_COMANDOS)
+async def recarregar_config_cmd(interaction: Interaction):
+    if not has_admin_role(interaction):
+        registrar_permissao_negada(interaction)
+        await interaction.response.send_message(f"❌ É necessário ter o cargo <@&{ilha_atual().cargo_adm_id}>.", ephemeral=True)
+        return
+    
+    try:
+        alteradas = await recarregar_config()
+    except Exception as e:
+        await interaction.response.send_message(
+            f"❌ Erro no config.py, nada foi alterado: {str(e)}",
+            ephemeral=True
+        )
+        return
+    
+    if alteradas:
+        await interaction.response.send_message(
+            f"✅ Configuração recarregada!\n**Alterado:** {', '.join(alteradas)}",
+            ephemeral=True
+        )
+    else:
+        await interaction.response.send_message("ℹ️ Nenhuma alteração encontrada no config.py.", ephemeral=True)
+
+
+def memoria_rss_mb() -> float:
+    """Memória residente atual do processo, em MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        # Fora do Linux: pico de memória (ru_maxrss)
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        return 0.0
+
+
+@bot.tree.command(name="metricas", description="Mostra as métricas de desempenho do bot (apenas admin)", guilds=GUILDS_COMANDOS)
+async def metricas_cmd(interaction: Interaction):
+    if not has_admin_role(interaction):
+        registrar_permissao_negada(interaction)
+        await interaction.response.send_message(f"❌ É necessário ter o cargo <@&{ilha_atual().cargo_adm_id}>.", ephemeral=True)
+        return
+    
+    linhas = [f"`{chave}`: {valor}" for chave, valor in sorted(metricas.items())]
+    embed = Embed(
+        title="📈 Métricas do Bot",
+        description="\n".join(linhas)[:4000] or "Nenhuma métrica registrada ainda.",
+        colour=Colour.blurple(),
+    )
+    embed.add_field(name="Memória (RSS)", value=f"{memoria_rss_mb():.1f} MB", inline=True)
+    embed.add_field(name="Membros em cache", value=str(sum(len(g.members) for g in bot.guilds)), inline=True)
+    embed.add_field(name="Mensagens em cache", value=str(len(bot.cached_messages)), inline=True)
+    embed.add_field(name="Fila da API", value=str(agendador.tamanho_fila()), inline=True)
+    embed.add_field(name="Fila de imagens", value=str(processador_imagens.tamanho_fila()), inline=True)
+    embed.add_field(name="Ilhas", value=str(len(ilhas)), inline=True)
+    embed.set_footer(text="Contadores desde o início do processo")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+# O resumo do histórico é um só para todas as ilhas: um cálculo de cada vez
+_lock_relatorio = asyncio.Lock()
+
+async def obter_relatorio(ilha: Ilha, forcar: bool = False) -> dict:
+    """Relatório do histórico da ilha no dia (calculado numa thread na primeira chamada do dia)."""
+    cache = ilha.cache_relatorio
+    async with _lock_relatorio:
+        hoje = datetime.now().date()
+        if forcar or cache["dia"] != hoje:
+            cache["dados"] = await asyncio.to_thread(relatorios.calcular_relatorio, CAMINHO_BANCO, ilha.guild_id)
+            cache["dia"] = hoje
+            metricas["relatorio_calculos"] += 1
+        return cache["dados"]
+
+async def aquecer_relatorio():
+    try:
+        inicio = time.perf_counter()
+        registros = 0
+        for ilha in ilhas.values():
+            registros += (await obter_relatorio(ilha))["registros_novos"]
+        print(f"📊 Relatório do histórico pronto ({registros} registros em {time.perf_counter() - inicio:.1f}s)")
+    except Exception as e:
+        print(f"Erro ao preparar o relatório: {e}")
+
+def formatar_horas(horas: Optional[float]) -> str:
+    """Duração legível (minutos, horas ou dias) a partir de horas."""
+    if horas is None:
+        return "—"
+    if horas < 1:
+        return f"{horas * 60:.0f} min"
+    if horas < 48:
+        return f"{horas:.1f} h"
+    return f"{horas / 24:.1f} dias"
+
+
+@bot.tree.command(name="relatorio", description="Estatísticas de ocupação e vendas das bases (apenas admin)", guilds=GUILDS_COMANDOS)
+@app_commands.describe(atualizar="Recalcula agora em vez de usar o relatório do dia")
+async def relatorio(interaction: Interaction, atualizar: bool = False):
+    if not has_admin_role(interaction):
+        registrar_permissao_negada(interaction)
+        await interaction.response.send_message(f"❌ É necessário ter o cargo <@&{ilha_atual().cargo_adm_id}>.", ephemeral=True)
+        return
+    
+    await interaction.response.defer(ephemeral=True)
+    try:
+        dados = await obter_relatorio(ilha_atual(), forcar=atualizar)
+    except Exception as e:
+        print(f"Erro ao calcular relatório: {e}")
+        traceback.print_exc()
+        await enviar_followup(interaction, content=f"❌ Erro ao calcular o relatório: {str(e)}", ephemeral=True)
+        return
+    
+    por_base = dados["bases"]
+    embed = Embed(title="📊 Relatório das Bases", colour=Colour.blurple())
+    
+    mais_ocupadas = sorted(por_base.items(), key=lambda item: item[1]["taxa_ocupacao"], reverse=True)[:10]
+    embed.add_field(
+        name="🔴 Mais tempo ocupadas",
+        value="\n".join(f"Base {n}: {r['taxa_ocupacao']:.0%} ({r['ocupacoes']} ocupações)" for n, r in mais_ocupadas) or "—",
+        inline=True,
+    )
+    
+    vendidas = [(n, r) for n, r in por_base.items() if r["tempo_medio_venda_h"] is not None]
+    mais_rapidas = sorted(vendidas, key=lambda item: item[1]["tempo_medio_venda_h"])[:10]
+    embed.add_field(
+        name="⚡ Vendem mais rápido (tempo livre)",
+        value="\n".join(f"Base {n}: {formatar_horas(r['tempo_medio_venda_h'])}" for n, r in mais_rapidas) or "—",
+        inline=True,
+    )
+    
+    conversao = dados["reserva_ocupacao"]
+    embed.add_field(
+        name="🟡 Reserva → Ocupação",
+        value=f"{conversao['conversoes']} conversões\nTempo médio: {formatar_horas(conversao['tempo_medio_h'])}",
+        inline=False,
+    )
+    
+    faccoes = sorted(dados["faccoes"].items(), key=lambda item: item[1]["ocupacoes"], reverse=True)[:10]
+    embed.add_field(
+        name="🏴 Facções com mais ocupações",
+        value="\n".join(
+            f"**{nome}**: {f['ocupacoes']} ocupações em {f['bases']} bases, "
+            f"{formatar_horas(f['tempo_medio_h'])} em média"
+            for nome, f in faccoes
+        )[:1024] or "—",
+        inline=False,
+    )
+    embed.set_footer(
+        text=f"Calculado em {ilha_atual().cache_relatorio['dia'].strftime('%d/%m/%Y')} • "
+             f"{dados['registros_novos']} registros novos em {dados['segundos']:.2f}s"
+    )
+    await enviar_followup(interaction, embed=embed, ephemeral=True)
+
+
+def converter_data(texto: Optional[str]) -> Optional[str]:
+    """Converte dd/mm/aaaa para AAAA-MM-DD (data local). Levanta ValueError se inválida."""
+    if not texto:
+        return None
+    return datetime.strptime(texto.strip(), "%d/%m/%Y").strftime("%Y-%m-%d")
+
+
+@bot.tree.command(name="exportar_historico", description="Exporta o histórico das bases em CSV compactado (apenas admin)", guilds=GUILDS_COMANDOS)
+@app_commands.describe(
+    base="Exporta só esta base",
+    data_inicio="A partir de (dd/mm/aaaa)",
+    data_fim="Até (dd/mm/aaaa, inclusive)",
+)
+@app_commands.autocomplete(base=autocomplete_bases())
+async def exportar_historico(interaction: Interaction, base: Optional[int] = None,
+                             data_inicio: Optional[str] = None, data_fim: Optional[str] = None):
+    if not has_admin_role(interaction):
+        registrar_permissao_negada(interaction)
+        await interaction.response.send_message(f"❌ É necessário ter o cargo <@&{ilha_atual().cargo_adm_id}>.", ephemeral=True)
+        return
+    
+    try:
+        inicio = converter_data(data_inicio)
+        fim = converter_data(data_fim)
+    except ValueError:
+        await interaction.response.send_message("❌ Data inválida. Use o formato dd/mm/aaaa.", ephemeral=True)
+        return
+    
+    await interaction.response.defer(ephemeral=True)
+    
+    import tempfile
+    import shutil
+    
+    data_atual = datetime.now().strftime("%Y%m%d_%H%M%S")
+    nome_arquivo = f"historico_{data_atual}.csv.gz"
+    fd, caminho_temp = tempfile.mkstemp(suffix=".csv.gz")
+    os.close(fd)
+    try:
+        linhas = await asyncio.to_thread(
+            relatorios.exportar_historico_csv, CAMINHO_BANCO, caminho_temp, ilha_atual().guild_id, base, inicio, fim
+        )
+        tamanho = os.path.getsize(caminho_temp)
+        resumo = f"{linhas} registros • {tamanho / 1024:.2f} KB"
+        
+        limite = interaction.guild.filesize_limit if interaction.guild else 10 * 1024 * 1024
+        if tamanho <= limite:
+            await agendador.executar(
+                lambda: interaction.followup.send(
+                    f"✅ Histórico exportado! ({resumo})",
+                    file=discord.File(caminho_temp, filename=nome_arquivo),
+                    ephemeral=True,
+                ),
+                PRIORIDADE_INTERACAO, rota="exportacao", balde=f"interacao:{interaction.id}",
+            )
+        else:
+            # Grande demais para o Discord: fica no servidor, como o /backup
+            shutil.move(caminho_temp, nome_arquivo)
+            await enviar_followup(
+                interaction,
+                content=f"⚠️ O arquivo passou do limite de envio do servidor e foi salvo no bot.\n"
+                        f"Arquivo: `{nome_arquivo}` ({resumo})",
+                ephemeral=True,
+            )
+    except Exception as e:
+        print(f"Erro ao exportar histórico: {e}")
+        traceback.print_exc()
+        await enviar_followup(interaction, content=f"❌ Erro ao exportar o histórico: {str(e)}", ephemeral=True)
+    finally:
+        if os.path.exists(caminho_temp):
+            os.remove(caminho_temp)
+
+
+async def autocomplete_busca(interaction: Interaction, atual: str) -> list:
+    """Sugere facções (ou responsáveis) já registrados no histórico."""
+    if not has_admin_role(interaction):
+        return []
+    campo = getattr(interaction.namespace, "campo", None)
+    if campo == "motivo":
+        return []
+    nomes = await asyncio.to_thread(
+        sugerir_nomes, ilha_atual().guild_id, atual, "responsavel" if campo == "responsavel" else "nome"
+    )
+    return [app_commands.Choice(name=nome[:100], value=nome[:100]) for nome in nomes]
+
+
+@bot.tree.command(name="buscar", description="Busca no histórico por facção, responsável ou motivo (apenas admin)", guilds=GUILDS_COMANDOS)
+@app_commands.describe(
+    texto="Palavras a procurar (todas precisam aparecer)",
+    campo="Onde procurar (padrão: em todos)",
+    base="Só nesta base",
+)
+@app_commands.choices(campo=[
+    app_commands.Choice(name="Facção/Nome", value="nome"),
+    app_commands.Choice(name="Responsável", value="responsavel"),
+    app_commands.Choice(name="Motivo", value="motivo"),
+])
+@app_commands.autocomplete(texto=autocomplete_busca, base=autocomplete_bases())
+async def buscar(interaction: Interaction, texto: str, campo: Optional[str] = None, base: Optional[int] = None):
+    if not has_admin_role(interaction):
+        registrar_permissao_negada(interaction)
+        await interaction.response.send_message(f"❌ É necessário ter o cargo <@&{ilha_atual().cargo_adm_id}>.", ephemeral=True)
+        return
+    
+    consulta = montar_consulta_fts(texto, campo)
+    if not consulta:
+        await interaction.response.send_message("❌ Digite ao menos uma palavra para buscar.", ephemeral=True)
+        return
+    
+    descricao = f"`{texto}`" + (f" em **{campo}**" if campo else "") + (f" na base {base}" if base else "")
+    view = BuscaHistoricoView(consulta, descricao, base)
+    try:
+        embed = await view.carregar_pagina()
+    except sqlite3.OperationalError as e:
+        await interaction.response.send_message(f"❌ Busca inválida: {str(e)}", ephemeral=True)
+        return
+    await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+
+
+@bot.tree.command(name="avisar_quando_livre", description="Receba uma DM quando uma base ficar livre", guilds=GUILDS_COMANDOS)
+@app_commands.describe(base="Número da base (deixe vazio para qualquer base)")
+@app_commands.autocomplete(base=autocomplete_bases("reservada", "ocupada"))
+async def avisar_quando_livre(interaction: Interaction, base: Optional[int] = None):
+    ilha = ilha_atual()
+    if base is not None:
+        if base < 1 or base > ilha.total_bases:
+            await interaction.response.send_message(f"❌ Número inválido. Use 1-{ilha.total_bases}.", ephemeral=True)
+            return
+        if ilha.estado.obter(base).status == "livre":
+            await interaction.response.send_message(f"🟢 A base {base} já está livre!", ephemeral=True)
+            return
+    
+    inscrito = await asyncio.to_thread(inscrever_aviso, ilha.guild_id, base or 0, interaction.user.id)
+    alvo = f"a **Base {base}**" if base is not None else "**qualquer base**"
+    if inscrito is None:
+        await interaction.response.send_message(
+            f"❌ Você já tem {AVISOS_POR_USUARIO} avisos ativos. Use /cancelar_aviso para liberar algum.",
+            ephemeral=True
+        )
+    elif inscrito:
+        await interaction.response.send_message(
+            f"🔔 Pronto! Você vai receber uma DM quando {alvo} ficar livre (um aviso só).\n"
+            f"Se suas DMs estiverem fechadas, o aviso vem com uma menção em <#{ilha.canal_vendas_id}>.",
+            ephemeral=True
+        )
+    else:
+        await interaction.response.send_message(f"ℹ️ Você já vai ser avisado quando {alvo} ficar livre.", ephemeral=True)
+
+
+@bot.tree.command(name="cancelar_aviso", description="Cancela os avisos de base livre", guilds=GUILDS_COMANDOS)
+@app_commands.describe(base="Número da base (deixe vazio para cancelar todos)")
+async def cancelar_aviso(interaction: Interaction, base: Optional[int] = None):
+    removidos = await asyncio.to_thread(cancelar_avisos, ilha_atual().guild_id, interaction.user.id, base)
+    if removidos:
+        await interaction.response.send_message(f"🔕 {removidos} aviso(s) cancelado(s).", ephemeral=True)
+    else:
+        await interaction.response.send_message("ℹ️ Nenhum aviso encontrado para cancelar.", ephemeral=True)
+
 # -------------------------------------------------
 #  Inicia o bot
 # -------------------------------------------------
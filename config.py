@@ -9,6 +9,12 @@ CANAL_TICKET_ID = 1411360902770462872   # (pode ser o mesmo ou outro)
 # ID do cargo que pode acessar o menu ADM
 CARGO_ADM_ID = 1414499366504370236      # ID do cargo de administrador
 
+# Outros cargos com acesso ADM (além do CARGO_ADM_ID)
+CARGOS_ADM_IDS = []
+
+# Cargos que podem ver nomes de facções e responsáveis, sem acesso ao menu ADM
+CARGOS_MODERADOR_IDS = []
+
 # Mensagem principal (embed)
 EMBED_TITLE = "🏰 DOMINAÇÃO DA ILHA: VENDAS ABERTAS! 🏰"
 EMBED_DESCRIPTION = """
@@ -37,3 +43,90 @@ Para ver os preços, localizações exatas e garantir a sua, você precisa abrir
 
 # Número total de bases (pode mudar futuramente)
 TOTAL_BASES = 14
+
+# Coordenadas fixas de cada base
+COORDENADAS_BASES = {
+    1: "4767.86, -6014.95, 31.93",
+    2: "4733.57, -5608.5, 35.08",
+    3: "4818.07, -5280.29, 22.43",
+    4: "4854.77, -4929.04, 15.08",
+    5: "5526.66, -5874.5, 36.75",
+    6: "4671.42, -4648.25, 17.98",
+    7: "4142.85, -4465.0, 14.14",
+    8: "5579.31, -5169.58, 26.44",
+    9: "4835.74, -4279.06, 17.09",
+    10: "5045.78, -4458.42, 15.13",
+    11: "5385.28, -5088.19, 26.67",
+    12: "5196.73, -4696.33, 14.05",
+    13: "5144.96, -4839.99, 19.12",
+    14: "5095.63, -5055.89, 14.52"
+}
+
+# Pasta com as fotos das bases ("base 1.png", "base 2.png", ...)
+PASTA_FOTOS = "fotos-base"
+
+# Localização das bases
+NOME_ILHA = "Ilha"
+
+# Outras ilhas/servidores atendidos pelo mesmo processo. Cada item usa as
+# mesmas chaves da ilha principal acima, em minúsculas; "guild_id" e
+# "canal_vendas_id" são obrigatórios e as demais, se faltarem, vêm da ilha
+# principal. Cada servidor tem suas próprias bases, painel e comandos. Ex.:
+# ILHAS_EXTRAS = [
+#     {
+#         "guild_id": 123456789012345678,
+#         "canal_vendas_id": 123456789012345678,
+#         "cargo_adm_id": 123456789012345678,
+#         "total_bases": 20,
+#         "nome_ilha": "Ilha Norte",
+#         "pasta_fotos": "fotos-norte",
+#         "coordenadas_bases": {1: "100.0, 200.0, 30.0"},
+#     },
+# ]
+ILHAS_EXTRAS = []
+
+# EMBED_TITLE, EMBED_DESCRIPTION, TOTAL_BASES, COORDENADAS_BASES, PASTA_FOTOS e
+# NOME_ILHA (e as mesmas chaves das ILHAS_EXTRAS já existentes) são recarregados
+# automaticamente quando este arquivo muda (ou via /recarregar_config). Os IDs
+# e a lista de servidores exigem reiniciar o bot.
+# Intervalo (em segundos) entre verificações de alteração deste arquivo
+CONFIG_INTERVALO_VERIFICACAO = 5
+
+# Backend de estado das bases:
+#   "local"  -> estado apenas na memória deste processo (padrão)
+#   "sqlite" -> vários processos do bot compartilhando o mesmo bases.db
+ESTADO_BACKEND = "local"
+
+# Intervalo (em segundos) entre verificações de alterações feitas por outros processos
+ESTADO_INTERVALO_POLL = 0.05
+
+# Intents do gateway. O bot só precisa de "guilds" (canais e cargos): as
+# interações já trazem os dados do membro. Adicione outros aqui se algum
+# recurso novo precisar (ex.: ["members", "message_content"]).
+INTENTS_EXTRAS = []
+
+# Quantidade de mensagens mantidas em cache pelo discord.py (None desliga)
+CACHE_MENSAGENS = None
+
+# Imagens (mapa, miniaturas e fotos) são geradas em processos separados.
+# Com a fila cheia, quem pede uma imagem espera uma vaga.
+IMAGENS_PROCESSOS = 2
+IMAGENS_FILA_MAXIMA = 32
+
+# Fotos enviadas nos embeds: reduzidas para esta largura e convertidas para
+# JPEG (bem mais leves que os PNG originais). None envia o arquivo original.
+FOTOS_LARGURA_ENVIO = 1280
+FOTOS_QUALIDADE_ENVIO = 85
+
+# Carimba nas fotos um selo com o número e o status da base. As fotos com selo
+# ficam guardadas em PASTA_CACHE_IMAGENS e só são refeitas quando o status (ou
+# a foto) muda.
+FOTOS_SELO_STATUS = True
+PASTA_CACHE_IMAGENS = "cache-fotos"
+
+# Auditoria das ações ADM (mudanças de status, backups e permissões negadas):
+# um evento JSON por linha, gravado em lotes. Ao passar de AUDITORIA_MAX_BYTES
+# o arquivo é renomeado para .1, .2, ... (None desliga a auditoria).
+AUDITORIA_ARQUIVO = "auditoria.log"
+AUDITORIA_MAX_BYTES = 10 * 1024 * 1024
+AUDITORIA_ARQUIVOS_ANTIGOS = 5
@@ -0,0 +1,221 @@
+# imagens.py
+"""Geração de imagens das bases com Pillow.
+
+As funções deste módulo recebem e retornam apenas dados simples (listas,
+tuplas, bytes) para poderem rodar fora do event loop do bot, em outro processo.
+"""
+import io
+from functools import lru_cache
+from PIL import Image, ImageDraw, ImageFont
+
+# Cores por status (RGB)
+CORES_STATUS = {
+    "livre": (87, 242, 135),
+    "reservada": (254, 231, 92),
+    "ocupada": (237, 66, 69),
+}
+COR_DESCONHECIDA = (153, 170, 181)
+COR_FUNDO = (30, 33, 36)
+COR_TEXTO = (255, 255, 255)
+
+
+def _fonte(tamanho: int):
+    """Fonte padrão do Pillow no tamanho pedido (ou a fonte bitmap em versões antigas)."""
+    try:
+        return ImageFont.load_default(size=tamanho)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def renderizar_mapa(pontos: list, largura: int = 1024, altura: int = 768) -> bytes:
+    """Desenha todas as bases num único PNG, coloridas pelo status.
+
+    `pontos` é uma lista de tuplas (numero, x, y, status). Retorna os bytes do PNG.
+    """
+    imagem = Image.new("RGB", (largura, altura), COR_FUNDO)
+    desenho = ImageDraw.Draw(imagem)
+    fonte = _fonte(14)
+    fonte_legenda = _fonte(18)
+
+    margem = 48
+    area_legenda = 40
+    if pontos:
+        xs = [p[1] for p in pontos]
+        ys = [p[2] for p in pontos]
+        x_min, x_max = min(xs), max(xs)
+        y_min, y_max = min(ys), max(ys)
+        # Mesma escala nos dois eixos para não distorcer o mapa
+        escala = min(
+            (largura - 2 * margem) / max(x_max - x_min, 1.0),
+            (altura - 2 * margem - area_legenda) / max(y_max - y_min, 1.0),
+        )
+        desloc_x = (largura - (x_max - x_min) * escala) / 2
+        desloc_y = (altura - area_legenda - (y_max - y_min) * escala) / 2
+
+        # Pontos pequenos quando há muitas bases, para não virar uma mancha
+        raio = 11 if len(pontos) <= 100 else 6 if len(pontos) <= 1000 else 2
+        for numero, x, y, status in pontos:
+            px = desloc_x + (x - x_min) * escala
+            py = area_legenda + desloc_y + (y_max - y) * escala  # Y cresce para cima no jogo
+            cor = CORES_STATUS.get(status, COR_DESCONHECIDA)
+            desenho.ellipse((px - raio, py - raio, px + raio, py + raio), fill=cor, outline=(0, 0, 0))
+            if raio >= 6:
+                desenho.text((px, py - raio - 2), str(numero), fill=COR_TEXTO, font=fonte, anchor="md")
+
+    # Legenda com a contagem por status
+    contagem = {status: 0 for status in CORES_STATUS}
+    for _, _, _, status in pontos:
+        if status in contagem:
+            contagem[status] += 1
+    x_legenda = 16
+    for status, cor in CORES_STATUS.items():
+        desenho.ellipse((x_legenda, 12, x_legenda + 16, 28), fill=cor)
+        texto = f"{status.title()}: {contagem[status]}"
+        desenho.text((x_legenda + 22, 20), texto, fill=COR_TEXTO, font=fonte_legenda, anchor="lm")
+        x_legenda += 40 + int(desenho.textlength(texto, font=fonte_legenda))
+
+    saida = io.BytesIO()
+    imagem.save(saida, format="PNG", optimize=True)
+    return saida.getvalue()
+
+
+@lru_cache(maxsize=512)
+def _miniatura(caminho: str, mtime: float, largura: int):
+    """Miniatura da foto (em cache por caminho + data de modificação)."""
+    with Image.open(caminho) as foto:
+        foto.draft("RGB", (largura, largura))  # Decodifica já reduzido quando o formato permite
+        foto = foto.convert("RGB")
+        foto.thumbnail((largura, largura * 3 // 4))
+        return foto
+
+
+def gerar_folha_contato(itens: list, colunas: int = 5, largura_miniatura: int = 240) -> bytes:
+    """Monta uma folha com as miniaturas das bases e uma faixa de status em cada uma.
+
+    `itens` é uma lista de tuplas (numero, caminho_foto, mtime, status); `mtime`
+    é None quando a foto não existe. Retorna os bytes de um JPEG.
+    """
+    altura_miniatura = largura_miniatura * 3 // 4
+    altura_faixa = 26
+    espaco = 6
+    linhas = max((len(itens) + colunas - 1) // colunas, 1)
+    largura = colunas * (largura_miniatura + espaco) + espaco
+    altura = linhas * (altura_miniatura + altura_faixa + espaco) + espaco
+
+    folha = Image.new("RGB", (largura, altura), COR_FUNDO)
+    desenho = ImageDraw.Draw(folha)
+    fonte = _fonte(16)
+
+    for i, (numero, caminho, mtime, status) in enumerate(itens):
+        x = espaco + (i % colunas) * (largura_miniatura + espaco)
+        y = espaco + (i // colunas) * (altura_miniatura + altura_faixa + espaco)
+
+        miniatura = None
+        if mtime is not None:
+            try:
+                miniatura = _miniatura(caminho, mtime, largura_miniatura)
+            except OSError:
+                miniatura = None
+        if miniatura is not None:
+            folha.paste(
+                miniatura,
+                (x + (largura_miniatura - miniatura.width) // 2, y + (altura_miniatura - miniatura.height) // 2),
+            )
+        else:
+            desenho.rectangle((x, y, x + largura_miniatura, y + altura_miniatura), fill=(54, 57, 63))
+            desenho.text(
+                (x + largura_miniatura / 2, y + altura_miniatura / 2), "Sem foto",
+                fill=COR_TEXTO, font=fonte, anchor="mm",
+            )
+
+        cor = CORES_STATUS.get(status, COR_DESCONHECIDA)
+        y_faixa = y + altura_miniatura
+        desenho.rectangle((x, y_faixa, x + largura_miniatura, y_faixa + altura_faixa), fill=cor)
+        desenho.text(
+            (x + largura_miniatura / 2, y_faixa + altura_faixa / 2), f"Base {numero} - {status.title()}",
+            fill=(0, 0, 0), font=fonte, anchor="mm",
+        )
+
+    saida = io.BytesIO()
+    folha.save(saida, format="JPEG", quality=80, optimize=True)
+    return saida.getvalue()
+
+
+def _redimensionar(imagem, largura: int, altura: int):
+    """Reduz a imagem para caber em largura x altura, mantendo a proporção."""
+    imagem.thumbnail((largura, altura))
+    return imagem
+
+
+def _faixa(imagem, texto: str, cor: tuple):
+    """Desenha uma faixa colorida com `texto` na parte de baixo da imagem."""
+    altura = max(imagem.height // 12, 20)
+    desenho = ImageDraw.Draw(imagem)
+    desenho.rectangle((0, imagem.height - altura, imagem.width, imagem.height), fill=tuple(cor))
+    desenho.text(
+        (imagem.width / 2, imagem.height - altura / 2), texto,
+        fill=(0, 0, 0), font=_fonte(altura * 2 // 3), anchor="mm",
+    )
+    return imagem
+
+
+def _sobrepor(imagem, caminho: str, x: int, y: int):
+    """Cola outra imagem (ex.: um logo com transparência) na posição (x, y).
+
+    Coordenadas negativas contam a partir da borda direita/inferior.
+    """
+    with Image.open(caminho) as camada:
+        camada = camada.convert("RGBA")
+    if x < 0:
+        x += imagem.width - camada.width
+    if y < 0:
+        y += imagem.height - camada.height
+    imagem.paste(camada, (x, y), camada)
+    return imagem
+
+
+def _selo(imagem, numero: int, status: str):
+    """Carimba no canto superior esquerdo um selo com o número da base e o status, na cor do status."""
+    tamanho = max(min(imagem.width, imagem.height) // 14, 14)
+    fonte = _fonte(tamanho)
+    texto = f"BASE {numero} - {status.upper()}"
+    desenho = ImageDraw.Draw(imagem)
+    esquerda, topo, direita, baixo = desenho.textbbox((0, 0), texto, font=fonte)
+    margem = tamanho // 2
+    caixa = (margem, margem, margem + direita - esquerda + tamanho, margem + baixo - topo + tamanho // 2 + 2)
+    desenho.rounded_rectangle(
+        caixa, radius=tamanho // 3, fill=CORES_STATUS.get(status, COR_DESCONHECIDA),
+        outline=(0, 0, 0), width=max(tamanho // 10, 1),
+    )
+    desenho.text(((caixa[0] + caixa[2]) / 2, (caixa[1] + caixa[3]) / 2), texto, fill=(0, 0, 0), font=fonte, anchor="mm")
+    return imagem
+
+
+# Operações aceitas por processar_imagem: nome -> função(imagem, *parâmetros)
+OPERACOES = {
+    "redimensionar": _redimensionar,
+    "faixa": _faixa,
+    "sobrepor": _sobrepor,
+    "selo": _selo,
+}
+
+
+def processar_imagem(origem: str, operacoes: tuple = (), formato: str = "JPEG", qualidade: int = 85) -> bytes:
+    """Abre a imagem `origem`, aplica as `operacoes` em ordem e codifica em `formato`.
+
+    `operacoes` é uma sequência de tuplas (nome, *parâmetros) com nome em
+    OPERACOES, ex.: (("redimensionar", 1280, 1280), ("faixa", "Livre", (87, 242, 135))).
+    Retorna os bytes da imagem gerada.
+    """
+    with Image.open(origem) as imagem:
+        if operacoes and operacoes[0][0] == "redimensionar":
+            imagem.draft("RGB", tuple(operacoes[0][1:3]))  # Decodifica já reduzido quando o formato permite
+        transparente = "A" in imagem.getbands() or "transparency" in imagem.info
+        imagem = imagem.convert("RGBA" if transparente and formato != "JPEG" else "RGB")
+
+    for nome, *parametros in operacoes:
+        imagem = OPERACOES[nome](imagem, *parametros)
+
+    saida = io.BytesIO()
+    imagem.save(saida, format=formato, quality=qualidade, optimize=True)
+    return saida.getvalue()
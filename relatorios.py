@@ -0,0 +1,203 @@
+# relatorios.py
+"""Relatórios calculados sobre o histórico das bases.
+
+O histórico é resumido de forma incremental: as funções de janela (LAG/LEAD)
+rodam só sobre os registros novos desde a última execução, e o resultado é
+somado nas tabelas relatorio_transicoes/relatorio_abertas (criadas em
+init_database). Assim o relatório não relê milhões de linhas a cada pedido.
+O resumo é um só para todas as ilhas; cada relatório lê só as linhas da sua.
+A exportação lê o histórico em blocos e grava direto no arquivo compactado.
+As funções abrem a própria conexão para poderem rodar fora do event loop do bot.
+"""
+import csv
+import gzip
+import sqlite3
+import time
+
+# Registros processados por transação no resumo incremental
+TAMANHO_LOTE = 200_000
+
+# Linhas lidas por vez na exportação do histórico
+LINHAS_POR_LEITURA = 5_000
+
+COLUNAS_EXPORTACAO = ("id", "base_numero", "status", "nome", "data", "responsavel", "motivo", "data_registro")
+
+# Junta os registros repetidos (os modais gravam o estado anterior e o novo) e,
+# para cada mudança, descobre o próximo estado e quando ele começou. As mudanças
+# ainda abertas de cada base entram como ponto de partida do lote.
+SQL_MUDANCAS_LOTE = '''
+CREATE TEMP TABLE mudancas AS
+WITH eventos AS (
+    SELECT id, guild_id, base_numero, status, nome, momento,
+           LAG(status) OVER w AS status_anterior,
+           LAG(nome) OVER w AS nome_anterior
+    FROM (
+        SELECT id, guild_id, base_numero, status, nome, momento FROM relatorio_abertas
+        UNION ALL
+        SELECT id, guild_id, base_numero, status, COALESCE(nome, ''), julianday(data_registro)
+        FROM historico
+        WHERE id > :de AND id <= :ate
+    )
+    WINDOW w AS (PARTITION BY guild_id, base_numero ORDER BY id)
+)
+SELECT id, guild_id, base_numero, status, nome, momento,
+       LEAD(status) OVER w AS proximo_status,
+       LEAD(momento) OVER w AS fim
+FROM eventos
+WHERE status_anterior IS NULL OR status_anterior IS NOT status OR nome_anterior IS NOT nome
+WINDOW w AS (PARTITION BY guild_id, base_numero ORDER BY id)
+'''
+
+SQL_SOMAR_FECHADAS = '''
+INSERT INTO relatorio_transicoes (guild_id, base_numero, status, proximo_status, nome, quantidade, dias)
+SELECT guild_id, base_numero, status, proximo_status, nome, COUNT(*), SUM(fim - momento)
+FROM temp.mudancas
+WHERE fim IS NOT NULL
+GROUP BY guild_id, base_numero, status, proximo_status, nome
+ON CONFLICT (guild_id, base_numero, status, proximo_status, nome) DO UPDATE SET
+    quantidade = quantidade + excluded.quantidade,
+    dias = dias + excluded.dias
+'''
+
+
+def atualizar_resumo(conn: sqlite3.Connection) -> int:
+    """Processa os registros do histórico ainda não resumidos. Retorna quantos foram."""
+    cursor = conn.cursor()
+    linha = cursor.execute("SELECT valor FROM bot_meta WHERE chave = 'relatorio_ultimo_id'").fetchone()
+    ultimo_id = int(linha[0]) if linha else 0
+    maximo_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM historico").fetchone()[0]
+
+    processados = 0
+    while ultimo_id < maximo_id:
+        ate = min(ultimo_id + TAMANHO_LOTE, maximo_id)
+        with conn:
+            # Uma falha num lote anterior pode ter deixado a tabela temporária na conexão
+            cursor.execute("DROP TABLE IF EXISTS temp.mudancas")
+            cursor.execute(SQL_MUDANCAS_LOTE, {"de": ultimo_id, "ate": ate})
+            cursor.execute(SQL_SOMAR_FECHADAS)
+            cursor.execute("DELETE FROM relatorio_abertas")
+            cursor.execute('''
+            INSERT INTO relatorio_abertas (guild_id, base_numero, id, status, nome, momento)
+            SELECT guild_id, base_numero, id, status, nome, momento FROM temp.mudancas WHERE fim IS NULL
+            ''')
+            cursor.execute(
+                "INSERT OR REPLACE INTO bot_meta (chave, valor) VALUES ('relatorio_ultimo_id', ?)", (str(ate),)
+            )
+            cursor.execute("DROP TABLE temp.mudancas")
+        processados += ate - ultimo_id
+        ultimo_id = ate
+    return processados
+
+
+def calcular_relatorio(caminho_banco: str, guild_id: int) -> dict:
+    """Atualiza o resumo e calcula as estatísticas do histórico inteiro da ilha `guild_id`.
+
+    Retorna um dicionário com:
+    - `bases`: {numero: {"taxa_ocupacao", "tempo_medio_venda_h", "ocupacoes"}}
+    - `reserva_ocupacao`: {"conversoes", "tempo_medio_h"} (reservada -> ocupada)
+    - `faccoes`: {nome: {"ocupacoes", "bases", "tempo_medio_h"}}
+    - `registros_novos` e `segundos` (registros resumidos agora e duração do cálculo)
+    """
+    inicio = time.perf_counter()
+    conn = sqlite3.connect(caminho_banco)
+    try:
+        novos = atualizar_resumo(conn)
+        cursor = conn.cursor()
+        agora = cursor.execute("SELECT julianday('now')").fetchone()[0]
+        linhas = cursor.execute('''
+        SELECT base_numero, status, proximo_status, nome, quantidade, dias
+        FROM relatorio_transicoes WHERE guild_id = :guild
+        UNION ALL
+        SELECT base_numero, status, NULL, nome, 1, :agora - momento
+        FROM relatorio_abertas WHERE guild_id = :guild
+        ''', {"guild": guild_id, "agora": agora}).fetchall()
+    finally:
+        conn.close()
+
+    bases = {}
+    faccoes = {}
+    conversoes = 0
+    dias_conversao = 0.0
+    for numero, status, proximo, nome, quantidade, dias in linhas:
+        resumo = bases.setdefault(numero, {"total": 0.0, "ocupada": 0.0, "livre": 0.0, "vendas": 0, "ocupacoes": 0})
+        resumo["total"] += dias
+        if status == "ocupada":
+            resumo["ocupada"] += dias
+            resumo["ocupacoes"] += quantidade
+            if nome:
+                faccao = faccoes.setdefault(nome, {"ocupacoes": 0, "bases": set(), "dias": 0.0})
+                faccao["ocupacoes"] += quantidade
+                faccao["bases"].add(numero)
+                faccao["dias"] += dias
+        elif status == "livre" and proximo is not None:
+            # Só conta o tempo livre que terminou em reserva/ocupação
+            resumo["livre"] += dias
+            resumo["vendas"] += quantidade
+        elif status == "reservada" and proximo == "ocupada":
+            conversoes += quantidade
+            dias_conversao += dias
+
+    return {
+        "bases": {
+            numero: {
+                "taxa_ocupacao": resumo["ocupada"] / resumo["total"] if resumo["total"] > 0 else 0.0,
+                "tempo_medio_venda_h": resumo["livre"] / resumo["vendas"] * 24 if resumo["vendas"] else None,
+                "ocupacoes": resumo["ocupacoes"],
+            }
+            for numero, resumo in bases.items()
+        },
+        "reserva_ocupacao": {
+            "conversoes": conversoes,
+            "tempo_medio_h": dias_conversao / conversoes * 24 if conversoes else None,
+        },
+        "faccoes": {
+            nome: {
+                "ocupacoes": faccao["ocupacoes"],
+                "bases": len(faccao["bases"]),
+                "tempo_medio_h": faccao["dias"] / faccao["ocupacoes"] * 24,
+            }
+            for nome, faccao in faccoes.items()
+        },
+        "registros_novos": novos,
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+def exportar_historico_csv(caminho_banco: str, destino: str, guild_id: int, base: int = None,
+                           inicio: str = None, fim: str = None) -> int:
+    """Grava o histórico da ilha `guild_id` num CSV compactado (gzip) em `destino`, aos poucos.
+
+    `inicio` e `fim` são datas AAAA-MM-DD (inclusivas) no fuso local do servidor;
+    como data_registro é gravado em UTC (CURRENT_TIMESTAMP), os limites são
+    convertidos para UTC no SQL, o que mantém o uso do índice. Retorna o número
+    de linhas exportadas.
+    """
+    condicoes = ["guild_id = ?"]
+    parametros = [guild_id]
+    if base is not None:
+        condicoes.append("base_numero = ?")
+        parametros.append(base)
+    if inicio:
+        condicoes.append("data_registro >= datetime(?, 'utc')")
+        parametros.append(inicio)
+    if fim:
+        condicoes.append("data_registro < datetime(?, '+1 day', 'utc')")
+        parametros.append(fim)
+    sql = f"SELECT {', '.join(COLUNAS_EXPORTACAO)} FROM historico WHERE {' AND '.join(condicoes)} ORDER BY id"
+
+    total = 0
+    conn = sqlite3.connect(caminho_banco)
+    try:
+        cursor = conn.execute(sql, parametros)
+        with gzip.open(destino, "wt", encoding="utf-8", newline="") as arquivo:
+            escritor = csv.writer(arquivo)
+            escritor.writerow(COLUNAS_EXPORTACAO)
+            while True:
+                linhas = cursor.fetchmany(LINHAS_POR_LEITURA)
+                if not linhas:
+                    break
+                escritor.writerows(linhas)
+                total += len(linhas)
+    finally:
+        conn.close()
+    return total